@@ -0,0 +1,51 @@
+"""
+Authentication of API requests from the claims of their access token, without loading the account.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+
+
+class AccountTokenUser(TokenUser):
+    """
+    User built from the claims of an access token: its id and whether the account was active when the token was issued.
+    """
+    @property
+    def is_active(self) -> bool:
+        # Tokens issued before the claim was added only belonged to active accounts
+        return self.token.get('is_active', True)
+
+
+def is_account_active(user_id: int) -> bool:
+    """
+    Returns whether the account still exists and is active, the answer is cached for ACCOUNT_STATE_CACHE_TTL seconds.
+    """
+    key = f'account_active:{user_id}'
+    is_active = cache.get(key)
+    if is_active is None:
+        is_active = get_user_model().objects.filter(id=user_id, is_active=True).exists()
+        cache.set(key, is_active, timeout=settings.ACCOUNT_STATE_CACHE_TTL)
+
+    return is_active
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    Authenticates requests as an ``AccountTokenUser``, so no query is made to build ``request.user``.
+
+    Accounts deactivated or deleted after the token was issued keep access until it expires,
+    unless ACCOUNT_STATE_CACHE_TTL is set: their state is then checked and cached for that long.
+    """
+    def get_user(self, validated_token) -> AccountTokenUser:
+        user = super().get_user(validated_token)
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if settings.ACCOUNT_STATE_CACHE_TTL > 0 and not is_account_active(user.id):
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
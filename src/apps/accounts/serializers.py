@@ -1,6 +1,9 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from .tokens import AccountRefreshToken
 
 
 Account = get_user_model()
@@ -43,3 +46,8 @@ class TokenResponseSerializer(serializers.Serializer):
     """Serializer for JWT token response."""
     refresh = serializers.CharField()
     access = serializers.CharField()
+
+
+class AccountTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Issues tokens with the claims requests are authenticated from."""
+    token_class = AccountRefreshToken
@@ -0,0 +1,12 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class AccountRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the claims requests are authenticated from, access tokens made from it inherit them.
+    """
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['is_active'] = user.is_active
+        return token
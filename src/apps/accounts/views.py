@@ -5,11 +5,12 @@ from rest_framework.request import Request
 from rest_framework.decorators import api_view
 from django.contrib.auth import get_user_model
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from .serializers import UserRegistrationSerializer, UserRegistrationErrorsSerializer, TokenResponseSerializer
+from .tokens import AccountRefreshToken
 from apps.balance.models import UserBalance
+from apps.core.db_routers import pin_to_primary
 
 
 Account = get_user_model()
@@ -70,8 +71,10 @@ def register(request: Request):
         last_name=validated_data['last_name'],
     )
     UserBalance.objects.create(user=user)
+    # The request is anonymous, so the middleware can't pin the new user itself
+    pin_to_primary(user.id)
 
-    refresh = RefreshToken.for_user(user)
+    refresh = AccountRefreshToken.for_user(user)
 
     response_data = {
         "refresh": str(refresh),
@@ -1,6 +1,11 @@
 from django.contrib import admin
+from .cache import forget_balance
 from .models import UserBalance
 
 @admin.register(UserBalance)
 class ModelNameAdmin(admin.ModelAdmin):
-    pass
+    def delete_queryset(self, request, queryset):
+        # Bulk deletion doesn't call UserBalance.delete()
+        for user_id in queryset.values_list('user_id', flat=True):
+            forget_balance(user_id, using=queryset.db)
+        super().delete_queryset(request, queryset)
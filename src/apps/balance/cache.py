@@ -0,0 +1,41 @@
+"""
+Per-user cache of the balances, invalidated whenever a balance changes.
+"""
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+BALANCE_CACHE_KEY = 'user_balance:{user_id}'
+
+
+class CachedBalance(NamedTuple):
+    balance: int
+    updated_at: datetime
+
+
+def get_cached_balance(user_id: int) -> Optional[CachedBalance]:
+    return cache.get(BALANCE_CACHE_KEY.format(user_id=user_id))
+
+
+def add_cached_balance(user_id: int, cached_balance: CachedBalance) -> None:
+    """
+    Caches a balance loaded from the DB, unless another request has cached it meanwhile.
+    """
+    cache.add(BALANCE_CACHE_KEY.format(user_id=user_id), cached_balance, timeout=settings.BALANCE_CACHE_TTL)
+
+
+def forget_balance(user_id: int, using: str = DEFAULT_DB_ALIAS) -> None:
+    """
+    Drops the changed balance from the cache once the current transaction is committed
+    (right away outside of one), so the next read loads it from the DB.
+
+    The changed balance isn't written through: concurrent changes may commit in any order,
+    and the cache has no atomic way to keep the last one.
+    A read that loaded the balance just before the commit may still cache the previous one
+    until BALANCE_CACHE_TTL expires.
+    """
+    transaction.on_commit(lambda: cache.delete(BALANCE_CACHE_KEY.format(user_id=user_id)), using=using)
@@ -0,0 +1,73 @@
+from typing import Optional
+
+from django.db import connections, models, router
+from django.utils import timezone
+
+from .cache import CachedBalance, add_cached_balance, forget_balance, get_cached_balance
+
+
+class UserBalanceManager(models.Manager):
+    def debit(self, user_id: int, amount: int) -> Optional[int]:
+        """
+        Takes the amount from the user's balance with a single conditional UPDATE,
+        so concurrent debits can't overdraw it.
+        Returns the new balance, or None if the balance is insufficient or doesn't exist.
+        """
+        connection = connections[router.db_for_write(self.model)]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        updated_at = timezone.now()
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET balance = balance - %s, updated_at = %s "
+                f"WHERE user_id = %s AND balance >= %s "
+                f"RETURNING balance",
+                [amount, connection.ops.adapt_datetimefield_value(updated_at), user_id, amount],
+            )
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+
+        forget_balance(user_id, using=connection.alias)
+        return row[0]
+
+    def credit(self, user_id: int, amount: int) -> Optional[int]:
+        """
+        Gives the amount back to the user's balance (e.g. a refund) with a single UPDATE.
+        Returns the new balance, or None if the balance doesn't exist.
+        """
+        connection = connections[router.db_for_write(self.model)]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        updated_at = timezone.now()
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET balance = balance + %s, updated_at = %s "
+                f"WHERE user_id = %s "
+                f"RETURNING balance",
+                [amount, connection.ops.adapt_datetimefield_value(updated_at), user_id],
+            )
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+
+        forget_balance(user_id, using=connection.alias)
+        return row[0]
+
+    def get_balance(self, user_id: int) -> Optional[CachedBalance]:
+        """
+        Returns the user's balance and when it last changed from the cache, loading it on a miss.
+        Returns None if the user has no balance.
+        """
+        cached_balance = get_cached_balance(user_id)
+        if cached_balance is None:
+            row = self.filter(user_id=user_id).values_list('balance', 'updated_at').first()
+            if row is None:
+                return None
+
+            cached_balance = CachedBalance(*row)
+            add_cached_balance(user_id, cached_balance)
+
+        return cached_balance
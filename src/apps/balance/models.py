@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
-from django.db.models import F
+
+from .cache import forget_balance
+from .managers import UserBalanceManager
 
 
 Account = get_user_model()
@@ -9,16 +11,18 @@ Account = get_user_model()
 class UserBalance(models.Model):
     user = models.OneToOneField(Account, on_delete=models.CASCADE)
     balance = models.PositiveIntegerField(default=1000)
+    # Also set by UserBalanceManager.debit, which bypasses save()
+    updated_at = models.DateTimeField(auto_now=True)
 
-    def decrease(self, amount: int) -> None:
-        """
-        Decreases the balance by the given amount.
-        """
-        # F object used to avoid race conditions
-        # See:
-        # https://docs.djangoproject.com/en/5.1/ref/models/expressions/#avoiding-race-conditions-using-f
-        self.balance = F('balance') - amount
-
+    objects = UserBalanceManager()
 
     def __str__(self):
         return f"{self.user.first_name}'s balance"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        forget_balance(self.user_id, using=self._state.db)
+
+    def delete(self, *args, **kwargs):
+        forget_balance(self.user_id, using=self._state.db)
+        return super().delete(*args, **kwargs)
@@ -1,3 +1,5 @@
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from drf_spectacular.utils import extend_schema
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
@@ -11,6 +13,7 @@ from .serializers import UserBalanceSerializer
 @extend_schema(
     responses={
         200: UserBalanceSerializer,
+        304: None,
         401: {"type": "object", "properties": {"detail": {"type": "string"}}},
         404: {
             "type": "object", "properties": {"detail": {"type": "string"}},
@@ -23,11 +26,23 @@ from .serializers import UserBalanceSerializer
 @permission_classes([permissions.IsAuthenticated])
 def get_balance(request: Request):
     """
-    Returns current user's balance
+    Returns current user's balance.
+    The balance is served from the cache, clients that send back its ETag
+    get a bodyless 304 while it hasn't changed.
     """
-    try:
-        user_balance = UserBalance.objects.get(user=request.user)
-    except UserBalance.DoesNotExist:
+    user_balance = UserBalance.objects.get_balance(request.user.id)
+    if user_balance is None:
         return Response(data={"detail": "There's no balance for such user"}, status=status.HTTP_404_NOT_FOUND)
 
-    return Response(UserBalanceSerializer(user_balance).data, status=status.HTTP_200_OK)
+    # No Last-Modified: HTTP dates have whole seconds, so a balance changed twice within one
+    # would look unmodified to clients that revalidate with If-Modified-Since
+    etag = quote_etag(f'{user_balance.balance}-{user_balance.updated_at.timestamp():.6f}')
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = Response(UserBalanceSerializer(user_balance).data, status=status.HTTP_200_OK)
+
+    response.headers['ETag'] = etag
+    # Clients must check with the server before reusing the balance they have
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,103 @@
+"""
+Routing of the reads of some requests to the DB replicas, writes always go to the primary.
+"""
+import contextlib
+import contextvars
+import random
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpRequest
+
+
+PRIMARY_PIN_CACHE_KEY = 'primary_pin:{user_id}'
+
+
+def pin_to_primary(user_id) -> None:
+    """
+    Sends the reads of the user to the primary for REPLICA_PIN_SECONDS,
+    so they see their own writes until the replicas have caught up with them.
+    """
+    if settings.DATABASE_REPLICAS:
+        cache.set(PRIMARY_PIN_CACHE_KEY.format(user_id=user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+async def apin_to_primary(user_id) -> None:
+    if settings.DATABASE_REPLICAS:
+        await cache.aset(PRIMARY_PIN_CACHE_KEY.format(user_id=user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def mark_as_written(request) -> None:
+    """
+    Marks a safe request that has written something (e.g. debited a coin),
+    so ReplicaRoutingMiddleware pins its user to the primary like after an unsafe one.
+    """
+    # DRF requests wrap the HttpRequest the middleware sees
+    getattr(request, '_request', request).has_written = True
+
+
+def is_pinned_to_primary(user_id) -> bool:
+    return cache.get(PRIMARY_PIN_CACHE_KEY.format(user_id=user_id), False)
+
+
+class ReplicaReads:
+    """
+    The replica the reads of a request go to, unless its user is pinned to the primary.
+
+    A single replica is picked per request, so all of its reads see the same (possibly lagging) state.
+    The user is only known once the view has authenticated the request,
+    so the pin is checked on the first read made after that.
+    """
+    __slots__ = ('request', 'alias', '_pinned')
+
+    def __init__(self, request: HttpRequest):
+        self.request = request
+        self.alias = random.choice(settings.DATABASE_REPLICAS)
+        self._pinned: Optional[bool] = None
+
+    def db_for_read(self) -> str:
+        if self._pinned is None:
+            user = getattr(self.request, 'user', None)
+            if user is None or not user.is_authenticated:
+                return self.alias
+            self._pinned = is_pinned_to_primary(user.id)
+
+        return DEFAULT_DB_ALIAS if self._pinned else self.alias
+
+
+_replica_reads: contextvars.ContextVar[Optional[ReplicaReads]] = contextvars.ContextVar('replica_reads', default=None)
+
+
+@contextlib.contextmanager
+def use_replica_reads(replica_reads: ReplicaReads) -> Iterator[None]:
+    token = _replica_reads.set(replica_reads)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends the reads made while replica reads are in use (see ReplicaRoutingMiddleware) to a replica,
+    everything else, including the reads of open transactions, to the primary.
+    """
+    def db_for_read(self, model, **hints):
+        replica_reads = _replica_reads.get()
+        if replica_reads is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        return replica_reads.db_for_read()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replicas get the schema from the primary through replication
+        return db == DEFAULT_DB_ALIAS
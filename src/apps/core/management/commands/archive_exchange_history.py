@@ -0,0 +1,30 @@
+"""
+Django command to move old currency exchange records to the archive.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.currency_exchange.services import archive_history, history_archive_cutoff
+
+
+class Command(BaseCommand):
+    """Django command that keeps the currency exchange table small by archiving old records."""
+
+    help = (
+        "Moves the currency exchange records older than HISTORY_HOT_RETENTION_DAYS days to the archive table, "
+        "in batches of short transactions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.HISTORY_ARCHIVE_BATCH_SIZE,
+            help="Number of records moved per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        cutoff = history_archive_cutoff()
+
+        archived = archive_history(cutoff, options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} records created before {cutoff:%Y-%m-%d %H:%M}.'))
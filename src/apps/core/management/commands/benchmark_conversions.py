@@ -0,0 +1,63 @@
+"""
+Django command to measure the throughput of bulk currency conversions.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.currency_exchange.conversion import RateVector
+from apps.currency_exchange.services import load_latest_rate_table
+
+
+class Command(BaseCommand):
+    """Django command that benchmarks vectorized conversions against a Python loop over the rate table."""
+
+    help = "Measures how many (from, to, amount) conversions per second the rate vector and a Python loop handle."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000],
+            help="Numbers of conversions to make at once.",
+        )
+        parser.add_argument(
+            '--loop-max-size', type=int, default=100_000,
+            help="Largest number of conversions also made with a Python loop (it's slow on big sizes).",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        table = load_latest_rate_table(settings.EXCHANGE_RATE_BASE_CURRENCY)
+        if table is None:
+            raise CommandError("There's no rate snapshot yet, run refresh_rate_snapshots --once first.")
+
+        started_at = time.perf_counter()
+        rate_vector = RateVector.from_table(table)
+        self.stdout.write(
+            f'Built the rate vector of {len(rate_vector)} currencies in '
+            f'{(time.perf_counter() - started_at) * 1_000:.2f} ms'
+        )
+
+        codes = list(table.codes)
+        for size in options['sizes']:
+            from_codes = random.choices(codes, k=size)
+            to_codes = random.choices(codes, k=size)
+            amounts = [random.uniform(1, 10_000) for _ in range(size)]
+
+            started_at = time.perf_counter()
+            rate_vector.convert(from_codes, to_codes, amounts)
+            self.report('vector', size, time.perf_counter() - started_at)
+
+            if size > options['loop_max_size']:
+                self.stdout.write(f'{"loop":>6}: {size} conversions, skipped')
+                continue
+
+            started_at = time.perf_counter()
+            [amount * table.rate(from_code, to_code) for from_code, to_code, amount in zip(from_codes, to_codes, amounts)]
+            self.report('loop', size, time.perf_counter() - started_at)
+
+    def report(self, name, size, elapsed):
+        self.stdout.write(
+            f'{name:>6}: {size} conversions, {elapsed * 1_000:.2f} ms, {size / elapsed:,.0f} conversions/s'
+        )
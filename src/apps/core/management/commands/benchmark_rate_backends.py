@@ -0,0 +1,66 @@
+"""
+Django command to compare rate lookup latency of the rate table backends.
+"""
+import os
+import random
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.currency_exchange.models import RateSnapshot
+from apps.currency_exchange.services import fetch_rate_table, load_latest_rate_table
+from apps.currency_exchange.snapshot_store import MmapSnapshotStore, write_snapshot
+
+
+class Command(BaseCommand):
+    """Django command that benchmarks mmap, DB and HTTP rate lookups."""
+
+    help = "Measures the latency of a single rate lookup through each rate table backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100_000, help="Lookups made through the mmap backend.")
+        parser.add_argument('--db-iterations', type=int, default=1_000, help="Lookups made through the DB.")
+        parser.add_argument(
+            '--http-iterations', type=int, default=0,
+            help="Lookups made through the upstream API (each one uses API quota, so it's disabled by default).",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        base_code = settings.EXCHANGE_RATE_BASE_CURRENCY
+        snapshot = RateSnapshot.objects.filter(base_code=base_code).order_by('-fetched_at', '-id').first()
+        if snapshot is None:
+            raise CommandError("There's no rate snapshot yet, run refresh_rate_snapshots --once first.")
+
+        codes = list(snapshot.rates)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'rates.bin')
+            write_snapshot(
+                path, base_code=base_code, rates=snapshot.rates,
+                version=snapshot.id, fetched_at=snapshot.fetched_at.timestamp(),
+            )
+            store = MmapSnapshotStore(path)
+            self.report('mmap', options['iterations'], codes, lambda: store.get(base_code))
+
+        self.report('db', options['db_iterations'], codes, lambda: load_latest_rate_table(base_code))
+        self.report('http', options['http_iterations'], codes, lambda: fetch_rate_table(base_code))
+
+    def report(self, name, iterations, codes, get_rate_table):
+        if iterations <= 0:
+            self.stdout.write(f'{name:>6}: skipped')
+            return
+
+        lookups = [random.choice(codes) for _ in range(iterations)]
+
+        started_at = time.perf_counter()
+        for currency_code in lookups:
+            get_rate_table().rate(currency_code, "UAH")
+        elapsed = time.perf_counter() - started_at
+
+        self.stdout.write(
+            f'{name:>6}: {iterations} lookups, {elapsed / iterations * 1_000_000:.2f} us/lookup, '
+            f'{iterations / elapsed:,.0f} lookups/s'
+        )
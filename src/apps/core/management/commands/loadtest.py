@@ -0,0 +1,94 @@
+"""
+Django command to load test the deployments of the API.
+"""
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+import httpx
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class Command(BaseCommand):
+    """Django command that sends concurrent requests to each target and compares their throughput and latency."""
+
+    help = (
+        "Sends the same authenticated request to each target with the given concurrency "
+        "and reports the throughput, latency percentiles and response statuses of each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets', nargs='*',
+            default=[
+                'wsgi=http://web:8000/api/v1/currency/',
+                'asgi=http://web_asgi:8001/api/v1/currency/async/',
+            ],
+            help="Targets as name=url pairs, the WSGI and ASGI create record routes of the production compose by default.",
+        )
+        parser.add_argument(
+            '--email', required=True,
+            help="Email of the user the requests are made as. Paid routes take coins from their balance.",
+        )
+        parser.add_argument('--requests', type=int, default=1_000, help="Requests sent to each target.")
+        parser.add_argument('--concurrency', type=int, default=100, help="Requests in flight at once.")
+        parser.add_argument('--method', default='POST', help="HTTP method of the requests.")
+        parser.add_argument('--data', default='{"currency_code": "USD"}', help="JSON body of the requests.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        targets = []
+        for target in options['targets']:
+            name, separator, url = target.partition('=')
+            if not separator:
+                raise CommandError(f"Target {target!r} must be a name=url pair.")
+            targets.append((name, url))
+
+        user = get_user_model().objects.filter(email=options['email']).first()
+        if user is None:
+            raise CommandError(f"There's no user with the email {options['email']}.")
+
+        headers = {
+            'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}',
+            'Content-Type': 'application/json',
+        }
+        for name, url in targets:
+            elapsed, latencies, statuses = asyncio.run(self.run(
+                url, options['method'], options['data'], headers, options['requests'], options['concurrency'],
+            ))
+            self.report(name, elapsed, latencies, statuses)
+
+    @staticmethod
+    async def run(url, method, data, headers, requests, concurrency):
+        latencies = []
+        statuses = Counter()
+        # Shared by all senders, so each request is sent once
+        pending = iter(range(requests))
+
+        async with httpx.AsyncClient(timeout=60, limits=httpx.Limits(max_connections=concurrency)) as client:
+            async def send():
+                for _ in pending:
+                    started_at = time.perf_counter()
+                    try:
+                        response = await client.request(method, url, content=data, headers=headers)
+                        statuses[response.status_code] += 1
+                    except httpx.HTTPError as e:
+                        statuses[type(e).__name__] += 1
+                    latencies.append(time.perf_counter() - started_at)
+
+            started_at = time.perf_counter()
+            await asyncio.gather(*(send() for _ in range(concurrency)))
+
+        return time.perf_counter() - started_at, latencies, statuses
+
+    def report(self, name, elapsed, latencies, statuses):
+        percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        self.stdout.write(
+            f'{name:>6}: {len(latencies)} requests in {elapsed:.2f} s, {len(latencies) / elapsed:,.0f} requests/s, '
+            f'latency p50 {percentiles[49] * 1_000:.1f} ms, p95 {percentiles[94] * 1_000:.1f} ms, '
+            f'p99 {percentiles[98] * 1_000:.1f} ms, statuses '
+            + ', '.join(f'{status}: {count}' for status, count in sorted(statuses.items(), key=str))
+        )
@@ -0,0 +1,60 @@
+"""
+Django command to maintain monthly partitions of the currency exchange history.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.currency_exchange.partitions import (
+    create_future_partitions, is_partitioned, remove_expired_partitions,
+)
+
+
+class Command(BaseCommand):
+    """Django command that creates upcoming history partitions and removes the expired ones."""
+
+    help = (
+        "Creates the partitions of the currency exchange history for the upcoming months "
+        "and detaches (or drops) the partitions older than the retention period."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead', type=int, default=settings.HISTORY_PARTITION_MONTHS_AHEAD,
+            help="Number of months after the current one to create partitions for.",
+        )
+        parser.add_argument(
+            '--retention-months', type=int, default=settings.HISTORY_PARTITION_RETENTION_MONTHS,
+            help="Number of past months to keep attached, 0 keeps every partition.",
+        )
+        parser.add_argument(
+            '--drop', action='store_true',
+            help="Drop expired partitions instead of leaving them as standalone tables.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if not is_partitioned(connection):
+            self.stdout.write('The currency exchange history is not partitioned, nothing to do.')
+            return
+
+        today = timezone.now().date()
+
+        with transaction.atomic():
+            created = create_future_partitions(connection, today, options['months_ahead'])
+
+            removed = []
+            if options['retention_months'] > 0:
+                removed = remove_expired_partitions(
+                    connection, today, options['retention_months'], drop=options['drop'],
+                )
+
+        for month in created:
+            self.stdout.write(f'Created partition of {month:%Y-%m}.')
+        for partition in removed:
+            self.stdout.write(f'{"Dropped" if options["drop"] else "Detached"} partition {partition.name}.')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(created)} and removed {len(removed)} history partitions.'
+        ))
@@ -0,0 +1,32 @@
+"""
+Django command to recompute daily statistics of currency exchange records.
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.currency_exchange.services import rebuild_daily_rollups
+
+
+class Command(BaseCommand):
+    """Django command that rebuilds daily rollups from the currency exchange records."""
+
+    help = (
+        "Recomputes the daily rollups of recent days from the currency exchange records. "
+        "Rollups are maintained as records are created, so this is only needed to repair them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since', type=date.fromisoformat,
+            help="First day (YYYY-MM-DD) to rebuild, yesterday by default.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        since = options['since'] or timezone.now().date() - timedelta(days=1)
+
+        created = rebuild_daily_rollups(since)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} daily rollups since {since}.'))
@@ -0,0 +1,70 @@
+"""
+Django command to periodically store snapshots of the upstream rate table.
+"""
+import time
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.currency_exchange.client import UpstreamError
+from apps.currency_exchange.services import prune_rate_snapshots, refresh_rate_snapshot
+
+
+class Command(BaseCommand):
+    """Django command that keeps rate snapshots up to date, so the request path never calls upstream."""
+
+    help = (
+        "Periodically fetches the full rate table from upstream and stores it as a rate snapshot, "
+        "deleting the snapshots older than EXCHANGE_RATE_SNAPSHOT_RETENTION_DAYS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=settings.EXCHANGE_RATE_SNAPSHOT_REFRESH_INTERVAL,
+            help="Seconds between two fetches.",
+        )
+        parser.add_argument('--once', action='store_true', help="Store a single snapshot and exit.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        interval = options['interval']
+
+        while True:
+            started_at = time.monotonic()
+            self.refresh()
+            self.prune()
+
+            if options['once']:
+                break
+
+            time.sleep(max(0.0, interval - (time.monotonic() - started_at)))
+
+    def refresh(self):
+        try:
+            snapshot = refresh_rate_snapshot()
+        except UpstreamError as e:
+            self.stderr.write(f'Failed to fetch the rate table: {e}')
+            return
+        except DatabaseError as e:  # E.g. migrations haven't been applied yet
+            self.stderr.write(f'Failed to store the rate snapshot: {e}')
+            return
+
+        if snapshot is None:
+            self.stderr.write('Upstream did not return the rate table.')
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored snapshot of {len(snapshot.rates)} rates against {snapshot.base_code}.'
+        ))
+
+    def prune(self):
+        try:
+            deleted = prune_rate_snapshots(timezone.now(), settings.EXCHANGE_RATE_SNAPSHOT_RETENTION_DAYS)
+        except DatabaseError as e:
+            self.stderr.write(f'Failed to delete the expired rate snapshots: {e}')
+            return
+
+        if deleted:
+            self.stdout.write(f'Deleted {deleted} expired rate snapshots.')
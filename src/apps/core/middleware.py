@@ -0,0 +1,80 @@
+from typing import Iterable, Iterator
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest, HttpResponseBase
+from rest_framework.permissions import SAFE_METHODS
+
+from .db_routers import ReplicaReads, apin_to_primary, pin_to_primary, use_replica_reads
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets the reads of the safe requests to REPLICA_READ_PATHS go to the replicas,
+    and pins the users whose requests have written something to the primary for a while.
+    Not used when there are no replicas.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        replica_reads = self._get_replica_reads(request)
+        if replica_reads is None:
+            response = self.get_response(request)
+        else:
+            with use_replica_reads(replica_reads):
+                response = self.get_response(request)
+            if response.streaming and not response.is_async:
+                # Streamed content (e.g. history exports) is read from the DB after the view has returned
+                response.streaming_content = _stream_with_replica_reads(replica_reads, response.streaming_content)
+
+        if self._has_written(request, response):
+            pin_to_primary(request.user.id)
+
+        return response
+
+    async def __acall__(self, request: HttpRequest):
+        replica_reads = self._get_replica_reads(request)
+        if replica_reads is None:
+            response = await self.get_response(request)
+        else:
+            with use_replica_reads(replica_reads):
+                response = await self.get_response(request)
+
+        if self._has_written(request, response):
+            await apin_to_primary(request.user.id)
+
+        return response
+
+    @staticmethod
+    def _get_replica_reads(request: HttpRequest):
+        if request.method in SAFE_METHODS and request.path.startswith(tuple(settings.REPLICA_READ_PATHS)):
+            return ReplicaReads(request)
+        return None
+
+    @staticmethod
+    def _has_written(request: HttpRequest, response: HttpResponseBase) -> bool:
+        # Failed requests are assumed to have written nothing, the user is checked last
+        # as it may be a lazy object that would have to be loaded
+        return (
+            (request.method not in SAFE_METHODS or getattr(request, 'has_written', False))
+            and response.status_code < 400
+            and request.user.is_authenticated
+        )
+
+
+def _stream_with_replica_reads(replica_reads: ReplicaReads, content: Iterable[bytes]) -> Iterator[bytes]:
+    with use_replica_reads(replica_reads):
+        yield from content
@@ -1,10 +1,17 @@
 from django.contrib import admin
 
-from .models import CurrencyExchange
+from .models import Currency, CurrencyExchange
+
+
+@admin.register(Currency)
+class CurrencyAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name', 'minor_units', )
+    search_fields = ('code', 'name', )
+
 
 @admin.register(CurrencyExchange)
 class ModelNameAdmin(admin.ModelAdmin):
-    list_filter = ('created_at', 'currency_code')
+    list_filter = ('created_at', 'currency')
     list_display = ('__str__', 'currency_code', 'rate', 'user', )
 
     def get_queryset(self, request):
@@ -0,0 +1,296 @@
+"""
+HTTP client for ExchangeRate-API.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from functools import cache
+from typing import Callable, Optional
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamError(Exception):
+    """
+    Raised when the upstream API is unavailable, so it's unknown whether the request is valid.
+    """
+
+
+class CircuitOpenError(UpstreamError):
+    """
+    Raised without calling the upstream API while it's considered degraded.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stops calling the upstream after ``failure_threshold`` consecutive failures.
+
+    After ``reset_timeout`` seconds a single trial request is let through,
+    its success closes the circuit and its failure opens it again.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+
+            # Either open, or half-open with the trial request still in flight
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = self._clock()
+
+
+class ExchangeRateApiClient:
+    """
+    Calls ExchangeRate-API through a pool of keep-alive connections.
+
+    Every request is bounded by connect and read timeouts.
+    Connection errors, timeouts, 429 and 5xx responses are retried with jittered exponential backoff,
+    and count as a single failure of the circuit breaker once retries are exhausted.
+    """
+    RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(
+            self,
+            base_url: str,
+            api_key: str,
+            connect_timeout: float,
+            read_timeout: float,
+            max_retries: int,
+            retry_backoff: float,
+            pool_size: int,
+            circuit_breaker: CircuitBreaker,
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.circuit_breaker = circuit_breaker
+
+        self.session = requests.Session()
+        # Retries are made by the client itself, so the adapter must not retry on its own
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get_conversion_rates(self, base_code: str) -> Optional[dict[str, float]]:
+        """
+        Returns conversion rates of all currencies against the given base currency,
+        or None if the upstream rejected the currency code.
+        Raises UpstreamError if the upstream is unavailable.
+        """
+        data = self._get(f'latest/{base_code}')
+        if data is None:
+            return None
+
+        return data['conversion_rates']
+
+    def _get(self, path: str) -> Optional[dict]:
+        if not self.circuit_breaker.allow_request():
+            raise CircuitOpenError("ExchangeRate-API is degraded, the request wasn't made")
+
+        try:
+            response = self._get_with_retries(f'{self.base_url}/{self.api_key}/{path}')
+        except BaseException:
+            # Not only upstream errors: any exception (invalid URL, worker timeout...) must end a half-open trial,
+            # or the circuit would never close again
+            self.circuit_breaker.record_failure()
+            raise
+
+        # The upstream is healthy even if it rejected the request (e.g. unsupported currency code)
+        self.circuit_breaker.record_success()
+
+        if response.status_code != 200:
+            return None
+
+        return response.json()
+
+    def _get_with_retries(self, url: str) -> requests.Response:
+        attempt = 0
+        while True:
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                if response.status_code not in self.RETRYABLE_STATUS_CODES:
+                    return response
+                error = UpstreamError(f"ExchangeRate-API responded with {response.status_code}")
+            except requests.RequestException as e:
+                error = UpstreamError(f"ExchangeRate-API request failed: {e}")
+
+            if attempt >= self.max_retries:
+                raise error
+
+            attempt += 1
+            logger.warning("%s, retrying (%d/%d)", error, attempt, self.max_retries)
+            time.sleep(random.uniform(0, self.retry_backoff * 2 ** attempt))
+
+
+class AsyncExchangeRateApiClient:
+    """
+    Non-blocking counterpart of ``ExchangeRateApiClient`` for async views, with the same timeouts,
+    retries and circuit breaker. Calls in flight only hold a connection of the pool, not a worker.
+    """
+    RETRYABLE_STATUS_CODES = ExchangeRateApiClient.RETRYABLE_STATUS_CODES
+
+    def __init__(
+            self,
+            base_url: str,
+            api_key: str,
+            connect_timeout: float,
+            read_timeout: float,
+            max_retries: int,
+            retry_backoff: float,
+            pool_size: int,
+            circuit_breaker: CircuitBreaker,
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.circuit_breaker = circuit_breaker
+
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def get_conversion_rates(self, base_code: str) -> Optional[dict[str, float]]:
+        """
+        Returns conversion rates of all currencies against the given base currency,
+        or None if the upstream rejected the currency code.
+        Raises UpstreamError if the upstream is unavailable.
+        """
+        data = await self._get(f'latest/{base_code}')
+        if data is None:
+            return None
+
+        return data['conversion_rates']
+
+    async def _get(self, path: str) -> Optional[dict]:
+        if not self.circuit_breaker.allow_request():
+            raise CircuitOpenError("ExchangeRate-API is degraded, the request wasn't made")
+
+        try:
+            response = await self._get_with_retries(f'{self.base_url}/{self.api_key}/{path}')
+        except BaseException:
+            # Including the cancellation of the awaiting task, see ExchangeRateApiClient._get
+            self.circuit_breaker.record_failure()
+            raise
+
+        # The upstream is healthy even if it rejected the request (e.g. unsupported currency code)
+        self.circuit_breaker.record_success()
+
+        if response.status_code != 200:
+            return None
+
+        return response.json()
+
+    async def _get_with_retries(self, url: str) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.get(url)
+                if response.status_code not in self.RETRYABLE_STATUS_CODES:
+                    return response
+                error = UpstreamError(f"ExchangeRate-API responded with {response.status_code}")
+            except httpx.HTTPError as e:
+                error = UpstreamError(f"ExchangeRate-API request failed: {e!r}")
+
+            if attempt >= self.max_retries:
+                raise error
+
+            attempt += 1
+            logger.warning("%s, retrying (%d/%d)", error, attempt, self.max_retries)
+            await asyncio.sleep(random.uniform(0, self.retry_backoff * 2 ** attempt))
+
+
+@cache
+def get_circuit_breaker() -> CircuitBreaker:
+    """
+    Returns the circuit breaker shared by the sync and async clients of the process.
+    """
+    return CircuitBreaker(
+        failure_threshold=settings.EXCHANGE_RATE_API_CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout=settings.EXCHANGE_RATE_API_CIRCUIT_RESET_TIMEOUT,
+    )
+
+
+@cache
+def get_upstream_client() -> ExchangeRateApiClient:
+    """
+    Returns the client shared by all threads of the process, so they share its connection pool.
+    """
+    return ExchangeRateApiClient(
+        base_url=settings.EXCHANGE_RATE_API_URL,
+        api_key=settings.EXCHANGE_RATE_API_KEY,
+        connect_timeout=settings.EXCHANGE_RATE_API_CONNECT_TIMEOUT,
+        read_timeout=settings.EXCHANGE_RATE_API_READ_TIMEOUT,
+        max_retries=settings.EXCHANGE_RATE_API_MAX_RETRIES,
+        retry_backoff=settings.EXCHANGE_RATE_API_RETRY_BACKOFF,
+        pool_size=settings.EXCHANGE_RATE_API_POOL_SIZE,
+        circuit_breaker=get_circuit_breaker(),
+    )
+
+
+# Connections of an async client can only be used by the event loop that opened them
+_async_upstream_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncExchangeRateApiClient] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_upstream_client() -> AsyncExchangeRateApiClient:
+    """
+    Returns the async client of the running event loop, shared by all requests it serves.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_upstream_clients.get(loop)
+    if client is None:
+        client = _async_upstream_clients[loop] = AsyncExchangeRateApiClient(
+            base_url=settings.EXCHANGE_RATE_API_URL,
+            api_key=settings.EXCHANGE_RATE_API_KEY,
+            connect_timeout=settings.EXCHANGE_RATE_API_CONNECT_TIMEOUT,
+            read_timeout=settings.EXCHANGE_RATE_API_READ_TIMEOUT,
+            max_retries=settings.EXCHANGE_RATE_API_MAX_RETRIES,
+            retry_backoff=settings.EXCHANGE_RATE_API_RETRY_BACKOFF,
+            pool_size=settings.EXCHANGE_RATE_API_ASYNC_POOL_SIZE,
+            circuit_breaker=get_circuit_breaker(),
+        )
+
+    return client
@@ -0,0 +1,165 @@
+"""
+Conversion of amounts between any two currencies with NumPy.
+"""
+import csv
+import threading
+from itertools import islice
+from typing import Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+
+from .services import CrossRateTable, _Echo, get_rate_table
+from .snapshot_store import MmapRateTable
+
+
+class UnsupportedCurrencyError(ValueError):
+    def __init__(self, codes: list[str]):
+        super().__init__(f"Unsupported currency codes: {', '.join(codes)}")
+        self.codes = codes
+
+
+class RateVector:
+    """
+    Rates of every currency against the base currency of a rate table, with the position of each currency.
+
+    Currency codes of a batch are resolved to positions in one pass, the conversion itself
+    is then a few array operations over the whole batch instead of a Python loop.
+    """
+    __slots__ = ('base_code', 'codes', 'rates', '_index')
+
+    def __init__(self, base_code: str, codes: Sequence[str], rates: Sequence[float]):
+        self.base_code = base_code
+        self.codes = tuple(codes)
+        self.rates = np.asarray(rates, dtype=np.float64)
+        self._index = {code: position for position, code in enumerate(self.codes)}
+
+    @classmethod
+    def from_table(cls, table: CrossRateTable | MmapRateTable) -> 'RateVector':
+        base_code = table.base_code
+        codes = table.codes
+        return cls(base_code, codes, [table.rate(base_code, code) for code in codes])
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def positions(self, *code_batches: Sequence[str]) -> list[np.ndarray]:
+        """
+        Returns the positions of the currencies of each batch in the vector,
+        raises UnsupportedCurrencyError listing the unknown codes of all batches.
+        """
+        positions = []
+        unknown_codes = set()
+        for codes in code_batches:
+            try:
+                positions.append(np.fromiter(map(self._index.__getitem__, codes), dtype=np.intp, count=len(codes)))
+            except (KeyError, TypeError):
+                unknown_codes.update(code for code in codes if code not in self._index)
+
+        if unknown_codes:
+            raise UnsupportedCurrencyError(sorted(map(str, unknown_codes)))
+
+        return positions
+
+    def positions_or_missing(self, codes: Sequence[str]) -> np.ndarray:
+        """
+        Returns the positions of the currencies in the vector, -1 for unknown ones.
+        """
+        return np.fromiter(map(self._index.get, codes, [-1] * len(codes)), dtype=np.intp, count=len(codes))
+
+    def convert(self, from_codes: Sequence[str], to_codes: Sequence[str], amounts: Sequence[float]) -> np.ndarray:
+        """
+        Converts each amount from the currency at the same position of ``from_codes`` to the one of ``to_codes``.
+        """
+        from_positions, to_positions = self.positions(from_codes, to_codes)
+        return np.asarray(amounts, dtype=np.float64) * self.rates[to_positions] / self.rates[from_positions]
+
+    def rate(self, from_code: str, to_code: str) -> float:
+        (from_position,), (to_position,) = self.positions([from_code], [to_code])
+        return float(self.rates[to_position] / self.rates[from_position])
+
+
+class RateVectorCache:
+    """
+    Keeps the vector of the current rate table, it's rebuilt only when the backend returns another table.
+    """
+    def __init__(self):
+        self._table: Optional[CrossRateTable | MmapRateTable] = None
+        self._vector: Optional[RateVector] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[RateVector]:
+        table = get_rate_table()
+        if table is None:
+            return None
+
+        with self._lock:
+            if table is not self._table:
+                self._vector = RateVector.from_table(table)
+                self._table = table
+
+            return self._vector
+
+    def clear(self) -> None:
+        with self._lock:
+            self._table = None
+            self._vector = None
+
+
+rate_vector_cache = RateVectorCache()
+
+
+def get_rate_vector() -> Optional[RateVector]:
+    return rate_vector_cache.get()
+
+
+CSV_CONVERSION_COLUMNS = ('amount', 'from_currency', 'to_currency')
+
+
+def stream_converted_csv(lines: Iterable[str], rate_vector: RateVector, chunk_size: int) -> Iterator[str]:
+    """
+    Streams the CSV rows back with the converted amount (or the reason it couldn't be converted) appended.
+
+    Rows are read and converted ``chunk_size`` at a time against the same rate vector,
+    so memory use depends on the chunk size, not on the size of the file.
+    The header must have been validated with ``missing_csv_columns``.
+    """
+    reader = csv.reader(lines)
+    writer = csv.writer(_Echo())
+
+    header = next(reader)
+    amount_column, from_column, to_column = (header.index(column) for column in CSV_CONVERSION_COLUMNS)
+    yield writer.writerow([*header, 'converted_amount', 'error'])
+
+    while chunk := list(islice(reader, chunk_size)):
+        amounts = np.full(len(chunk), np.nan)
+        from_codes = []
+        to_codes = []
+        for position, row in enumerate(chunk):
+            try:
+                from_code, to_code = row[from_column], row[to_column]
+                amounts[position] = float(row[amount_column])
+            except (IndexError, ValueError):  # The amount is left NaN
+                from_code = to_code = ''
+            from_codes.append(from_code)
+            to_codes.append(to_code)
+
+        from_positions = rate_vector.positions_or_missing(from_codes)
+        to_positions = rate_vector.positions_or_missing(to_codes)
+        valid = np.isfinite(amounts) & (from_positions >= 0) & (to_positions >= 0)
+        # Invalid rows are converted with the rate at position -1 too, their results are never written
+        converted_amounts = np.round(amounts * rate_vector.rates[to_positions] / rate_vector.rates[from_positions], 2)
+
+        output = []
+        has_amount = np.isfinite(amounts).tolist()
+        for row, is_valid, converted_amount, is_amount in zip(chunk, valid.tolist(), converted_amounts.tolist(), has_amount):
+            if is_valid:
+                output.append(writer.writerow([*row, f'{converted_amount:.2f}', '']))
+            elif is_amount:
+                output.append(writer.writerow([*row, '', 'Unsupported currency code']))
+            else:
+                output.append(writer.writerow([*row, '', 'Invalid amount']))
+        yield ''.join(output)
+
+
+def missing_csv_columns(header: Sequence[str]) -> list[str]:
+    return [column for column in CSV_CONVERSION_COLUMNS if column not in header]
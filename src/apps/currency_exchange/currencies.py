@@ -0,0 +1,102 @@
+"""
+In-memory map between currency codes and ids of the Currency table.
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+from django.apps import apps
+
+
+class UnknownCurrencyError(ValueError):
+    def __init__(self, code: str):
+        super().__init__(f"Unknown currency code: {code}")
+        self.code = code
+
+
+class CurrencyRegistry:
+    """
+    Maps currency codes to Currency ids and back without querying the DB on every lookup.
+
+    Currencies are never deleted or renumbered, so the map never goes stale, it's only reloaded
+    when an id isn't known yet (e.g. a currency added by another worker).
+    A code that isn't known yet is looked up on its own, and remembered as missing for ``miss_ttl`` seconds,
+    so a stream of unknown codes (e.g. in history filters) doesn't query the DB for each of them.
+    """
+    # Bounds the memory taken by the unknown codes remembered at once
+    MAX_MISSES = 1_000
+
+    def __init__(self, miss_ttl: float = 60, clock: Callable[[], float] = time.monotonic):
+        self.miss_ttl = miss_ttl
+        self._clock = clock
+        self._ids: dict[str, int] = {}
+        self._codes: dict[int, str] = {}
+        self._misses: dict[str, float] = {}  # Code -> when it may be looked up again
+        self._lock = threading.Lock()
+
+    def get_id(self, code: str, use_misses: bool = True) -> Optional[int]:
+        """
+        Returns the id of the currency, or None if there's no such currency.
+        ``use_misses=False`` looks the code up even if it was recently found missing.
+        """
+        if not self._ids:
+            self._load()
+
+        currency_id = self._ids.get(code)
+        if currency_id is not None:
+            return currency_id
+
+        if use_misses and self._misses.get(code, 0) > self._clock():
+            return None
+
+        Currency = apps.get_model('currency_exchange', 'Currency')
+        currency_id = Currency.objects.filter(code=code).values_list('id', flat=True).first()
+        if currency_id is None:
+            with self._lock:
+                if len(self._misses) >= self.MAX_MISSES:
+                    self._misses = {}
+                self._misses[code] = self._clock() + self.miss_ttl
+        else:
+            self._remember({code: currency_id})
+
+        return currency_id
+
+    def get_code(self, currency_id: int) -> str:
+        code = self._codes.get(currency_id)
+        if code is None:
+            self._load()
+            code = self._codes[currency_id]
+
+        return code
+
+    def register(self, codes: list[str]) -> None:
+        """
+        Adds the currencies missing from the Currency table (e.g. new currencies of a rate table).
+        """
+        missing = [code for code in codes if code not in self._ids]
+        if not missing:
+            return
+
+        Currency = apps.get_model('currency_exchange', 'Currency')
+        Currency.objects.bulk_create([Currency(code=code, name=code) for code in missing], ignore_conflicts=True)
+        self._load()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids = {}
+            self._codes = {}
+            self._misses = {}
+
+    def _load(self) -> None:
+        Currency = apps.get_model('currency_exchange', 'Currency')
+        self._remember(dict(Currency.objects.values_list('code', 'id')))
+
+    def _remember(self, ids: dict[str, int]) -> None:
+        # Maps are replaced rather than updated, so lookups from other threads never see them half-updated
+        with self._lock:
+            self._ids = {**self._ids, **ids}
+            self._codes = {**self._codes, **{currency_id: code for code, currency_id in ids.items()}}
+            self._misses = {code: until for code, until in self._misses.items() if code not in ids}
+
+
+currency_registry = CurrencyRegistry()
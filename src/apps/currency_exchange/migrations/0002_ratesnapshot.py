@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currency_exchange', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base_code', models.CharField(max_length=10)),
+                ('rates', models.JSONField()),
+                ('fetched_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currency_exchange', '0002_ratesnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # The composite indexes are created before the ones they replace are dropped
+        migrations.AddIndex(
+            model_name='currencyexchange',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='exchange_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='currencyexchange',
+            index=models.Index(fields=['user', 'currency_code', '-created_at', '-id'], name='exchange_user_code_created_idx'),
+        ),
+        migrations.AlterField(
+            model_name='currencyexchange',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name='currencyexchange',
+            name='currency_code',
+            field=models.CharField(max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='currencyexchange',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currency_exchange', '0003_history_composite_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurrencyExchangeDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency_code', models.CharField(max_length=10)),
+                ('day', models.DateField()),
+                ('records_count', models.PositiveIntegerField()),
+                ('min_rate', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('max_rate', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('rate_sum', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('last_rate', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('last_created_at', models.DateTimeField()),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-day'], name='exchange_rollup_user_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'currency_code', 'day'), name='exchange_rollup_user_code_day_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,101 @@
+from datetime import date, datetime, UTC
+
+from django.db import migrations
+
+# The schema and SQL as of this migration, so later changes of apps.currency_exchange.partitions don't affect it
+TABLE = 'currency_exchange_currencyexchange'
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_currency_exchange(apps, schema_editor):
+    """
+    Rebuilds the currency exchange table as a table partitioned by month of created_at.
+    Only PostgreSQL supports declarative partitioning, other databases keep the plain table.
+
+    The rows are copied into the new table while the old one is locked (ACCESS EXCLUSIVE, from the rename on),
+    so the history can't be read or written until the migration is committed.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        # The name of the foreign key generated by Django depends on the migration history of the DB
+        cursor.execute(
+            "SELECT conname FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND confrelid = 'accounts_account'::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        row = cursor.fetchone()
+        user_fk_name = row[0] if row is not None else f'{TABLE}_user_id_fk'
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{TABLE}_old"')
+        cursor.execute(f'ALTER INDEX "{TABLE}_pkey" RENAME TO "{TABLE}_old_pkey"')
+        cursor.execute('ALTER INDEX "exchange_user_created_idx" RENAME TO "exchange_user_created_old_idx"')
+        cursor.execute('ALTER INDEX "exchange_user_code_created_idx" RENAME TO "exchange_user_code_created_old_idx"')
+
+        # The partition key has to be a part of the primary key
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" ('
+            f'"id" bigint NOT NULL GENERATED BY DEFAULT AS IDENTITY, '
+            f'"currency_code" varchar(10) NOT NULL, '
+            f'"rate" numeric(10, 2) NOT NULL, '
+            f'"created_at" timestamp with time zone NOT NULL, '
+            f'"user_id" bigint NOT NULL, '
+            f'PRIMARY KEY ("id", "created_at")'
+            f') PARTITION BY RANGE ("created_at")'
+        )
+        cursor.execute(f'CREATE TABLE "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT')
+
+        # The table is still empty, so the monthly partitions can be created right away
+        cursor.execute(f'SELECT min("created_at"), now() FROM "{TABLE}_old"')
+        oldest, now = cursor.fetchone()
+        month = (oldest or now).date().replace(day=1)
+        last_month = add_months(now.date().replace(day=1), 3)
+        while month <= last_month:
+            cursor.execute(
+                f'CREATE TABLE "{TABLE}_p{month.year:04d}_{month.month:02d}" PARTITION OF "{TABLE}" '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [
+                    datetime.combine(month, datetime.min.time(), tzinfo=UTC),
+                    datetime.combine(add_months(month, 1), datetime.min.time(), tzinfo=UTC),
+                ],
+            )
+            month = add_months(month, 1)
+
+        cursor.execute(
+            f'INSERT INTO "{TABLE}" ("id", "currency_code", "rate", "created_at", "user_id") '
+            f'SELECT "id", "currency_code", "rate", "created_at", "user_id" FROM "{TABLE}_old"'
+        )
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('\"{TABLE}\"', 'id'), "
+            f'coalesce((SELECT max("id") FROM "{TABLE}"), 0) + 1, false)'
+        )
+        cursor.execute(f'DROP TABLE "{TABLE}_old"')
+
+        cursor.execute(
+            f'CREATE INDEX "exchange_user_created_idx" ON "{TABLE}" ("user_id", "created_at" DESC, "id" DESC)'
+        )
+        cursor.execute(
+            f'CREATE INDEX "exchange_user_code_created_idx" '
+            f'ON "{TABLE}" ("user_id", "currency_code", "created_at" DESC, "id" DESC)'
+        )
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{user_fk_name}" '
+            f'FOREIGN KEY ("user_id") REFERENCES "accounts_account" ("id") DEFERRABLE INITIALLY DEFERRED'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currency_exchange', '0004_currencyexchangedailyrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_currency_exchange, migrations.RunPython.noop),
+    ]
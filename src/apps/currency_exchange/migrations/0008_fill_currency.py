@@ -0,0 +1,30 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def fill_currency(apps, schema_editor):
+    """
+    Points every record to the currency of its code, adding the currencies that aren't known yet.
+    """
+    Currency = apps.get_model('currency_exchange', 'Currency')
+
+    for model_name in ('CurrencyExchange', 'CurrencyExchangeArchive'):
+        model = apps.get_model('currency_exchange', model_name)
+
+        codes = model.objects.values_list('currency_code', flat=True).distinct()
+        Currency.objects.bulk_create([Currency(code=code, name=code) for code in codes], ignore_conflicts=True)
+
+        model.objects.update(
+            currency_id=Subquery(Currency.objects.filter(code=OuterRef('currency_code')).values('id')[:1]),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currency_exchange', '0007_currency'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_currency, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currency_exchange', '0008_fill_currency'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='currencyexchange',
+            name='exchange_user_code_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='currencyexchangearchive',
+            name='exchange_archive_user_code_idx',
+        ),
+        migrations.RemoveField(
+            model_name='currencyexchange',
+            name='currency_code',
+        ),
+        migrations.RemoveField(
+            model_name='currencyexchangearchive',
+            name='currency_code',
+        ),
+        migrations.AlterField(
+            model_name='currencyexchange',
+            name='currency',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='currency_exchange.currency'),
+        ),
+        migrations.AlterField(
+            model_name='currencyexchangearchive',
+            name='currency',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='currency_exchange.currency'),
+        ),
+        migrations.AddIndex(
+            model_name='currencyexchange',
+            index=models.Index(fields=['user', 'currency', '-created_at', '-id'], name='exchange_user_code_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='currencyexchangearchive',
+            index=models.Index(fields=['user', 'currency', '-created_at', '-id'], name='exchange_archive_user_code_idx'),
+        ),
+    ]
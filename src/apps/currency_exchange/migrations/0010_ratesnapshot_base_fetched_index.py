@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currency_exchange', '0009_remove_currency_code'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ratesnapshot',
+            name='fetched_at',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AddIndex(
+            model_name='ratesnapshot',
+            index=models.Index(fields=['base_code', '-fetched_at', '-id'], name='rate_snapshot_base_fetched_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currency_exchange', '0010_ratesnapshot_base_fetched_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='currencyexchangedailyrollup',
+            name='currency',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='currency_exchange.currency'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def fill_currency(apps, schema_editor):
+    """
+    Points every daily rollup to the currency of its code, adding the currencies that aren't known yet.
+    """
+    Currency = apps.get_model('currency_exchange', 'Currency')
+    CurrencyExchangeDailyRollup = apps.get_model('currency_exchange', 'CurrencyExchangeDailyRollup')
+
+    codes = CurrencyExchangeDailyRollup.objects.values_list('currency_code', flat=True).distinct()
+    Currency.objects.bulk_create([Currency(code=code, name=code) for code in codes], ignore_conflicts=True)
+
+    CurrencyExchangeDailyRollup.objects.update(
+        currency_id=Subquery(Currency.objects.filter(code=OuterRef('currency_code')).values('id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currency_exchange', '0011_currencyexchangedailyrollup_currency'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_currency, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currency_exchange', '0012_fill_rollup_currency'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='currencyexchangedailyrollup',
+            name='exchange_rollup_user_code_day_uniq',
+        ),
+        migrations.RemoveField(
+            model_name='currencyexchangedailyrollup',
+            name='currency_code',
+        ),
+        migrations.AlterField(
+            model_name='currencyexchangedailyrollup',
+            name='currency',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='currency_exchange.currency'),
+        ),
+        migrations.AddConstraint(
+            model_name='currencyexchangedailyrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'currency', 'day'), name='exchange_rollup_user_code_day_uniq'),
+        ),
+    ]
@@ -1,15 +1,125 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .currencies import UnknownCurrencyError, currency_registry
+
 
 Account = get_user_model()
 
 
-class CurrencyExchange(models.Model):
-    user = models.ForeignKey(Account, on_delete=models.CASCADE)
-    currency_code = models.CharField(max_length=10, db_index=True) # Indexed for faster filtering in request history route.
+class Currency(models.Model):
+    """
+    Currency referenced by its smallint id from the currency exchange records.
+    Rows are never deleted or renumbered, so ids can be mapped to codes in memory, see CurrencyRegistry.
+    """
+    id = models.SmallAutoField(primary_key=True)
+    code = models.CharField(max_length=10, unique=True)  # ISO 4217 code
+    name = models.CharField(max_length=64)
+    minor_units = models.PositiveSmallIntegerField(default=2)
+
+    class Meta:
+        verbose_name_plural = 'currencies'
+
+    def __str__(self):
+        return self.code
+
+
+class CurrencyCodeMixin:
+    """
+    Exposes the code of the currency referenced by the record, without querying the currency.
+    """
+    @property
+    def currency_code(self) -> str:
+        return currency_registry.get_code(self.currency_id)
+
+    @currency_code.setter
+    def currency_code(self, value: str):
+        # Currencies are only added from the rate tables (see refresh_rate_snapshot), never by a record
+        currency_id = currency_registry.get_id(value, use_misses=False)
+        if currency_id is None:
+            raise UnknownCurrencyError(value)
+        self.currency_id = currency_id
+
+
+class CurrencyExchange(CurrencyCodeMixin, models.Model):
+    user = models.ForeignKey(Account, on_delete=models.CASCADE, db_index=False) # Covered by the composite indexes below.
+    currency = models.ForeignKey(Currency, on_delete=models.PROTECT, db_index=False) # Covered by the composite index below.
     rate = models.DecimalField(max_digits=10, decimal_places=2)
-    created_at = models.DateTimeField(auto_now_add=True, db_index=True) # Indexed for faster filtering in request history route.
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # Match the request history route: always filtered by user, optionally by currency
+        # and created_at range, ordered by -created_at (and -id as a tie-breaker).
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='exchange_user_created_idx'),
+            models.Index(fields=['user', 'currency', '-created_at', '-id'], name='exchange_user_code_created_idx'),
+        ]
 
     def __str__(self):
         return f'Currency exchange from {self.currency_code} to UAH Owner ID - {self.user_id}'
+
+
+class CurrencyExchangeArchive(CurrencyCodeMixin, models.Model):
+    """
+    Currency exchange records moved out of the hot table by the archive_exchange_history command.
+    Columns are the same as the ones of CurrencyExchange (in the same order), so both tables can be queried together.
+    """
+    id = models.BigIntegerField(primary_key=True)  # Id of the record in the hot table
+    user = models.ForeignKey(Account, on_delete=models.CASCADE, db_index=False) # Covered by the composite indexes below.
+    currency = models.ForeignKey(Currency, on_delete=models.PROTECT, db_index=False) # Covered by the composite index below.
+    rate = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='exchange_archive_user_idx'),
+            models.Index(fields=['user', 'currency', '-created_at', '-id'], name='exchange_archive_user_code_idx'),
+        ]
+
+    def __str__(self):
+        return f'Archived currency exchange from {self.currency_code} to UAH Owner ID - {self.user_id}'
+
+
+class RateSnapshot(models.Model):
+    """
+    Full rate table fetched from upstream, one row per fetch.
+    """
+    base_code = models.CharField(max_length=10)
+    rates = models.JSONField()  # Currency code -> rate against the base currency
+    fetched_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Latest snapshot and snapshot at a given time, rates over a time range
+            models.Index(fields=['base_code', '-fetched_at', '-id'], name='rate_snapshot_base_fetched_idx'),
+        ]
+
+    def __str__(self):
+        return f'Rates against {self.base_code} fetched at {self.fetched_at}'
+
+
+class CurrencyExchangeDailyRollup(CurrencyCodeMixin, models.Model):
+    """
+    Statistics of a user's currency exchange records per currency and day (UTC),
+    maintained as the records are created.
+    """
+    user = models.ForeignKey(Account, on_delete=models.CASCADE, db_index=False) # Covered by the indexes below.
+    currency = models.ForeignKey(Currency, on_delete=models.PROTECT, db_index=False) # Covered by the unique constraint below.
+    day = models.DateField()
+    records_count = models.PositiveIntegerField()
+    min_rate = models.DecimalField(max_digits=10, decimal_places=2)
+    max_rate = models.DecimalField(max_digits=10, decimal_places=2)
+    rate_sum = models.DecimalField(max_digits=20, decimal_places=2)
+    last_rate = models.DecimalField(max_digits=10, decimal_places=2)
+    last_created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'currency', 'day'], name='exchange_rollup_user_code_day_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-day'], name='exchange_rollup_user_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.currency_code} statistics for {self.day} Owner ID - {self.user_id}'
@@ -1,4 +1,15 @@
-from rest_framework.pagination import PageNumberPagination
+import contextlib
+import heapq
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Optional
+from urllib import parse
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CurrencyExchangePagination(PageNumberPagination):
@@ -10,4 +21,120 @@ class CurrencyExchangePagination(PageNumberPagination):
         response = super().get_paginated_response(data)
         response.data['total_pages'] = self.page.paginator.num_pages
         response.data['current_page'] = self.page.number
-        return response
\ No newline at end of file
+        return response
+
+
+class CurrencyExchangeCursorPagination(BasePagination):
+    """
+    Keyset pagination of currency exchange records, newest first.
+
+    The cursor holds the (created_at, id) of the record the page starts after,
+    so every page is fetched by seeking the index directly, without OFFSET or COUNT(*).
+    Records may come from several querysets (e.g. the hot table and the archive), which are merged.
+    """
+    page_size = 15
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_querysets([queryset], request, view)
+
+    def paginate_querysets(self, querysets, request, view=None):
+        self.request = request
+        self.base_url = remove_query_param(request.build_absolute_uri(), 'page')
+        page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor[2]
+
+        seek = None
+        if cursor is not None:
+            created_at, record_id, _ = cursor
+            if reverse:
+                seek = Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=record_id)
+            else:
+                seek = Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=record_id)
+
+        ordering = ('created_at', 'id') if reverse else ('-created_at', '-id')
+        pages = []
+        for queryset in querysets:
+            if seek is not None:
+                queryset = queryset.filter(seek)
+            # One extra record tells whether there's one more page in the direction of the pagination
+            pages.append(list(queryset.order_by(*ordering)[:page_size + 1]))
+
+        records = list(heapq.merge(*pages, key=self._position, reverse=not reverse))[:page_size + 1]
+        has_more = len(records) > page_size
+        records = records[:page_size]
+
+        if reverse:
+            records.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+
+        self.next_position = self._position(records[-1]) if records and has_next else None
+        self.previous_position = self._position(records[0]) if records and has_previous else None
+
+        return records
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            with contextlib.suppress(KeyError, ValueError):
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+        return self.page_size
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(*self.next_position, reverse=False)
+
+    def get_previous_link(self) -> Optional[str]:
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(*self.previous_position, reverse=True)
+
+    def decode_cursor(self, request) -> Optional[tuple[datetime, int, bool]]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            tokens = parse.parse_qs(urlsafe_b64decode(encoded.encode('ascii')).decode('ascii'), strict_parsing=True)
+            created_at = datetime.fromisoformat(tokens['c'][0])
+            record_id = int(tokens['i'][0])
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return created_at, record_id, reverse
+
+    def encode_cursor(self, created_at: datetime, record_id: int, reverse: bool) -> str:
+        tokens = {'c': created_at.isoformat(), 'i': str(record_id)}
+        if reverse:
+            tokens['r'] = '1'
+
+        encoded = urlsafe_b64encode(parse.urlencode(tokens).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    @staticmethod
+    def _position(record) -> tuple[datetime, int]:
+        return record.created_at, record.id
+
+
+class RateHistoryPagination(CurrencyExchangePagination):
+    page_size = 100
+    max_page_size = 1000
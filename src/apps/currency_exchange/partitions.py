@@ -0,0 +1,146 @@
+"""
+Monthly range partitioning of the currency exchange table on created_at (PostgreSQL only).
+
+Each month lives in its own partition named ``<table>_pYYYY_MM``.
+A default partition catches rows outside the pre-created months,
+so inserts never fail if partitions weren't created in time.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, UTC
+
+TABLE = 'currency_exchange_currencyexchange'
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_NAME_PATTERN = re.compile(rf'^{TABLE}_p(\d{{4}})_(\d{{2}})$')
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    month: date  # First day of the month
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f'{TABLE}_p{month.year:04d}_{month.month:02d}'
+
+
+def is_partitioned(connection) -> bool:
+    if connection.vendor != 'postgresql':
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS ("
+            "SELECT 1 FROM pg_partitioned_table JOIN pg_class ON pg_class.oid = pg_partitioned_table.partrelid "
+            "WHERE pg_class.relname = %s AND pg_class.relnamespace = to_regnamespace(current_schema())::oid"
+            ")",
+            [TABLE],
+        )
+        return cursor.fetchone()[0]
+
+
+def list_partitions(connection) -> list[Partition]:
+    """
+    Returns the monthly partitions attached to the table, oldest first.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = %s AND parent.relnamespace = to_regnamespace(current_schema())::oid",
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME_PATTERN.match(name)
+        if match:
+            partitions.append(Partition(name=name, month=date(int(match[1]), int(match[2]), 1)))
+
+    return sorted(partitions, key=lambda partition: partition.month)
+
+
+def create_default_partition(cursor) -> None:
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+
+
+def create_partition(cursor, month: date) -> bool:
+    """
+    Creates the partition of the given month, unless it exists.
+    Rows of that month that landed in the default partition are moved into it.
+    Returns whether the partition was created.
+    """
+    name = partition_name(month)
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+    if cursor.fetchone()[0]:
+        return False
+
+    start = datetime.combine(month, datetime.min.time(), tzinfo=UTC)
+    end = datetime.combine(add_months(month, 1), datetime.min.time(), tzinfo=UTC)
+
+    # Creating the partition with PARTITION OF fails if the default partition holds rows of that month,
+    # so the partition is filled as a standalone table and attached afterwards.
+    cursor.execute(f'CREATE TABLE "{name}" (LIKE "{TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    cursor.execute(
+        f'WITH moved AS ('
+        f'DELETE FROM "{DEFAULT_PARTITION}" WHERE created_at >= %s AND created_at < %s RETURNING *'
+        f') INSERT INTO "{name}" SELECT * FROM moved',
+        [start, end],
+    )
+    cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)', [start, end])
+    return True
+
+
+def detach_partition(cursor, partition: Partition) -> None:
+    """
+    Detaches the partition, keeping its rows in a standalone table of the same name.
+    """
+    cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{partition.name}"')
+
+
+def drop_partition(cursor, partition: Partition) -> None:
+    cursor.execute(f'DROP TABLE "{partition.name}"')
+
+
+def create_future_partitions(connection, today: date, months_ahead: int) -> list[date]:
+    """
+    Creates the partitions of the current month and the next ``months_ahead`` months.
+    Returns the months whose partitions were created.
+    """
+    created = []
+    current = month_start(today)
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if create_partition(cursor, month):
+                created.append(month)
+
+    return created
+
+
+def remove_expired_partitions(connection, today: date, retention_months: int, drop: bool = False) -> list[Partition]:
+    """
+    Detaches (or drops) the partitions of months older than ``retention_months`` months before the current one.
+    Returns the removed partitions.
+    """
+    oldest_kept = add_months(month_start(today), -retention_months)
+    expired = [partition for partition in list_partitions(connection) if partition.month < oldest_kept]
+
+    with connection.cursor() as cursor:
+        for partition in expired:
+            detach_partition(cursor, partition)
+            if drop:
+                drop_partition(cursor, partition)
+
+    return expired
@@ -0,0 +1,146 @@
+"""
+Live rate updates pushed to the clients of the rate stream as server-sent events.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+from typing import AsyncIterator, Callable, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import RateSnapshot
+from .services import load_newer_rate_snapshot
+
+
+logger = logging.getLogger(__name__)
+
+RATE_STREAM_PAID_CACHE_KEY = 'rate_stream_paid:{user_id}'
+
+
+class RateBroadcaster:
+    """
+    Fans the new rate snapshots out to every subscriber of the worker.
+
+    A single poller per worker checks for a new snapshot while there are subscribers,
+    so an idle connection costs a queue and no DB queries of its own.
+    Each subscriber only keeps the latest snapshot, slow clients skip the ones they haven't sent yet.
+    """
+    def __init__(self, load: Callable[[Optional[int]], Optional[RateSnapshot]], poll_interval: float):
+        self._load = load
+        self.poll_interval = poll_interval
+        self._subscribers: set[asyncio.Queue] = set()
+        self._latest: Optional[RateSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue]:
+        queue = asyncio.Queue(maxsize=1)
+        if self._latest is not None:
+            queue.put_nowait(self._latest)
+        self._subscribers.add(queue)
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll())
+
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+            if not self._subscribers and self._task is not None:
+                self._task.cancel()
+                self._task = None
+                # Nobody checks for new snapshots until the next subscriber comes, so the latest one may become stale
+                self._latest = None
+
+    def publish(self, snapshot: RateSnapshot) -> None:
+        self._latest = snapshot
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(snapshot)
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                snapshot = await sync_to_async(self._load)(self._latest.id if self._latest is not None else None)
+            except Exception:
+                logger.exception("Failed to load the latest rate snapshot")
+            else:
+                if snapshot is not None:
+                    self.publish(snapshot)
+
+            await asyncio.sleep(self.poll_interval)
+
+
+def format_rate_event(snapshot: RateSnapshot, currency_codes: list[str]) -> str:
+    """
+    Returns the snapshot as a server-sent event, with the rates of the given currencies only if there are any.
+    """
+    rates = snapshot.rates
+    if currency_codes:
+        rates = {code: rates[code] for code in currency_codes if code in rates}
+
+    data = json.dumps({
+        "base_code": snapshot.base_code,
+        "fetched_at": snapshot.fetched_at.isoformat(),
+        "rates": rates,
+    })
+    return f'id: {snapshot.id}\nevent: rates\ndata: {data}\n\n'
+
+
+async def stream_rate_updates(
+        broadcaster: RateBroadcaster,
+        currency_codes: list[str],
+        last_event_id: Optional[str],
+        keepalive_interval: float,
+        max_duration: float,
+) -> AsyncIterator[str]:
+    """
+    Yields an event for the current snapshot and for every new one, until the max duration is reached.
+
+    The snapshot the client has already received (its Last-Event-ID) isn't sent again after a reconnect.
+    Comments are sent while nothing happens, so proxies don't close idle connections.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_duration
+
+    async with broadcaster.subscribe() as queue:
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                snapshot = await asyncio.wait_for(queue.get(), min(keepalive_interval, remaining))
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+
+            if str(snapshot.id) != last_event_id:
+                yield format_rate_event(snapshot, currency_codes)
+
+
+async def get_paid_stream_time(user_id: int, last_event_id: Optional[str], now: float) -> float:
+    """
+    Returns how many seconds of the user's paid stream period are left to a reconnect,
+    0 if the connection has to be paid for.
+
+    Only reconnects (sent with the Last-Event-ID of a received event) continue a paid period,
+    a new connection always starts one.
+    """
+    if last_event_id is None or not last_event_id.isdigit():
+        return 0
+    paid_until = await cache.aget(RATE_STREAM_PAID_CACHE_KEY.format(user_id=user_id))
+    return max(paid_until - now, 0) if paid_until is not None else 0
+
+
+async def start_paid_stream_period(user_id: int, now: float, duration: float) -> None:
+    await cache.aset(RATE_STREAM_PAID_CACHE_KEY.format(user_id=user_id), now + duration, timeout=duration)
+
+
+rate_broadcaster = RateBroadcaster(
+    load=lambda after_id: load_newer_rate_snapshot(settings.EXCHANGE_RATE_BASE_CURRENCY, after_id),
+    poll_interval=settings.RATE_STREAM_POLL_INTERVAL,
+)
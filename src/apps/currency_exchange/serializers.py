@@ -1,13 +1,39 @@
+from django.conf import settings
 from rest_framework import serializers
 
+from .currencies import currency_registry
 from .models import CurrencyExchange
+from .services import get_supported_currency_codes
 from apps.core.serializers import DateRangeSerializer
 
 
 class CurrencyExchangeSerializer(serializers.ModelSerializer):
+    # Read from the in-memory currency registry, so listing records doesn't join the currencies
+    currency_code = serializers.CharField(max_length=10, read_only=True)
+
     class Meta:
         model = CurrencyExchange
-        fields = '__all__'
+        fields = ('id', 'user', 'currency_code', 'rate', 'created_at')
+
+
+class CreateCurrencyExchangeRecordRequestSerializer(serializers.Serializer):
+    currency_code = serializers.CharField(max_length=10)
+
+    def validate_currency_code(self, value):
+        """
+        Check that the currency is supported, without calling the upstream API.
+        """
+        if value not in get_supported_currency_codes():
+            raise serializers.ValidationError("Unsupported currency code.")
+
+        return value
+
+
+class CreateCurrencyExchangeRecordsRequestSerializer(serializers.Serializer):
+    # Each code is checked separately, so unsupported codes fail alone instead of the whole request
+    currency_codes = serializers.ListField(
+        child=serializers.CharField(max_length=10), allow_empty=False, max_length=50,
+    )
 
 
 class CreateCurrencyExchangeRecordResponseSerializer(serializers.Serializer):
@@ -21,3 +47,127 @@ class CreateCurrencyExchangeRecordResponseSerializer(serializers.Serializer):
 class CurrencyExchangeHistoryQueryParamsSerializer(serializers.Serializer):
     currency_code = serializers.CharField(max_length=10, required=False, allow_null=True)
     date_range = DateRangeSerializer(required=False, allow_null=True)
+
+
+class CurrencyExchangeDailyStatsSerializer(serializers.Serializer):
+    currency_code = serializers.CharField(max_length=10)
+    day = serializers.DateField()
+    records_count = serializers.IntegerField()
+    min_rate = serializers.DecimalField(max_digits=10, decimal_places=2)
+    max_rate = serializers.DecimalField(max_digits=10, decimal_places=2)
+    avg_rate = serializers.DecimalField(max_digits=10, decimal_places=2)
+    last_rate = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+class CurrencyExchangeRecordResultSerializer(serializers.Serializer):
+    """
+    For swagger ui only
+    """
+    currency_code = serializers.CharField(max_length=10)
+    rate = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    detail = serializers.CharField(required=False)
+
+
+class CreateCurrencyExchangeRecordsResponseSerializer(serializers.Serializer):
+    """
+    For swagger ui only
+    """
+    results = CurrencyExchangeRecordResultSerializer(many=True)
+
+
+class ConversionRequestSerializer(serializers.Serializer):
+    from_currency = serializers.CharField(max_length=10)
+    to_currency = serializers.CharField(max_length=10)
+    amount = serializers.FloatField()
+
+
+class ConversionResponseSerializer(serializers.Serializer):
+    """
+    For swagger ui only
+    """
+    from_currency = serializers.CharField(max_length=10)
+    to_currency = serializers.CharField(max_length=10)
+    amount = serializers.FloatField()
+    rate = serializers.FloatField()
+    converted_amount = serializers.FloatField()
+
+
+class BulkConversionRequestSerializer(serializers.Serializer):
+    # Columns rather than a list of objects, so they map directly to the arrays the conversion works on
+    from_currencies = serializers.ListField(child=serializers.CharField(max_length=10), allow_empty=False)
+    to_currencies = serializers.ListField(child=serializers.CharField(max_length=10), allow_empty=False)
+    amounts = serializers.ListField(child=serializers.FloatField(), allow_empty=False)
+
+    def validate(self, data):
+        """
+        Check that the columns have the same length, which doesn't exceed the limit.
+        """
+        lengths = {len(data['from_currencies']), len(data['to_currencies']), len(data['amounts'])}
+        if len(lengths) > 1:
+            raise serializers.ValidationError("from_currencies, to_currencies and amounts must have the same length.")
+
+        if lengths.pop() > settings.CONVERSION_BULK_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"At most {settings.CONVERSION_BULK_MAX_SIZE} amounts can be converted at once."
+            )
+
+        return data
+
+
+class BulkConversionResponseSerializer(serializers.Serializer):
+    """
+    For swagger ui only
+    """
+    converted_amounts = serializers.ListField(child=serializers.FloatField())
+
+
+class RateHistoryQueryParamsSerializer(serializers.Serializer):
+    from_currency = serializers.CharField(max_length=10)
+    to_currency = serializers.CharField(max_length=10, default="UAH")
+    at = serializers.DateTimeField(required=False)
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+
+    def validate_from_currency(self, value):
+        """
+        Check that the currency is known, it may be no longer supported but still have past rates.
+        """
+        if currency_registry.get_id(value) is None:
+            raise serializers.ValidationError("Unknown currency code.")
+
+        return value
+
+    def validate_to_currency(self, value):
+        return self.validate_from_currency(value)
+
+    def validate(self, data):
+        """
+        Check that either a time or a whole time range is requested.
+        """
+        has_range = 'start' in data or 'end' in data
+        if ('at' in data) == has_range:
+            raise serializers.ValidationError("Provide either at, or start and end.")
+
+        if has_range:
+            if 'start' not in data or 'end' not in data:
+                raise serializers.ValidationError("Both start and end must be provided.")
+            if data['start'] > data['end']:
+                raise serializers.ValidationError("start must be earlier than end.")
+
+        return data
+
+
+class HistoricalRateResponseSerializer(serializers.Serializer):
+    """
+    For swagger ui only
+    """
+    from_currency = serializers.CharField(max_length=10)
+    to_currency = serializers.CharField(max_length=10)
+    at = serializers.DateTimeField()
+    fetched_at = serializers.DateTimeField()
+    rate = serializers.FloatField()
+
+
+class RateSeriesPointSerializer(serializers.Serializer):
+    fetched_at = serializers.DateTimeField()
+    rate = serializers.FloatField(allow_null=True)
@@ -1,30 +1,622 @@
-from datetime import datetime, time, UTC
-from typing import Optional
-import requests
+import asyncio
+import csv
+import json
+import logging
+import threading
+import uuid
+from array import array
+from collections import OrderedDict
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, UTC
+from decimal import Decimal
+from time import monotonic, sleep
+from typing import Awaitable, Callable, Generic, Hashable, Iterable, Iterator, Optional, Protocol, TypeVar
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.db.models import QuerySet
+from django.core.cache import cache
+from django.db import IntegrityError, connections, transaction
+from django.db.models import (
+    Case, Count, DecimalField, ExpressionWrapper, F, Max, Min, OuterRef, Q, QuerySet, Subquery, Sum, Value, When,
+)
+from django.db.models.fields.json import KeyTransform
+from django.db.models.functions import Greatest, Least, TruncDate
+from django.utils import timezone
 
-from .models import CurrencyExchange
+from .client import UpstreamError, get_async_upstream_client, get_upstream_client
+from .currencies import currency_registry
+from .models import Currency, CurrencyExchange, CurrencyExchangeArchive, CurrencyExchangeDailyRollup, RateSnapshot
+from .snapshot_store import MmapRateTable, MmapSnapshotStore, write_snapshot
+from apps.balance.models import UserBalance
 from apps.core.dataclasses import DateRange
 
 
+logger = logging.getLogger(__name__)
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class _Call(Generic[V]):
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[V] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    Makes concurrent callers for the same key wait on one in-flight call and share its result.
+    """
+    def __init__(self):
+        self._calls: dict[K, _Call[V]] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: K, fn: Callable[[], V]) -> V:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+def cache_single_flight(key: str, fn: Callable[[], Optional[V]]) -> Optional[V]:
+    """
+    Single flight across workers through a lock in the Django cache.
+
+    The worker that takes the lock calls ``fn`` and shares its result through the cache,
+    the others poll for that result instead of repeating the call.
+    If the leader fails, dies or takes too long, followers call ``fn`` themselves.
+    """
+    lock_key = f'single_flight:{key}:lock'
+    token = uuid.uuid4().hex
+
+    if cache.add(lock_key, token, timeout=settings.EXCHANGE_RATE_SINGLE_FLIGHT_TIMEOUT):
+        try:
+            result = fn()
+            if result is not None:
+                cache.set(f'single_flight:{key}:{token}', result, timeout=settings.EXCHANGE_RATE_SINGLE_FLIGHT_TIMEOUT)
+            return result
+        finally:
+            cache.delete(lock_key)
+
+    leader_token = cache.get(lock_key)
+    deadline = monotonic() + settings.EXCHANGE_RATE_SINGLE_FLIGHT_TIMEOUT
+    while leader_token is not None and monotonic() < deadline:
+        sleep(settings.EXCHANGE_RATE_SINGLE_FLIGHT_POLL_INTERVAL)
+
+        result = cache.get(f'single_flight:{key}:{leader_token}')
+        if result is not None:
+            return result
+
+        if cache.get(lock_key) != leader_token:  # The leader has finished without a result
+            break
+
+    return fn()
+
+
+class RateTableCache(Generic[K, V]):
+    """
+    Bounded LRU cache of parsed rate tables with stale-while-revalidate.
+
+    Entries younger than ``ttl`` seconds are served as-is.
+    Entries older than ``ttl`` but younger than ``ttl + stale_ttl`` are served
+    while a single background thread refreshes them.
+    Anything older (or missing) is fetched synchronously,
+    if that fetch fails, the old entry is still served rather than nothing.
+    Concurrent fetches of the same key are coalesced into one.
+    """
+    def __init__(
+            self,
+            fetch: Callable[[K], Optional[V]],
+            ttl: float,
+            stale_ttl: float,
+            max_size: int,
+            clock: Callable[[], float] = monotonic,
+            afetch: Optional[Callable[[K], Awaitable[Optional[V]]]] = None,
+    ):
+        self._fetch = fetch
+        self._afetch = afetch
+        self._clock = clock
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        # Background refreshes in flight, by key
+        self._refresh_threads: dict[K, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._single_flight: SingleFlight[K, Optional[V]] = SingleFlight()
+        # Async fetches in flight, only touched from the event loop thread
+        self._async_calls: dict[K, asyncio.Task] = {}
+
+    def get(self, key: K) -> Optional[V]:
+        """
+        Returns the table for the given key, fetching it if needed.
+        Returns None if there's no cached table and the fetch failed.
+        """
+        entry, is_servable = self._lookup(key)
+        if is_servable:
+            return entry[1]
+
+        return self._fallback(key, entry, self._load(key))
+
+    async def aget(self, key: K) -> Optional[V]:
+        """
+        Async counterpart of ``get``: cached tables are returned without leaving the event loop,
+        missing ones are fetched with ``afetch`` if it's set, or with ``fetch`` in a thread.
+        """
+        entry, is_servable = self._lookup(key)
+        if is_servable:
+            return entry[1]
+
+        if self._afetch is not None:
+            loaded_value = await self._aload(key)
+        else:
+            loaded_value = await sync_to_async(self._load)(key)
+
+        return self._fallback(key, entry, loaded_value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def wait_for_refreshes(self, timeout: Optional[float] = None) -> None:
+        """
+        Waits for the background refreshes started so far to finish.
+        """
+        with self._lock:
+            threads = list(self._refresh_threads.values())
+
+        for thread in threads:
+            thread.join(timeout)
+
+    def _lookup(self, key: K) -> tuple[Optional[tuple[float, V]], bool]:
+        """
+        Returns the entry of the key and whether it can be served as-is,
+        a background refresh is started if it's stale.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+
+            self._entries.move_to_end(key)
+            age = self._clock() - entry[0]
+            if age < self.ttl:
+                return entry, True
+
+            if age < self.ttl + self.stale_ttl:
+                self._schedule_refresh(key)
+                return entry, True
+
+        return entry, False
+
+    @staticmethod
+    def _fallback(key: K, entry: Optional[tuple[float, V]], loaded_value: Optional[V]) -> Optional[V]:
+        if loaded_value is None and entry is not None:
+            logger.warning("Failed to refresh the rate table %s, serving the expired one", key)
+            return entry[1]
+
+        return loaded_value
+
+    def _schedule_refresh(self, key: K) -> None:
+        """
+        Starts a background refresh unless one is already running for the key.
+        Must be called with the lock held.
+        """
+        if key in self._refresh_threads:
+            return
+
+        thread = threading.Thread(target=self._refresh, args=(key, ), daemon=True)
+        self._refresh_threads[key] = thread
+        thread.start()
+
+    def _refresh(self, key: K) -> None:
+        try:
+            self._load(key)
+        except Exception:  # The stale entry keeps being served, so just log it
+            logger.exception("Background refresh of the rate table %s failed", key)
+        finally:
+            with self._lock:
+                del self._refresh_threads[key]
+            # DB connections are per thread, so the ones opened by the fetch must be closed here
+            connections.close_all()
+
+    def _load(self, key: K) -> Optional[V]:
+        value = self._single_flight.do(key, lambda: self._fetch(key))
+        if value is not None:
+            self._store(key, value)
+
+        return value
+
+    async def _aload(self, key: K) -> Optional[V]:
+        # Concurrent requests of the event loop wait for the same fetch
+        loop = asyncio.get_running_loop()
+        task = self._async_calls.get(key)
+        if task is None or task.get_loop() is not loop:
+            task = self._async_calls[key] = loop.create_task(self._afetch(key))
+
+            def forget(done: asyncio.Task) -> None:
+                if self._async_calls.get(key) is done:
+                    del self._async_calls[key]
+
+            task.add_done_callback(forget)
+
+        # A cancelled request mustn't cancel the fetch the other ones wait for
+        value = await asyncio.shield(task)
+        if value is not None:
+            self._store(key, value)
+
+        return value
+
+    def _store(self, key: K, value: V) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class CrossRateTable:
+    """
+    Rates of every supported currency against a single base currency.
+
+    Rates are kept in a compact array indexed by currency,
+    so the rate between any two currencies is derived by inversion or cross-multiplication.
+    """
+    __slots__ = ('base_code', 'codes', '_index', '_rates')
+
+    def __init__(self, base_code: str, conversion_rates: dict[str, float]):
+        self.base_code = base_code
+        self.codes = tuple(sorted(conversion_rates))
+        self._index = {code: index for index, code in enumerate(self.codes)}
+        self._rates = array('d', (conversion_rates[code] for code in self.codes))
+
+    def __contains__(self, currency_code: object) -> bool:
+        return currency_code in self._index
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def rate(self, from_code: str, to_code: str) -> Optional[float]:
+        """
+        Returns how many units of ``to_code`` one unit of ``from_code`` is worth,
+        or None if any of the currencies is unsupported.
+        """
+        from_index = self._index.get(from_code)
+        to_index = self._index.get(to_code)
+        if from_index is None or to_index is None:
+            return None
+
+        return self._rates[to_index] / self._rates[from_index]
+
+
+def fetch_conversion_rates(base_code: str) -> Optional[dict[str, float]]:
+    """
+    Fetches conversion rates of all currencies against the given base currency from upstream.
+    Raises UpstreamError if the upstream is unavailable.
+    """
+    return get_upstream_client().get_conversion_rates(base_code)
+
+
+async def afetch_conversion_rates(base_code: str) -> Optional[dict[str, float]]:
+    return await get_async_upstream_client().get_conversion_rates(base_code)
+
+
+def fetch_rate_table(base_code: str) -> Optional[CrossRateTable]:
+    try:
+        conversion_rates = fetch_conversion_rates(base_code)
+    except UpstreamError:
+        logger.exception("Failed to fetch the rate table %s", base_code)
+        return None
+
+    if conversion_rates is None:
+        return None
+
+    return CrossRateTable(base_code, conversion_rates)
+
+
+async def afetch_rate_table(base_code: str) -> Optional[CrossRateTable]:
+    try:
+        conversion_rates = await afetch_conversion_rates(base_code)
+    except UpstreamError:
+        logger.exception("Failed to fetch the rate table %s", base_code)
+        return None
+
+    if conversion_rates is None:
+        return None
+
+    return CrossRateTable(base_code, conversion_rates)
+
+
+def load_latest_rate_table(base_code: str) -> Optional[CrossRateTable]:
+    """
+    Builds the rate table from the latest stored snapshot, so no upstream call is made.
+    """
+    rates = (
+        RateSnapshot.objects.filter(base_code=base_code)
+        .order_by('-fetched_at', '-id')
+        .values_list('rates', flat=True)
+        .first()
+    )
+    if rates is None:
+        return None
+
+    return CrossRateTable(base_code, rates)
+
+
+def load_newer_rate_snapshot(base_code: str, after_id: Optional[int]) -> Optional[RateSnapshot]:
+    """
+    Returns the latest stored snapshot if it isn't the one with the given id,
+    the rates are only loaded when there's a new snapshot.
+    """
+    latest_id = (
+        RateSnapshot.objects.filter(base_code=base_code)
+        .order_by('-fetched_at', '-id')
+        .values_list('id', flat=True)
+        .first()
+    )
+    if latest_id is None or latest_id == after_id:
+        return None
+
+    return RateSnapshot.objects.get(id=latest_id)
+
+
+def refresh_rate_snapshot() -> Optional[RateSnapshot]:
+    """
+    Fetches the base currency rate table from upstream and stores it as a new snapshot.
+    The snapshot is also written to the shared memory-mapped file if it's configured.
+    Returns None if the upstream rejected the base currency, raises UpstreamError if it's unavailable.
+    """
+    base_code = settings.EXCHANGE_RATE_BASE_CURRENCY
+    conversion_rates = fetch_conversion_rates(base_code)
+    if conversion_rates is None:
+        return None
+
+    snapshot = RateSnapshot.objects.create(base_code=base_code, rates=conversion_rates)
+    # Records of new currencies can reference them as soon as the snapshot is served
+    currency_registry.register(list(conversion_rates))
+
+    if settings.EXCHANGE_RATE_SNAPSHOT_PATH:
+        write_snapshot(
+            settings.EXCHANGE_RATE_SNAPSHOT_PATH,
+            base_code=base_code,
+            rates=conversion_rates,
+            version=snapshot.id,
+            fetched_at=snapshot.fetched_at.timestamp(),
+        )
+
+    return snapshot
+
+
+def prune_rate_snapshots(now: datetime, retention_days: int) -> int:
+    """
+    Deletes the snapshots fetched more than ``retention_days`` days before ``now`` (none if it's 0),
+    the latest snapshot is always kept, so rates are still served if the upstream has been down that long.
+    Returns the number of deleted snapshots.
+    """
+    if retention_days <= 0:
+        return 0
+
+    latest = RateSnapshot.objects.order_by('-fetched_at', '-id').values_list('id', flat=True).first()
+    deleted, _ = (
+        RateSnapshot.objects
+        .filter(fetched_at__lt=now - timedelta(days=retention_days))
+        .exclude(id=latest)
+        .delete()
+    )
+    return deleted
+
+
+class RateTableBackend(Protocol):
+    def get(self, base_code: str) -> Optional[CrossRateTable | MmapRateTable]:
+        ...
+
+    async def aget(self, base_code: str) -> Optional[CrossRateTable | MmapRateTable]:
+        ...
+
+
+def fetch_shared_rate_table(base_code: str) -> Optional[CrossRateTable]:
+    """
+    Fetches the rate table once for all workers that miss it at the same time.
+    """
+    return cache_single_flight(f'rate_table:{base_code}', lambda: fetch_rate_table(base_code))
+
+
+# Rate tables fetched from upstream on demand
+http_rate_table_cache: RateTableCache[str, CrossRateTable] = RateTableCache(
+    fetch=fetch_shared_rate_table,
+    afetch=afetch_rate_table,
+    ttl=settings.EXCHANGE_RATE_CACHE_TTL,
+    stale_ttl=settings.EXCHANGE_RATE_CACHE_STALE_TTL,
+    max_size=settings.EXCHANGE_RATE_CACHE_MAX_SIZE,
+)
+
+# Rate tables loaded from snapshots stored by the refresh_rate_snapshots command
+snapshot_rate_table_cache: RateTableCache[str, CrossRateTable] = RateTableCache(
+    fetch=load_latest_rate_table,
+    ttl=settings.EXCHANGE_RATE_SNAPSHOT_POLL_INTERVAL,
+    stale_ttl=settings.EXCHANGE_RATE_CACHE_STALE_TTL,
+    max_size=settings.EXCHANGE_RATE_CACHE_MAX_SIZE,
+)
+
+# Rate table shared by all workers through the file written by the refresh_rate_snapshots command
+mmap_snapshot_store = MmapSnapshotStore(settings.EXCHANGE_RATE_SNAPSHOT_PATH)
+
+RATE_TABLE_BACKENDS: dict[str, RateTableBackend] = {
+    'http': http_rate_table_cache,
+    'snapshot': snapshot_rate_table_cache,
+    'mmap': mmap_snapshot_store,
+}
+
+
+def get_rate_table() -> Optional[CrossRateTable | MmapRateTable]:
+    """
+    Returns the table of rates against the base currency from the configured backend.
+    A single table serves every supported currency.
+    """
+    backend = RATE_TABLE_BACKENDS[settings.EXCHANGE_RATE_BACKEND]
+    return backend.get(settings.EXCHANGE_RATE_BASE_CURRENCY)
+
+
+async def aget_rate_table() -> Optional[CrossRateTable | MmapRateTable]:
+    backend = RATE_TABLE_BACKENDS[settings.EXCHANGE_RATE_BACKEND]
+    return await backend.aget(settings.EXCHANGE_RATE_BASE_CURRENCY)
+
+
+def load_supported_currency_codes(base_code: str) -> frozenset[str]:
+    """
+    Returns the codes of the latest rate snapshot, or of the known currencies if there's no snapshot yet.
+    """
+    rates = (
+        RateSnapshot.objects.filter(base_code=base_code)
+        .order_by('-fetched_at', '-id')
+        .values_list('rates', flat=True)
+        .first()
+    )
+    if rates:
+        return frozenset(rates)
+
+    return frozenset(Currency.objects.values_list('code', flat=True))
+
+
+# Codes requests are validated against, without touching the rate table backend
+supported_currency_codes_cache: RateTableCache[str, frozenset[str]] = RateTableCache(
+    fetch=load_supported_currency_codes,
+    ttl=settings.SUPPORTED_CURRENCY_CODES_TTL,
+    stale_ttl=settings.EXCHANGE_RATE_CACHE_STALE_TTL,
+    max_size=settings.EXCHANGE_RATE_CACHE_MAX_SIZE,
+)
+
+
+def get_supported_currency_codes() -> frozenset[str]:
+    return supported_currency_codes_cache.get(settings.EXCHANGE_RATE_BASE_CURRENCY) or frozenset()
+
+
 def get_exchange_rate(currency_code: str) -> Optional[float]:
-    url = f"https://v6.exchangerate-api.com/v6/{settings.EXCHANGE_RATE_API_KEY}/latest/{currency_code}"
-    response = requests.get(url)
+    rate_table = get_rate_table()
+
+    if rate_table is not None:
+        return rate_table.rate(currency_code, "UAH")
+
+    return None
+
+
+async def aget_exchange_rate(currency_code: str) -> Optional[float]:
+    rate_table = await aget_rate_table()
 
-    if response.status_code == 200:
-        data = response.json()
-        return data['conversion_rates'].get("UAH")
+    if rate_table is not None:
+        return rate_table.rate(currency_code, "UAH")
 
     return None
 
+
+def record_currency_exchange(user_id: int, currency_code: str, rate: float) -> Optional[CurrencyExchange]:
+    """
+    Takes 1 coin from the user's balance and records the rate in the history.
+    Returns None (and records nothing) if the balance is insufficient.
+
+    The daily rollup of the record is updated in the same transaction, so its row stays locked until the commit.
+    The user's balance row is locked first, so only requests of the same user wait for it, and they would wait anyway.
+    """
+    with transaction.atomic():
+        if UserBalance.objects.debit(user_id, 1) is None:
+            return None
+
+        record = CurrencyExchange.objects.create(user_id=user_id, currency_code=currency_code, rate=rate)
+        update_daily_rollups([record])
+
+    return record
+
+
+def get_exchange_rates(currency_codes: Iterable[str]) -> dict[str, Optional[float]]:
+    """
+    Returns the rates of all currencies from a single rate table (None for the ones without a rate).
+    """
+    rate_table = get_rate_table()
+
+    return {
+        currency_code: rate_table.rate(currency_code, "UAH") if rate_table is not None else None
+        for currency_code in currency_codes
+    }
+
+
+def get_snapshot_rates(from_code: str, to_code: str) -> QuerySet[RateSnapshot]:
+    """
+    Returns the snapshots of the base currency with the rates of both currencies against it,
+    only these two values are extracted from each stored table.
+    """
+    return (
+        RateSnapshot.objects.filter(base_code=settings.EXCHANGE_RATE_BASE_CURRENCY)
+        .annotate(from_rate=KeyTransform(from_code, 'rates'), to_rate=KeyTransform(to_code, 'rates'))
+        .values('fetched_at', 'from_rate', 'to_rate')
+    )
+
+
+def snapshot_rate(snapshot_rates: dict) -> Optional[float]:
+    """
+    Returns the rate between the currencies of a row of get_snapshot_rates,
+    or None if any of them wasn't supported at that time.
+    """
+    if not snapshot_rates['from_rate'] or snapshot_rates['to_rate'] is None:
+        return None
+
+    return snapshot_rates['to_rate'] / snapshot_rates['from_rate']
+
+
+def get_historical_rate(from_code: str, to_code: str, at: datetime) -> Optional[dict]:
+    """
+    Returns the rates of the latest snapshot fetched at or before the given time, or None if there's no such snapshot.
+    Served by a backward scan of the (base_code, fetched_at) index, upstream is never called.
+    """
+    return (
+        get_snapshot_rates(from_code, to_code)
+        .filter(fetched_at__lte=at)
+        .order_by('-fetched_at', '-id')
+        .first()
+    )
+
+
+def get_rate_series(from_code: str, to_code: str, start: datetime, end: datetime) -> QuerySet[RateSnapshot]:
+    """
+    Returns the rates of every snapshot fetched in the time range, oldest first.
+    """
+    return (
+        get_snapshot_rates(from_code, to_code)
+        .filter(fetched_at__range=[start, end])
+        .order_by('fetched_at', 'id')
+    )
+
+
 def apply_currency_exchange_filters(
         queryset: QuerySet[CurrencyExchange],
         currency_code: Optional[str] = None,
         date_range: Optional[DateRange] = None,
 ) -> QuerySet[CurrencyExchange]:
     if currency_code:
-        queryset = queryset.filter(currency_code=currency_code)
+        currency_id = currency_registry.get_id(currency_code)
+        if currency_id is None:
+            return queryset.none()
+        queryset = queryset.filter(currency_id=currency_id)
 
     if date_range:
         start_datetime = datetime.combine(date_range.start_date, time.min, tzinfo=UTC)  # 00:00:00
@@ -33,3 +625,274 @@ def apply_currency_exchange_filters(
         queryset = queryset.filter(created_at__range=[start_datetime, end_datetime])
 
     return queryset
+
+
+def history_archive_cutoff() -> datetime:
+    """
+    Records created before that are moved to the archive, see archive_history.
+    """
+    return timezone.now() - timedelta(days=settings.HISTORY_HOT_RETENTION_DAYS)
+
+
+def get_history_sources(
+        user_id: int,
+        currency_code: Optional[str] = None,
+        date_range: Optional[DateRange] = None,
+) -> list[QuerySet]:
+    """
+    Returns the unordered, filtered querysets the user's history is read from.
+    The archive is only read when the requested date range starts before the archive cutoff,
+    so the usual history requests only touch the hot table.
+    """
+    sources = [CurrencyExchange.objects.filter(user_id=user_id)]
+
+    if date_range and datetime.combine(date_range.start_date, time.min, tzinfo=UTC) < history_archive_cutoff():
+        sources.append(CurrencyExchangeArchive.objects.filter(user_id=user_id))
+
+    return [apply_currency_exchange_filters(source, currency_code, date_range) for source in sources]
+
+
+def combine_history_sources(sources: list[QuerySet]) -> QuerySet:
+    """
+    Returns a single queryset of the records of all sources, newest first.
+    """
+    history = sources[0]
+    if len(sources) > 1:
+        history = history.union(*sources[1:], all=True)
+
+    return history.order_by('-created_at', '-id')
+
+
+def archive_history(cutoff: datetime, batch_size: int) -> int:
+    """
+    Moves the records created before the cutoff from the hot table to the archive.
+    Returns the number of records moved.
+
+    Records are walked in the order of their ids (the primary key index) in batches,
+    each batch is moved in its own short transaction. As ids grow with created_at,
+    the walk stops at the first record newer than the cutoff.
+    """
+    archived = 0
+    last_id = 0
+
+    while True:
+        batch = list(
+            CurrencyExchange.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'user_id', 'currency_id', 'rate', 'created_at')[:batch_size]
+        )
+        expired = []
+        for row in batch:
+            if row[4] >= cutoff:
+                break
+            expired.append(row)
+
+        if expired:
+            with transaction.atomic():
+                CurrencyExchangeArchive.objects.bulk_create(
+                    CurrencyExchangeArchive(
+                        id=record_id, user_id=user_id, currency_id=currency_id, rate=rate, created_at=created_at,
+                    )
+                    for record_id, user_id, currency_id, rate, created_at in expired
+                )
+                # The created_at condition lets a partitioned table skip the partitions of recent months
+                CurrencyExchange.objects.filter(
+                    id__in=[row[0] for row in expired], created_at__lt=cutoff,
+                ).delete()
+            archived += len(expired)
+
+        if len(expired) < batch_size:
+            return archived
+
+        last_id = expired[-1][0]
+
+
+HISTORY_EXPORT_FIELDS = ('id', 'currency_code', 'rate', 'created_at')
+
+
+def _iter_history_rows(sources: list[QuerySet]) -> Iterator[tuple]:
+    """
+    Reads the records of the sources newest first, in chunks, so memory use doesn't depend on the number of records.
+
+    Chunks are read through a server-side cursor where the DB supports it. Behind PgBouncer
+    server-side cursors are disabled, and a plain query would load the whole result at once,
+    so each chunk is then read by its own query, starting after the last record of the previous one.
+    """
+    chunk_size = settings.HISTORY_EXPORT_CHUNK_SIZE
+    fields = ('id', 'currency_id', 'rate', 'created_at')
+
+    if not connections[sources[0].db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        rows = combine_history_sources(sources).values_list(*fields).iterator(chunk_size=chunk_size)
+    else:
+        rows = _iter_history_rows_by_keyset(sources, fields, chunk_size)
+
+    for record_id, currency_id, rate, created_at in rows:
+        yield record_id, currency_registry.get_code(currency_id), rate, created_at
+
+
+def _iter_history_rows_by_keyset(sources: list[QuerySet], fields: tuple[str, ...], chunk_size: int) -> Iterator[tuple]:
+    chunk_sources = sources
+    while True:
+        chunk = list(combine_history_sources(chunk_sources).values_list(*fields)[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+
+        # Matches the (-created_at, -id) order of the history
+        last_id, last_created_at = chunk[-1][0], chunk[-1][3]
+        after_last = Q(created_at__lt=last_created_at) | Q(created_at=last_created_at, id__lt=last_id)
+        chunk_sources = [source.filter(after_last) for source in sources]
+
+
+class _Echo:
+    """
+    File-like object that returns what's written to it instead of buffering it.
+    """
+    def write(self, value: str) -> str:
+        return value
+
+
+def stream_history_csv(sources: list[QuerySet]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(HISTORY_EXPORT_FIELDS)
+    for record_id, currency_code, rate, created_at in _iter_history_rows(sources):
+        yield writer.writerow((record_id, currency_code, rate, created_at.isoformat()))
+
+
+def stream_history_ndjson(sources: list[QuerySet]) -> Iterator[str]:
+    for record_id, currency_code, rate, created_at in _iter_history_rows(sources):
+        yield json.dumps({
+            'id': record_id,
+            'currency_code': currency_code,
+            'rate': str(rate),
+            'created_at': created_at.isoformat(),
+        }) + '\n'
+
+
+def update_daily_rollups(records: Iterable[CurrencyExchange]) -> None:
+    """
+    Adds newly created records to the daily statistics of their users.
+    Must be called in the transaction that creates the records.
+
+    Costs an UPDATE per (user, currency, day) of the records, plus an INSERT in a savepoint
+    for the first record of the day. The updated rollups stay locked until the transaction commits.
+    """
+    groups: dict[tuple[int, int, date], list[CurrencyExchange]] = defaultdict(list)
+    for record in records:
+        groups[(record.user_id, record.currency_id, record.created_at.astimezone(UTC).date())].append(record)
+
+    for (user_id, currency_id, day), day_records in groups.items():
+        rates = [Decimal(record.rate).quantize(Decimal('0.01')) for record in day_records]
+        last_record = max(day_records, key=lambda record: record.created_at)
+        last_rate = Decimal(last_record.rate).quantize(Decimal('0.01'))
+
+        rollup = CurrencyExchangeDailyRollup.objects.filter(user_id=user_id, currency_id=currency_id, day=day)
+        # SET expressions see the values from before the update, so last_rate is compared with the old last_created_at
+        update = dict(
+            records_count=F('records_count') + len(rates),
+            min_rate=Least('min_rate', Value(min(rates), output_field=DecimalField())),
+            max_rate=Greatest('max_rate', Value(max(rates), output_field=DecimalField())),
+            rate_sum=F('rate_sum') + Value(sum(rates), output_field=DecimalField()),
+            last_rate=Case(
+                When(last_created_at__lte=last_record.created_at, then=Value(last_rate, output_field=DecimalField())),
+                default=F('last_rate'),
+            ),
+            last_created_at=Greatest('last_created_at', Value(last_record.created_at)),
+        )
+        if rollup.update(**update):
+            continue
+
+        try:
+            with transaction.atomic():
+                CurrencyExchangeDailyRollup.objects.create(
+                    user_id=user_id,
+                    currency_id=currency_id,
+                    day=day,
+                    records_count=len(rates),
+                    min_rate=min(rates),
+                    max_rate=max(rates),
+                    rate_sum=sum(rates),
+                    last_rate=last_rate,
+                    last_created_at=last_record.created_at,
+                )
+        except IntegrityError:  # A concurrent request has just created the rollup
+            rollup.update(**update)
+
+
+def rebuild_daily_rollups(since: date) -> int:
+    """
+    Recomputes the daily statistics of every day starting from the given one from the records.
+    Days whose records are archived already are left as they are.
+    Returns the number of rollups stored.
+    """
+    # Records are archived in the order of their ids, so the last archived record is the newest one
+    last_archived_at = CurrencyExchangeArchive.objects.order_by('-id').values_list('created_at', flat=True).first()
+    if last_archived_at is not None:
+        since = max(since, last_archived_at.astimezone(UTC).date() + timedelta(days=1))
+
+    last_rate = (
+        CurrencyExchange.objects.filter(
+            user_id=OuterRef('user_id'),
+            currency_id=OuterRef('currency_id'),
+            created_at__date=OuterRef('day'),
+        )
+        .order_by('-created_at', '-id')
+        .values('rate')[:1]
+    )
+    groups = (
+        CurrencyExchange.objects.filter(created_at__gte=datetime.combine(since, time.min, tzinfo=UTC))
+        .annotate(day=TruncDate('created_at', tzinfo=UTC))
+        .values('user_id', 'currency_id', 'day')
+        .annotate(
+            records_count=Count('id'),
+            min_rate=Min('rate'),
+            max_rate=Max('rate'),
+            rate_sum=Sum('rate'),
+            last_created_at=Max('created_at'),
+            last_rate=Subquery(last_rate),
+        )
+        .order_by()
+    )
+
+    with transaction.atomic():
+        CurrencyExchangeDailyRollup.objects.filter(day__gte=since).delete()
+
+        created = 0
+        batch = []
+        for group in groups.iterator(chunk_size=settings.HISTORY_EXPORT_CHUNK_SIZE):
+            batch.append(CurrencyExchangeDailyRollup(**group))
+            if len(batch) >= settings.HISTORY_EXPORT_CHUNK_SIZE:
+                created += len(CurrencyExchangeDailyRollup.objects.bulk_create(batch))
+                batch = []
+        created += len(CurrencyExchangeDailyRollup.objects.bulk_create(batch))
+
+    return created
+
+
+def get_daily_stats(
+        queryset: QuerySet[CurrencyExchangeDailyRollup],
+        currency_code: Optional[str] = None,
+        date_range: Optional[DateRange] = None,
+) -> QuerySet[CurrencyExchangeDailyRollup]:
+    """
+    Returns min/max/avg/last rate per currency per day, newest day first.
+    """
+    if currency_code:
+        currency_id = currency_registry.get_id(currency_code)
+        if currency_id is None:
+            return queryset.none()
+        queryset = queryset.filter(currency_id=currency_id)
+
+    if date_range:
+        queryset = queryset.filter(day__range=[date_range.start_date, date_range.end_date])
+
+    return (
+        queryset.annotate(
+            avg_rate=ExpressionWrapper(
+                F('rate_sum') / F('records_count'), output_field=DecimalField(max_digits=10, decimal_places=2),
+            ),
+        )
+        # Codes are joined from the currencies (a small table), so the currencies of each day are listed by code
+        .values('day', 'records_count', 'min_rate', 'max_rate', 'avg_rate', 'last_rate', currency_code=F('currency__code'))
+        .order_by('-day', 'currency_code')
+    )
@@ -0,0 +1,178 @@
+"""
+Rate snapshot store backed by a memory-mapped file shared by all workers on a host.
+
+File layout (little-endian):
+    header: magic (4s), format version (H), entry count (H),
+            snapshot version (Q), fetched at - unix timestamp (d), base currency code (4s)
+    entries: entry count * (currency code (4s), rate against the base currency (d)), sorted by code
+
+The refresher writes a new file next to the old one and atomically renames it,
+so readers never see a partially written snapshot.
+"""
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from typing import Optional
+
+MAGIC = b'RATE'
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct('<4sHHQd4s')
+ENTRY = struct.Struct('<4sd')
+
+
+class SnapshotFormatError(Exception):
+    pass
+
+
+def _encode_code(code: str) -> bytes:
+    encoded = code.encode('ascii')
+    if len(encoded) > 4:
+        raise SnapshotFormatError(f"Currency code {code!r} doesn't fit the snapshot layout")
+
+    return encoded.ljust(4, b'\0')
+
+
+def write_snapshot(path: str, base_code: str, rates: dict[str, float], version: int, fetched_at: float) -> None:
+    """
+    Atomically replaces the snapshot file at the given path.
+    """
+    codes = sorted(rates)
+    buffer = bytearray(HEADER.size + ENTRY.size * len(codes))
+    HEADER.pack_into(buffer, 0, MAGIC, FORMAT_VERSION, len(codes), version, fetched_at, _encode_code(base_code))
+    for index, code in enumerate(codes):
+        ENTRY.pack_into(buffer, HEADER.size + ENTRY.size * index, _encode_code(code), rates[code])
+
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix='.rates-')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as file:
+            file.write(buffer)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class MmapRateTable:
+    """
+    Read-only view of a mapped snapshot file with the same lookup interface as ``CrossRateTable``.
+    Lookups binary-search the mapped entries in place, nothing is copied into Python structures.
+    """
+    def __init__(self, buffer: mmap.mmap):
+        magic, format_version, count, version, fetched_at, base_code = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise SnapshotFormatError("Unsupported snapshot file")
+        if len(buffer) < HEADER.size + ENTRY.size * count:
+            raise SnapshotFormatError("Truncated snapshot file")
+
+        self._buffer = buffer
+        self._count = count
+        self.version = version
+        self.fetched_at = fetched_at
+        self.base_code = base_code.rstrip(b'\0').decode('ascii')
+
+    def __contains__(self, currency_code: object) -> bool:
+        return isinstance(currency_code, str) and self._find(currency_code) is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def codes(self) -> tuple[str, ...]:
+        return tuple(
+            ENTRY.unpack_from(self._buffer, HEADER.size + ENTRY.size * index)[0].rstrip(b'\0').decode('ascii')
+            for index in range(self._count)
+        )
+
+    def rate(self, from_code: str, to_code: str) -> Optional[float]:
+        """
+        Returns how many units of ``to_code`` one unit of ``from_code`` is worth,
+        or None if any of the currencies is unsupported.
+        """
+        if not isinstance(from_code, str) or not isinstance(to_code, str):
+            return None
+
+        from_rate = self._find(from_code)
+        to_rate = self._find(to_code)
+        if from_rate is None or to_rate is None:
+            return None
+
+        return to_rate / from_rate
+
+    def _find(self, currency_code: str) -> Optional[float]:
+        try:
+            key = _encode_code(currency_code)
+        except (SnapshotFormatError, UnicodeEncodeError):
+            return None
+
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            code, rate = ENTRY.unpack_from(self._buffer, HEADER.size + ENTRY.size * middle)
+            if code < key:
+                low = middle + 1
+            elif code > key:
+                high = middle
+            else:
+                return rate
+
+        return None
+
+
+class MmapSnapshotStore:
+    """
+    Maps the snapshot file and remaps it whenever the refresher replaces it.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file_id: Optional[tuple[int, int]] = None
+        self._table: Optional[MmapRateTable] = None
+        self._lock = threading.Lock()
+
+    def get(self, base_code: str) -> Optional[MmapRateTable]:
+        """
+        Returns the current snapshot if it holds rates against the given base currency.
+        """
+        table = self.table()
+        if table is None or table.base_code != base_code:
+            return None
+
+        return table
+
+    async def aget(self, base_code: str) -> Optional[MmapRateTable]:
+        # Only stats and maps a local file, so it doesn't need to leave the event loop
+        return self.get(base_code)
+
+    def table(self) -> Optional[MmapRateTable]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+        file_id = (stat.st_ino, stat.st_mtime_ns)
+        if file_id == self._file_id:
+            return self._table
+
+        with self._lock:
+            if file_id != self._file_id:
+                self._table = self._map()
+                self._file_id = file_id
+
+        return self._table
+
+    def _map(self) -> Optional[MmapRateTable]:
+        try:
+            with open(self.path, 'rb') as file:
+                # The mapping stays valid after the file is closed or replaced.
+                # Tables handed out earlier keep the old mapping alive until they're garbage collected.
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):  # ValueError - the file is empty
+            return None
+
+        return MmapRateTable(buffer)
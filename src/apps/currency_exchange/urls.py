@@ -1,5 +1,11 @@
 from django.urls import path
-from .views import CurrencyExchangeViewSet
+from .views import (
+    CurrencyExchangeViewSet,
+    CurrencyConversionViewSet,
+    ExchangeRateViewSet,
+    create_currency_exchange_record_async,
+    rate_stream,
+)
 
 
 urlpatterns = [
@@ -8,9 +14,54 @@ urlpatterns = [
         CurrencyExchangeViewSet.as_view({'post': 'create_currency_exchange_record'}),
         name='create_currency_exchange_record',
     ),
+    path(
+        'currency/async/',
+        create_currency_exchange_record_async,
+        name='create_currency_exchange_record_async',
+    ),
+    path(
+        'currency/batch/',
+        CurrencyExchangeViewSet.as_view({'post': 'create_currency_exchange_records'}),
+        name='create_currency_exchange_records',
+    ),
     path(
         'history/',
         CurrencyExchangeViewSet.as_view({'get': 'history'}),
         name='history',
     ),
-]
\ No newline at end of file
+    path(
+        'history/export/',
+        CurrencyExchangeViewSet.as_view({'get': 'export_history'}),
+        name='export_history',
+    ),
+    path(
+        'history/stats/',
+        CurrencyExchangeViewSet.as_view({'get': 'history_stats'}),
+        name='history_stats',
+    ),
+    path(
+        'convert/',
+        CurrencyConversionViewSet.as_view({'post': 'convert'}),
+        name='convert',
+    ),
+    path(
+        'convert/bulk/',
+        CurrencyConversionViewSet.as_view({'post': 'convert_bulk'}),
+        name='convert_bulk',
+    ),
+    path(
+        'convert/csv/',
+        CurrencyConversionViewSet.as_view({'post': 'convert_csv'}),
+        name='convert_csv',
+    ),
+    path(
+        'rates/history/',
+        ExchangeRateViewSet.as_view({'get': 'history'}),
+        name='rate_history',
+    ),
+    path(
+        'rates/stream/',
+        rate_stream,
+        name='rate_stream',
+    ),
+]
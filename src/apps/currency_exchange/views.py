@@ -1,20 +1,98 @@
+import csv
+import io
+import json
+import time
+from itertools import chain
+from typing import Iterator, Optional
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.db import transaction
+from django.db.models import QuerySet
+from django.http import HttpRequest, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter, OpenApiTypes
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.request import Request
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
 
+from apps.accounts.authentication import StatelessJWTAuthentication
 from apps.balance.models import UserBalance
-from .models import CurrencyExchange
+from apps.core.db_routers import mark_as_written
+from .models import CurrencyExchange, CurrencyExchangeDailyRollup
 from .serializers import (
     CurrencyExchangeSerializer,
+    CreateCurrencyExchangeRecordRequestSerializer,
     CreateCurrencyExchangeRecordResponseSerializer,
+    CreateCurrencyExchangeRecordsRequestSerializer,
+    CreateCurrencyExchangeRecordsResponseSerializer,
     CurrencyExchangeHistoryQueryParamsSerializer,
+    CurrencyExchangeDailyStatsSerializer,
+    ConversionRequestSerializer,
+    ConversionResponseSerializer,
+    BulkConversionRequestSerializer,
+    BulkConversionResponseSerializer,
+    RateHistoryQueryParamsSerializer,
+    HistoricalRateResponseSerializer,
+    RateSeriesPointSerializer,
+)
+from .services import (
+    aget_exchange_rate,
+    get_exchange_rate,
+    get_exchange_rates,
+    get_supported_currency_codes,
+    get_history_sources,
+    combine_history_sources,
+    stream_history_csv,
+    stream_history_ndjson,
+    update_daily_rollups,
+    get_daily_stats,
+    record_currency_exchange,
+    get_historical_rate,
+    get_rate_series,
+    snapshot_rate,
 )
-from .services import get_exchange_rate, apply_currency_exchange_filters
 from apps.core.dataclasses import DateRange
-from .pagination import CurrencyExchangePagination
+from .pagination import CurrencyExchangePagination, CurrencyExchangeCursorPagination, RateHistoryPagination
+from .conversion import UnsupportedCurrencyError, get_rate_vector, missing_csv_columns, stream_converted_csv
+from .rate_stream import get_paid_stream_time, rate_broadcaster, start_paid_stream_period, stream_rate_updates
+
+
+# File format -> (content type, function streaming the history in that format)
+HISTORY_EXPORT_FORMATS = {
+    'csv': ('text/csv', stream_history_csv),
+    'ndjson': ('application/x-ndjson', stream_history_ndjson),
+}
+
+HISTORY_FILTER_PARAMETERS = [
+    OpenApiParameter(
+        name="currency_code",
+        description="Filter history by currency code (e.g., 'USD', 'EUR')",
+        required=False,
+        type=OpenApiTypes.STR,
+        location=OpenApiParameter.QUERY,
+    ),
+    OpenApiParameter(
+        name="start_date",
+        description="Filter history by start date (format: YYYY-MM-DD)",
+        required=False,
+        type=OpenApiTypes.DATE,
+        location=OpenApiParameter.QUERY,
+    ),
+    OpenApiParameter(
+        name="end_date",
+        description="Filter history by end date (format: YYYY-MM-DD)",
+        required=False,
+        type=OpenApiTypes.DATE,
+        location=OpenApiParameter.QUERY,
+    ),
+]
 
 
 class CurrencyExchangeViewSet(viewsets.ViewSet):
@@ -22,13 +100,10 @@ class CurrencyExchangeViewSet(viewsets.ViewSet):
 
     @extend_schema(
         tags=['Currency Exchange'],
-        request={"application/json": {"type": "object", "properties": {"currency_code": {"type": "string"}}}},
+        request=CreateCurrencyExchangeRecordRequestSerializer,
         responses={
             200: CreateCurrencyExchangeRecordResponseSerializer,
-            400: {
-                "type": "object",
-                "properties": {"detail": {"type": "string"}},
-            },
+            400: OpenApiTypes.OBJECT,
         },
         examples=[
             OpenApiExample(
@@ -38,6 +113,13 @@ class CurrencyExchangeViewSet(viewsets.ViewSet):
                 response_only=True,
                 status_codes=[200, ]
             ),
+            OpenApiExample(
+                name="Unsupported Currency Code",
+                description="The provided currency code is missing or not supported.",
+                value={"currency_code": ["Unsupported currency code."]},
+                response_only=True,
+                status_codes=[400, ]
+            ),
             OpenApiExample(
                 name="Invalid Currency Code",
                 description="The provided currency code is invalid or an API error occurred.",
@@ -60,45 +142,110 @@ class CurrencyExchangeViewSet(viewsets.ViewSet):
         Create a currency exchange record and takes 1 coin for the request
         """
         user = request.user
-        currency_code = request.data.get('currency_code')
 
-        user_balance = UserBalance.objects.get(user=user)
-        if user_balance.balance <= 0:
-            return Response({"detail": "Insufficient balance."}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = CreateCurrencyExchangeRecordRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        currency_code = serializer.validated_data['currency_code']
 
         rate = get_exchange_rate(currency_code)
         if rate is None:
             return Response({"detail": "Invalid currency code or API error."}, status=status.HTTP_400_BAD_REQUEST)
 
-        with transaction.atomic():
-            CurrencyExchange.objects.create(user=user, currency_code=currency_code, rate=rate)
-            user_balance.decrease(1)
-            user_balance.save()
+        if record_currency_exchange(user.id, currency_code, rate) is None:
+            return Response({"detail": "Insufficient balance."}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({"currency_code": currency_code, "rate": round(rate, 2)})
 
+    @extend_schema(
+        tags=['Currency Exchange'],
+        request=CreateCurrencyExchangeRecordsRequestSerializer,
+        responses={
+            200: CreateCurrencyExchangeRecordsResponseSerializer,
+            400: OpenApiTypes.OBJECT,
+        },
+        examples=[
+            OpenApiExample(
+                name="Partially created currency exchange records",
+                description="Records are created for the currencies with a rate, the other currencies are reported.",
+                value={
+                    "results": [
+                        {"currency_code": "USD", "rate": "41.09"},
+                        {"currency_code": "EUR", "rate": "44.52"},
+                        {"currency_code": "XYZ", "detail": "Unsupported currency code."},
+                    ]
+                },
+                response_only=True,
+                status_codes=[200, ]
+            ),
+            OpenApiExample(
+                name="Insufficient Balance",
+                description="The user's balance is insufficient to pay for every currency with a rate.",
+                value={"detail": "Insufficient balance."},
+                response_only=True,
+                status_codes=[400, ]
+            ),
+        ],
+    )
+    @action(detail=False, methods=['post'])
+    def create_currency_exchange_records(self, request: Request):
+        """
+        Creates currency exchange records of several currencies at once and takes 1 coin per created record.
+        Currencies without a rate are reported in the results and aren't charged.
+        """
+        user = request.user
+
+        serializer = CreateCurrencyExchangeRecordsRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        currency_codes = list(dict.fromkeys(serializer.validated_data['currency_codes']))  # Unique, in order
+
+        supported_codes = get_supported_currency_codes()
+        rates = get_exchange_rates([code for code in currency_codes if code in supported_codes])
+
+        results = []
+        records = []
+        for currency_code in currency_codes:
+            if currency_code not in supported_codes:
+                results.append({"currency_code": currency_code, "detail": "Unsupported currency code."})
+            elif rates[currency_code] is None:
+                results.append({"currency_code": currency_code, "detail": "Invalid currency code or API error."})
+            else:
+                rate = rates[currency_code]
+                results.append({"currency_code": currency_code, "rate": round(rate, 2)})
+                records.append(CurrencyExchange(user_id=user.id, currency_code=currency_code, rate=rate))
+
+        if not records:
+            return Response({"results": results}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            if UserBalance.objects.debit(user.id, len(records)) is None:
+                return Response({"detail": "Insufficient balance."}, status=status.HTTP_400_BAD_REQUEST)
+
+            records = CurrencyExchange.objects.bulk_create(records)
+            update_daily_rollups(records)
+
+        return Response({"results": results})
+
     @extend_schema(
         tags=['Currency Exchange'],
         parameters=[
+            *HISTORY_FILTER_PARAMETERS,
             OpenApiParameter(
-                name="currency_code",
-                description="Filter history by currency code (e.g., 'USD', 'EUR')",
+                name="pagination",
+                description="Pagination mode: 'page' (default) or 'cursor'. "
+                            "Cursor pagination seeks directly to the requested page and doesn't count records, "
+                            "so it stays fast however deep the page is",
                 required=False,
                 type=OpenApiTypes.STR,
+                enum=["page", "cursor"],
                 location=OpenApiParameter.QUERY,
             ),
             OpenApiParameter(
-                name="start_date",
-                description="Filter history by start date (format: YYYY-MM-DD)",
+                name="cursor",
+                description="Opaque cursor taken from the 'next' or 'previous' link (implies cursor pagination)",
                 required=False,
-                type=OpenApiTypes.DATE,
-                location=OpenApiParameter.QUERY,
-            ),
-            OpenApiParameter(
-                name="end_date",
-                description="Filter history by end date (format: YYYY-MM-DD)",
-                required=False,
-                type=OpenApiTypes.DATE,
+                type=OpenApiTypes.STR,
                 location=OpenApiParameter.QUERY,
             ),
             OpenApiParameter(
@@ -149,6 +296,31 @@ class CurrencyExchangeViewSet(viewsets.ViewSet):
                 response_only=True,
                 status_codes=["200"]
             ),
+            OpenApiExample(
+                name="Successful Response (Cursor Pagination)",
+                description="A page of currency exchange history records with cursor pagination.",
+                value={
+                    "next": "http://localhost:8000/api/v1/history/?cursor=Yz0yMDI0LTAzLTE3VDE0JTNBMzAlM0EwMCUyQjAwJTNBMDAmaT0y"
+                            "&page_size=2&pagination=cursor",
+                    "previous": None,
+                    "results": [
+                        {
+                            "user": 1,
+                            "currency_code": "USD",
+                            "rate": "41.00",
+                            "created_at": "2024-03-18T12:00:00Z"
+                        },
+                        {
+                            "user": 1,
+                            "currency_code": "EUR",
+                            "rate": "44.50",
+                            "created_at": "2024-03-17T14:30:00Z"
+                        }
+                    ]
+                },
+                response_only=True,
+                status_codes=["200"]
+            ),
             OpenApiExample(
                 name="Bad Request (Invalid Query Params)",
                 description="Occurs when provided query parameters are invalid.",
@@ -173,7 +345,150 @@ class CurrencyExchangeViewSet(viewsets.ViewSet):
     )
     @action(detail=False, methods=['get'])
     def history(self, request: Request):
-        user = request.user
+        sources, errors = self._get_history_sources(request)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.query_params.get('pagination') == 'cursor' or 'cursor' in request.query_params:
+            paginator = CurrencyExchangeCursorPagination()
+            paginated_history = paginator.paginate_querysets(sources, request)
+        else:
+            paginator = CurrencyExchangePagination()
+            paginated_history = paginator.paginate_queryset(combine_history_sources(sources), request)
+
+        return paginator.get_paginated_response(CurrencyExchangeSerializer(paginated_history, many=True).data)
+
+    @extend_schema(
+        tags=['Currency Exchange'],
+        parameters=[
+            *HISTORY_FILTER_PARAMETERS,
+            OpenApiParameter(
+                name="file_format",
+                description="Format of the exported file",
+                required=False,
+                type=OpenApiTypes.STR,
+                enum=list(HISTORY_EXPORT_FORMATS),
+                default="csv",
+                location=OpenApiParameter.QUERY,
+            ),
+        ],
+        responses={
+            (200, 'text/csv'): OpenApiTypes.STR,
+            (200, 'application/x-ndjson'): OpenApiTypes.STR,
+            400: OpenApiTypes.OBJECT,
+        },
+        examples=[
+            OpenApiExample(
+                name="CSV export",
+                value="id,currency_code,rate,created_at\n2,USD,41.00,2024-03-18T12:00:00+00:00\n",
+                response_only=True,
+                media_type='text/csv',
+                status_codes=["200"]
+            ),
+            OpenApiExample(
+                name="NDJSON export",
+                value='{"id": 2, "currency_code": "USD", "rate": "41.00", "created_at": "2024-03-18T12:00:00+00:00"}\n',
+                response_only=True,
+                media_type='application/x-ndjson',
+                status_codes=["200"]
+            ),
+        ],
+    )
+    @action(detail=False, methods=['get'])
+    def export_history(self, request: Request):
+        """
+        Streams the whole filtered history as CSV or NDJSON.
+        Records are read from the DB in chunks, so memory use doesn't depend on the history size.
+        """
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in HISTORY_EXPORT_FORMATS:
+            return Response(
+                {"file_format": [f"Must be one of: {', '.join(HISTORY_EXPORT_FORMATS)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        sources, errors = self._get_history_sources(request)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        content_type, stream_history = HISTORY_EXPORT_FORMATS[file_format]
+        response = StreamingHttpResponse(stream_history(sources), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="history.{file_format}"'
+        return response
+
+    @extend_schema(
+        tags=['Currency Exchange'],
+        parameters=[
+            *HISTORY_FILTER_PARAMETERS,
+            OpenApiParameter(
+                name="page",
+                description="Page number for pagination",
+                required=False,
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+            ),
+            OpenApiParameter(
+                name="page_size",
+                description="Number of records per page",
+                required=False,
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+            ),
+        ],
+        responses={
+            200: CurrencyExchangeDailyStatsSerializer(many=True),
+            400: OpenApiTypes.OBJECT,
+            404: OpenApiTypes.OBJECT,
+        },
+        examples=[
+            OpenApiExample(
+                name="Successful Response",
+                description="A paginated list of daily statistics, newest day first.",
+                value={
+                    "count": 1,
+                    "next": None,
+                    "previous": None,
+                    "total_pages": 1,
+                    "current_page": 1,
+                    "results": [
+                        {
+                            "currency_code": "USD",
+                            "day": "2024-03-18",
+                            "records_count": 3,
+                            "min_rate": "40.90",
+                            "max_rate": "41.10",
+                            "avg_rate": "41.00",
+                            "last_rate": "41.05"
+                        }
+                    ]
+                },
+                response_only=True,
+                status_codes=["200"]
+            ),
+        ],
+    )
+    @action(detail=False, methods=['get'])
+    def history_stats(self, request: Request):
+        """
+        Returns min/max/avg/last UAH rate per currency per day of the user's history
+        """
+        filters, errors = self._get_history_filters(request)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        stats = get_daily_stats(CurrencyExchangeDailyRollup.objects.filter(user_id=request.user.id), **filters)
+
+        paginator = CurrencyExchangePagination()
+        paginated_stats = paginator.paginate_queryset(stats, request)
+
+        return paginator.get_paginated_response(CurrencyExchangeDailyStatsSerializer(paginated_stats, many=True).data)
+
+    @staticmethod
+    def _get_history_filters(request: Request) -> tuple[Optional[dict], Optional[dict]]:
+        """
+        Returns the history filters from the query params (as keyword arguments of the filtering functions),
+        or the validation errors of the query params.
+        """
         currency_code = request.query_params.get('currency_code')
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
@@ -188,7 +503,7 @@ class CurrencyExchangeViewSet(viewsets.ViewSet):
 
         serializer = CurrencyExchangeHistoryQueryParamsSerializer(data=serializer_data)
         if not serializer.is_valid():
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            return None, serializer.errors
 
         validated_data = serializer.validated_data
 
@@ -199,11 +514,423 @@ class CurrencyExchangeViewSet(viewsets.ViewSet):
                 end_date=validated_data["date_range"]["end_date"]
             )
 
-        history = CurrencyExchange.objects.filter(user=user)
-        history = apply_currency_exchange_filters(history, validated_data["currency_code"], date_range)
-        history = history.order_by('-created_at')
+        return {"currency_code": validated_data["currency_code"], "date_range": date_range}, None
 
-        paginator = CurrencyExchangePagination()
-        paginated_history = paginator.paginate_queryset(history, request)
+    def _get_history_sources(self, request: Request) -> tuple[Optional[list[QuerySet]], Optional[dict]]:
+        """
+        Returns the querysets the user's history filtered by the query params is read from
+        (the archive is included for date ranges starting before the archive cutoff),
+        or the validation errors of the query params.
+        """
+        filters, errors = self._get_history_filters(request)
+        if errors:
+            return None, errors
 
-        return paginator.get_paginated_response(CurrencyExchangeSerializer(paginated_history, many=True).data)
+        return get_history_sources(request.user.id, **filters), None
+
+
+class CurrencyConversionViewSet(viewsets.ViewSet):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        tags=['Currency Conversion'],
+        request=ConversionRequestSerializer,
+        responses={
+            200: ConversionResponseSerializer,
+            400: OpenApiTypes.OBJECT,
+        },
+        examples=[
+            OpenApiExample(
+                name="Successful conversion",
+                value={
+                    "from_currency": "USD", "to_currency": "EUR", "amount": 100.0,
+                    "rate": 0.9236, "converted_amount": 92.36,
+                },
+                response_only=True,
+                status_codes=[200, ]
+            ),
+            OpenApiExample(
+                name="Unsupported Currency Code",
+                description="Some of the provided currency codes are not supported.",
+                value={"detail": "Unsupported currency codes: XYZ", "codes": ["XYZ"]},
+                response_only=True,
+                status_codes=[400, ]
+            ),
+            OpenApiExample(
+                name="Insufficient Balance",
+                description="The user's balance is insufficient to make the request.",
+                value={"detail": "Insufficient balance."},
+                response_only=True,
+                status_codes=[400, ]
+            ),
+        ],
+    )
+    @action(detail=False, methods=['post'])
+    def convert(self, request: Request):
+        """
+        Converts an amount between any two currencies and takes 1 coin for the request
+        """
+        serializer = ConversionRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        rate_vector = get_rate_vector()
+        if rate_vector is None:
+            return Response({"detail": "Rates are unavailable."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            rate = rate_vector.rate(data['from_currency'], data['to_currency'])
+        except UnsupportedCurrencyError as e:
+            return Response({"detail": str(e), "codes": e.codes}, status=status.HTTP_400_BAD_REQUEST)
+
+        if UserBalance.objects.debit(request.user.id, 1) is None:
+            return Response({"detail": "Insufficient balance."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "from_currency": data['from_currency'],
+            "to_currency": data['to_currency'],
+            "amount": data['amount'],
+            "rate": rate,
+            "converted_amount": round(data['amount'] * rate, 2),
+        })
+
+    @extend_schema(
+        tags=['Currency Conversion'],
+        request=BulkConversionRequestSerializer,
+        responses={
+            200: BulkConversionResponseSerializer,
+            400: OpenApiTypes.OBJECT,
+        },
+        examples=[
+            OpenApiExample(
+                name="Bulk conversion request",
+                value={"from_currencies": ["USD", "EUR"], "to_currencies": ["EUR", "PLN"], "amounts": [100, 250.5]},
+                request_only=True,
+            ),
+            OpenApiExample(
+                name="Successful bulk conversion",
+                value={"converted_amounts": [92.36, 1071.35]},
+                response_only=True,
+                status_codes=[200, ]
+            ),
+        ],
+    )
+    @action(detail=False, methods=['post'])
+    def convert_bulk(self, request: Request):
+        """
+        Converts each amount between the currencies at the same position and takes 1 coin for the request.
+        All amounts are converted at once against the same rate table.
+        """
+        serializer = BulkConversionRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        rate_vector = get_rate_vector()
+        if rate_vector is None:
+            return Response({"detail": "Rates are unavailable."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            converted_amounts = rate_vector.convert(data['from_currencies'], data['to_currencies'], data['amounts'])
+        except UnsupportedCurrencyError as e:
+            return Response({"detail": str(e), "codes": e.codes}, status=status.HTTP_400_BAD_REQUEST)
+
+        if UserBalance.objects.debit(request.user.id, 1) is None:
+            return Response({"detail": "Insufficient balance."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"converted_amounts": np.round(converted_amounts, 2).tolist()})
+
+    @extend_schema(
+        tags=['Currency Conversion'],
+        request={
+            'multipart/form-data': {
+                'type': 'object',
+                'properties': {'file': {'type': 'string', 'format': 'binary'}},
+                'required': ['file'],
+            },
+        },
+        responses={
+            (200, 'text/csv'): OpenApiTypes.STR,
+            400: OpenApiTypes.OBJECT,
+        },
+        examples=[
+            OpenApiExample(
+                name="Converted CSV",
+                value="date,amount,from_currency,to_currency,converted_amount,error\n"
+                      "2024-03-18,100,USD,EUR,92.36,\n"
+                      "2024-03-18,100,XYZ,EUR,,Unsupported currency code\n",
+                response_only=True,
+                media_type='text/csv',
+                status_codes=["200"]
+            ),
+        ],
+    )
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser])
+    def convert_csv(self, request: Request):
+        """
+        Converts every row of an uploaded CSV file (with amount, from_currency and to_currency columns)
+        and takes 1 coin per file, whatever its number of rows. The rows are streamed back with converted_amount
+        and error columns. Rows are converted in chunks against the same rates, so files of any size can be converted.
+        The coin is given back if the conversion fails midway (e.g. a line further in the file isn't UTF-8).
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"file": ["No file was submitted."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            header_line = lines.readline()
+        except UnicodeDecodeError:
+            return Response({"file": ["The file must be UTF-8 encoded."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        missing_columns = missing_csv_columns(next(csv.reader([header_line]), []))
+        if missing_columns:
+            return Response(
+                {"file": [f"Missing columns: {', '.join(missing_columns)}."]}, status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Pinned for the whole file
+        rate_vector = get_rate_vector()
+        if rate_vector is None:
+            return Response({"detail": "Rates are unavailable."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if UserBalance.objects.debit(request.user.id, 1) is None:
+            return Response({"detail": "Insufficient balance."}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            _refund_on_failure(
+                stream_converted_csv(chain([header_line], lines), rate_vector, settings.CONVERSION_CSV_CHUNK_SIZE),
+                request.user.id,
+            ),
+            content_type='text/csv',
+        )
+        response['Content-Disposition'] = 'attachment; filename="converted.csv"'
+        return response
+
+
+def _refund_on_failure(content: Iterator[str], user_id: int) -> Iterator[str]:
+    """
+    Streams the content, giving the coin taken for it back if it fails before the end.
+    The status has already been sent by then, so the client sees the response cut short.
+    """
+    try:
+        yield from content
+    except Exception:
+        UserBalance.objects.credit(user_id, 1)
+        raise
+
+
+class ExchangeRateViewSet(viewsets.ViewSet):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        tags=['Exchange Rates'],
+        parameters=[
+            OpenApiParameter(
+                name="from_currency",
+                description="Currency the rate is given for (e.g., 'USD')",
+                required=True,
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+            ),
+            OpenApiParameter(
+                name="to_currency",
+                description="Currency the rate is expressed in",
+                required=False,
+                type=OpenApiTypes.STR,
+                default="UAH",
+                location=OpenApiParameter.QUERY,
+            ),
+            OpenApiParameter(
+                name="at",
+                description="Return the rate at that time (ISO 8601), exclusive with start and end",
+                required=False,
+                type=OpenApiTypes.DATETIME,
+                location=OpenApiParameter.QUERY,
+            ),
+            OpenApiParameter(
+                name="start",
+                description="Start of the time range to return the rates over (ISO 8601)",
+                required=False,
+                type=OpenApiTypes.DATETIME,
+                location=OpenApiParameter.QUERY,
+            ),
+            OpenApiParameter(
+                name="end",
+                description="End of the time range to return the rates over (ISO 8601)",
+                required=False,
+                type=OpenApiTypes.DATETIME,
+                location=OpenApiParameter.QUERY,
+            ),
+        ],
+        responses={
+            200: HistoricalRateResponseSerializer,
+            400: OpenApiTypes.OBJECT,
+            404: OpenApiTypes.OBJECT,
+        },
+        examples=[
+            OpenApiExample(
+                name="Rate at a given time",
+                value={
+                    "from_currency": "USD", "to_currency": "UAH", "at": "2024-03-18T12:00:00Z",
+                    "fetched_at": "2024-03-18T11:50:00Z", "rate": 39.05,
+                },
+                response_only=True,
+                status_codes=[200, ]
+            ),
+            OpenApiExample(
+                name="Rates over a time range",
+                value={
+                    "count": 2, "next": None, "previous": None, "total_pages": 1, "current_page": 1,
+                    "results": [
+                        {"fetched_at": "2024-03-18T11:50:00Z", "rate": 39.05},
+                        {"fetched_at": "2024-03-18T12:00:00Z", "rate": 39.07},
+                    ],
+                },
+                response_only=True,
+                status_codes=[200, ]
+            ),
+            OpenApiExample(
+                name="No Rate",
+                description="No rate of the currencies was stored at or before the requested time.",
+                value={"detail": "No rate is available at that time."},
+                response_only=True,
+                status_codes=[404, ]
+            ),
+        ],
+    )
+    @action(detail=False, methods=['get'])
+    def history(self, request: Request):
+        """
+        Returns the rate between two currencies at a given time, or every rate over a time range.
+        Rates are read from the stored rate snapshots, so the upstream API is never called.
+        """
+        serializer = RateHistoryQueryParamsSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        if 'at' not in data:
+            paginator = RateHistoryPagination()
+            series = paginator.paginate_queryset(
+                get_rate_series(data['from_currency'], data['to_currency'], data['start'], data['end']), request,
+            )
+            points = [{"fetched_at": point['fetched_at'], "rate": snapshot_rate(point)} for point in series]
+            return paginator.get_paginated_response(RateSeriesPointSerializer(points, many=True).data)
+
+        snapshot_rates = get_historical_rate(data['from_currency'], data['to_currency'], data['at'])
+        rate = snapshot_rate(snapshot_rates) if snapshot_rates is not None else None
+        if rate is None:
+            return Response({"detail": "No rate is available at that time."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(HistoricalRateResponseSerializer({
+            "from_currency": data['from_currency'],
+            "to_currency": data['to_currency'],
+            "at": data['at'],
+            "fetched_at": snapshot_rates['fetched_at'],
+            "rate": rate,
+        }).data)
+
+
+async def _authenticate_async_request(request: HttpRequest, allow_query_param: bool = False):
+    """
+    Returns the user of the access token from the Authorization header or, if allowed
+    (browsers' EventSource can't set headers), from the access_token query parameter.
+    Returns None if there's no valid token.
+    The user is set on the request too, for the middleware that runs after the view.
+    """
+    header = request.headers.get('Authorization', '')
+    raw_token = header.removeprefix('Bearer ').strip() if header.startswith('Bearer ') else None
+    if allow_query_param:
+        raw_token = raw_token or request.GET.get('access_token')
+    if not raw_token:
+        return None
+
+    authentication = StatelessJWTAuthentication()
+    try:
+        validated_token = authentication.get_validated_token(raw_token)
+        request.user = await sync_to_async(authentication.get_user)(validated_token)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+    return request.user
+
+
+@require_GET
+async def rate_stream(request: HttpRequest):
+    """
+    Streams the rates as server-sent events: the current ones first, then every new rate snapshot.
+    Only the currencies listed in the comma-separated currencies query parameter are sent,
+    all of them if it's missing. Served by the ASGI deployment.
+
+    A new connection takes 1 coin and pays for RATE_STREAM_MAX_DURATION seconds of streaming.
+    Reconnects sent with a Last-Event-ID within that period are free and closed when it ends,
+    the reconnect that follows takes another coin.
+    """
+    user = await _authenticate_async_request(request, allow_query_param=True)
+    if user is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided or are invalid."},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+
+    last_event_id = request.headers.get('Last-Event-ID')
+    now = time.time()
+    max_duration = await get_paid_stream_time(user.id, last_event_id, now)
+    if not max_duration:
+        if await sync_to_async(UserBalance.objects.debit)(user.id, 1) is None:
+            return JsonResponse({"detail": "Insufficient balance."}, status=status.HTTP_400_BAD_REQUEST)
+        mark_as_written(request)
+        max_duration = settings.RATE_STREAM_MAX_DURATION
+        await start_paid_stream_period(user.id, now, max_duration)
+
+    currency_codes = [code for code in request.GET.get('currencies', '').split(',') if code]
+    response = StreamingHttpResponse(
+        stream_rate_updates(
+            rate_broadcaster,
+            currency_codes,
+            last_event_id=last_event_id,
+            keepalive_interval=settings.RATE_STREAM_KEEPALIVE_INTERVAL,
+            max_duration=max_duration,
+        ),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@csrf_exempt
+@require_POST
+async def create_currency_exchange_record_async(request: HttpRequest):
+    """
+    Async counterpart of create_currency_exchange_record, served by the ASGI deployment.
+    The worker isn't blocked while the rate is fetched from upstream or the DB is queried,
+    so it can serve other requests meanwhile.
+    """
+    user = await _authenticate_async_request(request)
+    if user is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided or are invalid."},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({"detail": "JSON parse error."}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = CreateCurrencyExchangeRecordRequestSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    currency_code = serializer.validated_data['currency_code']
+
+    rate = await aget_exchange_rate(currency_code)
+    if rate is None:
+        return JsonResponse({"detail": "Invalid currency code or API error."}, status=status.HTTP_400_BAD_REQUEST)
+
+    if await sync_to_async(record_currency_exchange)(user.id, currency_code, rate) is None:
+        return JsonResponse({"detail": "Insufficient balance."}, status=status.HTTP_400_BAD_REQUEST)
+
+    return JsonResponse({"currency_code": currency_code, "rate": round(rate, 2)})
@@ -1,3 +1,4 @@
+import copy
 import os
 from datetime import timedelta
 from pathlib import Path
@@ -47,6 +48,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -82,6 +84,71 @@ DATABASES = {
         "PASSWORD": os.getenv("SQL_PASSWORD"),
         "HOST": os.getenv("SQL_HOST"),
         "PORT": os.getenv("SQL_PORT"),
+        # Seconds each worker thread keeps its connection open for the following requests,
+        # 0 opens a new connection for every request
+        "CONN_MAX_AGE": int(os.getenv("SQL_CONN_MAX_AGE", default=60)),
+        # Check that a kept connection still works before a request uses it
+        "CONN_HEALTH_CHECKS": bool(int(os.getenv("SQL_CONN_HEALTH_CHECKS", default=1))),
+        # Server-side cursors (used to stream history exports) don't survive PgBouncer's transaction pooling
+        "DISABLE_SERVER_SIDE_CURSORS": bool(int(os.getenv("SQL_PGBOUNCER", default=0))),
+        "OPTIONS": {},
+    }
+}
+
+if DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
+    # Connections of each worker process are shared by its threads through psycopg's pool (seconds, unless stated otherwise)
+    if bool(int(os.getenv("SQL_POOL", default=0))):
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": int(os.getenv("SQL_POOL_MIN_SIZE", default=2)),
+            "max_size": int(os.getenv("SQL_POOL_MAX_SIZE", default=10)),
+            # How long a request waits for a free connection before failing
+            "timeout": float(os.getenv("SQL_POOL_TIMEOUT", default=10)),
+            "max_idle": float(os.getenv("SQL_POOL_MAX_IDLE", default=300)),
+            "max_lifetime": float(os.getenv("SQL_POOL_MAX_LIFETIME", default=3600)),
+        }
+        # Pooled connections are returned to the pool after each request instead
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+
+    # PgBouncer in transaction pooling mode may run each transaction on another server connection,
+    # so statements prepared on one of them can't be reused
+    if DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"]:
+        DATABASES["default"]["OPTIONS"]["prepare_threshold"] = None
+
+# Read replicas, as comma-separated host[:port] pairs, reached with the credentials of the primary.
+# The safe requests to REPLICA_READ_PATHS read from one of them, everything else uses the primary
+DATABASE_REPLICAS = []
+for number, replica_host in enumerate(filter(None, os.getenv("SQL_REPLICA_HOSTS", default="").split(",")), start=1):
+    host, _, port = replica_host.strip().partition(":")
+    alias = f"replica_{number}"
+    DATABASES[alias] = {
+        **copy.deepcopy(DATABASES["default"]),
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        # Tests read the data they have just written
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["apps.core.db_routers.PrimaryReplicaRouter"]
+
+REPLICA_READ_PATHS = [
+    "/api/v1/balance/",
+    "/api/v1/history/",
+    "/api/v1/rates/history/",
+]
+
+# Seconds the reads of a user go to the primary after they've written something,
+# should be longer than the usual replication lag
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", default=5))
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Must be shared by all workers (e.g. Redis) for cross-worker coordination to work
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
     }
 }
 
@@ -129,7 +196,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',  # OAuth2, JWT
+        'apps.accounts.authentication.StatelessJWTAuthentication',  # JWT, request.user is built from its claims
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
@@ -142,8 +209,18 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=25),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=3),
     "SIGNING_KEY": os.getenv("JWT_SIGNING_KEY", SECRET_KEY),
+    'TOKEN_OBTAIN_SERIALIZER': 'apps.accounts.serializers.AccountTokenObtainPairSerializer',
+    'TOKEN_USER_CLASS': 'apps.accounts.authentication.AccountTokenUser',
 }
 
+# How long the state of an account is cached once checked by the request authentication (seconds),
+# 0 trusts the access token claims until it expires, so no query is made to authenticate requests
+ACCOUNT_STATE_CACHE_TTL = int(os.getenv("ACCOUNT_STATE_CACHE_TTL", default=0))
+
+# How long a balance stays cached (seconds). Changes made by the app drop it from the cache,
+# so this only bounds how long a balance changed outside of the app may be served
+BALANCE_CACHE_TTL = int(os.getenv("BALANCE_CACHE_TTL", default=300))
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Currency Exchange Rate API',
     'VERSION': '1.0.0',
@@ -151,3 +228,70 @@ SPECTACULAR_SETTINGS = {
 }
 
 EXCHANGE_RATE_API_KEY = os.getenv("EXCHANGE_RATE_API_KEY")
+EXCHANGE_RATE_API_URL = os.getenv("EXCHANGE_RATE_API_URL", "https://v6.exchangerate-api.com/v6")
+# Upstream client (seconds, unless stated otherwise)
+EXCHANGE_RATE_API_CONNECT_TIMEOUT = float(os.getenv("EXCHANGE_RATE_API_CONNECT_TIMEOUT", default=3.05))
+EXCHANGE_RATE_API_READ_TIMEOUT = float(os.getenv("EXCHANGE_RATE_API_READ_TIMEOUT", default=5))
+EXCHANGE_RATE_API_MAX_RETRIES = int(os.getenv("EXCHANGE_RATE_API_MAX_RETRIES", default=2))
+# Base delay of the jittered exponential backoff between retries
+EXCHANGE_RATE_API_RETRY_BACKOFF = float(os.getenv("EXCHANGE_RATE_API_RETRY_BACKOFF", default=0.2))
+# Max number of keep-alive connections kept open by each worker
+EXCHANGE_RATE_API_POOL_SIZE = int(os.getenv("EXCHANGE_RATE_API_POOL_SIZE", default=10))
+# Max number of connections of each ASGI worker, i.e. of upstream calls it can have in flight
+EXCHANGE_RATE_API_ASYNC_POOL_SIZE = int(os.getenv("EXCHANGE_RATE_API_ASYNC_POOL_SIZE", default=200))
+# Consecutive failures after which the upstream isn't called for EXCHANGE_RATE_API_CIRCUIT_RESET_TIMEOUT
+EXCHANGE_RATE_API_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("EXCHANGE_RATE_API_CIRCUIT_FAILURE_THRESHOLD", default=5))
+EXCHANGE_RATE_API_CIRCUIT_RESET_TIMEOUT = float(os.getenv("EXCHANGE_RATE_API_CIRCUIT_RESET_TIMEOUT", default=30))
+# Currency whose rate table is fetched from upstream, rates of other currencies are derived from it
+EXCHANGE_RATE_BASE_CURRENCY = os.getenv("EXCHANGE_RATE_BASE_CURRENCY", "UAH")
+# Where the request path takes rate tables from:
+# "snapshot" - the latest snapshot stored by the refresh_rate_snapshots command (never calls upstream)
+# "mmap" - the memory-mapped snapshot file shared by all workers (never calls upstream)
+# "http" - upstream, on demand
+EXCHANGE_RATE_BACKEND = os.getenv("EXCHANGE_RATE_BACKEND", "snapshot")
+# How often the refresh_rate_snapshots command fetches a new rate table (seconds)
+EXCHANGE_RATE_SNAPSHOT_REFRESH_INTERVAL = int(os.getenv("EXCHANGE_RATE_SNAPSHOT_REFRESH_INTERVAL", default=600))
+# Snapshots older than that are deleted by the refresh_rate_snapshots command (days), bounds the rate history,
+# 0 keeps every snapshot. The latest snapshot is never deleted
+EXCHANGE_RATE_SNAPSHOT_RETENTION_DAYS = int(os.getenv("EXCHANGE_RATE_SNAPSHOT_RETENTION_DAYS", default=365))
+# Memory-mapped snapshot file written by the refresh_rate_snapshots command, required by the "mmap" backend
+EXCHANGE_RATE_SNAPSHOT_PATH = os.getenv("EXCHANGE_RATE_SNAPSHOT_PATH", "")
+# How often each worker checks for a newer snapshot (seconds)
+EXCHANGE_RATE_SNAPSHOT_POLL_INTERVAL = int(os.getenv("EXCHANGE_RATE_SNAPSHOT_POLL_INTERVAL", default=10))
+# How long workers wait for another worker fetching the same rate table before fetching it themselves (seconds)
+EXCHANGE_RATE_SINGLE_FLIGHT_TIMEOUT = float(os.getenv("EXCHANGE_RATE_SINGLE_FLIGHT_TIMEOUT", default=20))
+EXCHANGE_RATE_SINGLE_FLIGHT_POLL_INTERVAL = float(os.getenv("EXCHANGE_RATE_SINGLE_FLIGHT_POLL_INTERVAL", default=0.05))
+
+# In-process cache of upstream rate tables (seconds)
+EXCHANGE_RATE_CACHE_TTL = int(os.getenv("EXCHANGE_RATE_CACHE_TTL", default=60))
+# How long an expired table may still be served while it's refreshed in the background
+EXCHANGE_RATE_CACHE_STALE_TTL = int(os.getenv("EXCHANGE_RATE_CACHE_STALE_TTL", default=300))
+EXCHANGE_RATE_CACHE_MAX_SIZE = int(os.getenv("EXCHANGE_RATE_CACHE_MAX_SIZE", default=256))
+# How long each worker keeps the set of supported currency codes before reloading it (seconds)
+SUPPORTED_CURRENCY_CODES_TTL = int(os.getenv("SUPPORTED_CURRENCY_CODES_TTL", default=600))
+
+# Number of records fetched from the DB at once while exporting the history
+HISTORY_EXPORT_CHUNK_SIZE = int(os.getenv("HISTORY_EXPORT_CHUNK_SIZE", default=2000))
+
+# Months after the current one to pre-create history partitions for (PostgreSQL only)
+HISTORY_PARTITION_MONTHS_AHEAD = int(os.getenv("HISTORY_PARTITION_MONTHS_AHEAD", default=3))
+# Past months of history kept attached by manage_partitions, 0 keeps every month
+HISTORY_PARTITION_RETENTION_MONTHS = int(os.getenv("HISTORY_PARTITION_RETENTION_MONTHS", default=0))
+
+# Records older than that (days) are moved to the archive table by archive_exchange_history,
+# the history includes them only when the requested date range starts before that
+HISTORY_HOT_RETENTION_DAYS = int(os.getenv("HISTORY_HOT_RETENTION_DAYS", default=365))
+# Number of records moved to the archive per transaction
+HISTORY_ARCHIVE_BATCH_SIZE = int(os.getenv("HISTORY_ARCHIVE_BATCH_SIZE", default=5000))
+
+# Max number of amounts converted by a single bulk conversion request
+CONVERSION_BULK_MAX_SIZE = int(os.getenv("CONVERSION_BULK_MAX_SIZE", default=100_000))
+
+# Number of CSV rows converted at once by the CSV conversion
+CONVERSION_CSV_CHUNK_SIZE = int(os.getenv("CONVERSION_CSV_CHUNK_SIZE", default=10_000))
+
+# Live rate stream (seconds): how often each ASGI worker checks for a new snapshot while it has subscribers,
+# how long a connection may stay silent before a keepalive comment is sent and how long it's kept open
+RATE_STREAM_POLL_INTERVAL = float(os.getenv("RATE_STREAM_POLL_INTERVAL", default=2))
+RATE_STREAM_KEEPALIVE_INTERVAL = float(os.getenv("RATE_STREAM_KEEPALIVE_INTERVAL", default=15))
+RATE_STREAM_MAX_DURATION = float(os.getenv("RATE_STREAM_MAX_DURATION", default=3600))
@@ -3,6 +3,7 @@ from rest_framework import status
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from apps.balance.cache import get_cached_balance
 from apps.balance.models import UserBalance
 
 
@@ -41,6 +42,15 @@ class UserRegistrationTests(APITestCase):
         user_balance = UserBalance.objects.get(user=user)
         self.assertEqual(user_balance.balance, 1000)
 
+    def test_register_leaves_no_cached_balance(self):
+        """Test that the registration invalidates the cache, so the initial balance is loaded from the DB"""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.register_url, self.valid_data)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user = Account.objects.get(email=self.valid_data["email"])
+        self.assertIsNone(get_cached_balance(user.id))
+
     def test_register_passwords_do_not_match(self):
         """Test that registration fails when passwords do not match"""
         invalid_data = self.valid_data.copy()
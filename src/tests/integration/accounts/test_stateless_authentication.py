@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.accounts.tokens import AccountRefreshToken
+from apps.balance.models import UserBalance
+
+Account = get_user_model()
+
+
+class TestStatelessAuthentication(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(email="test@example.com", password="testpassword")
+        UserBalance.objects.create(user=self.user)
+        self.balance_url = reverse("get_balance")
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def get_balance(self, token):
+        return self.client.get(self.balance_url, HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_obtained_tokens_carry_is_active_claim(self):
+        """Test that the obtained and refreshed access tokens carry the is_active claim."""
+        response = self.client.post(
+            reverse("token_obtain_pair"), {"email": "test@example.com", "password": "testpassword"}, format="json",
+        )
+        self.assertTrue(AccessToken(response.data["access"])["is_active"])
+
+        response = self.client.post(reverse("token_refresh"), {"refresh": response.data["refresh"]}, format="json")
+        self.assertTrue(AccessToken(response.data["access"])["is_active"])
+
+    def test_token_of_inactive_account_is_rejected(self):
+        """Test that a token claiming an inactive account is rejected without loading the account."""
+        self.user.is_active = False
+        token = AccountRefreshToken.for_user(self.user).access_token
+
+        with self.assertNumQueries(0):
+            response = self.get_balance(token)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_account_keeps_access_without_state_check(self):
+        """Test that the claims are trusted until the token expires if the account state isn't checked."""
+        token = AccountRefreshToken.for_user(self.user).access_token
+        Account.objects.filter(id=self.user.id).update(is_active=False)
+
+        response = self.get_balance(token)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(ACCOUNT_STATE_CACHE_TTL=30)
+    def test_deactivated_account_is_rejected_with_state_check(self):
+        """Test that the account state is checked once, then served from the cache until it expires."""
+        token = AccountRefreshToken.for_user(self.user).access_token
+
+        with self.assertNumQueries(2):  # The account state and the balance
+            self.assertEqual(self.get_balance(token).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):  # Both are cached
+            self.assertEqual(self.get_balance(token).status_code, status.HTTP_200_OK)
+
+        Account.objects.filter(id=self.user.id).update(is_active=False)
+        cache.clear()  # The cached state has expired
+
+        self.assertEqual(self.get_balance(token).status_code, status.HTTP_401_UNAUTHORIZED)
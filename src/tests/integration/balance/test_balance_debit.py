@@ -0,0 +1,73 @@
+import threading
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+
+from apps.balance.models import UserBalance
+
+Account = get_user_model()
+
+
+class TestBalanceDebit(TestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(email="test@example.com", password="password123")
+        UserBalance.objects.create(user=self.user, balance=5)
+
+    def test_debit_returns_new_balance(self):
+        """Test that the debit returns the balance left."""
+        self.assertEqual(UserBalance.objects.debit(self.user.id, 2), 3)
+        self.assertEqual(UserBalance.objects.get(user=self.user).balance, 3)
+
+    def test_debit_takes_the_whole_balance(self):
+        """Test that the balance can be spent down to zero."""
+        self.assertEqual(UserBalance.objects.debit(self.user.id, 5), 0)
+
+    def test_insufficient_balance(self):
+        """Test that the balance is left untouched if it's insufficient."""
+        self.assertIsNone(UserBalance.objects.debit(self.user.id, 6))
+        self.assertEqual(UserBalance.objects.get(user=self.user).balance, 5)
+
+    def test_missing_balance(self):
+        """Test that a user without a balance can't be debited."""
+        user = Account.objects.create_user(email="nobalance@example.com", password="password123")
+        self.assertIsNone(UserBalance.objects.debit(user.id, 1))
+
+    def test_debit_is_a_single_query(self):
+        """Test that the check and the debit are made in one round trip."""
+        with self.assertNumQueries(1):
+            UserBalance.objects.debit(self.user.id, 1)
+
+
+@skipUnlessDBFeature('has_select_for_update')  # Concurrent writers need row-level locking (PostgreSQL)
+class TestConcurrentBalanceDebit(TransactionTestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(email="test@example.com", password="password123")
+        UserBalance.objects.create(user=self.user, balance=20)
+
+    def test_concurrent_debits_never_overdraw(self):
+        """Test that exactly as many debits succeed as the balance allows, whatever the interleaving."""
+        workers = 50
+        barrier = threading.Barrier(workers)
+        results = []
+        lock = threading.Lock()
+
+        def debit():
+            try:
+                barrier.wait(timeout=10)
+                new_balance = UserBalance.objects.debit(self.user.id, 1)
+                with lock:
+                    results.append(new_balance)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=debit) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+
+        successful = [balance for balance in results if balance is not None]
+        self.assertEqual(len(results), workers)
+        self.assertEqual(len(successful), 20)
+        self.assertEqual(sorted(successful), list(range(20)))
+        self.assertEqual(UserBalance.objects.get(user=self.user).balance, 0)
@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -19,6 +20,9 @@ class TestBalanceRetrieval(APITestCase):
         self.auth_headers = {"HTTP_AUTHORIZATION": f"Bearer {self.token}"}
         self.balance_url = reverse("get_balance")
 
+        cache.clear()
+        self.addCleanup(cache.clear)
+
     def test_get_balance_successfully(self):
         """Test retrieving balance for an authenticated user"""
 
@@ -26,3 +30,96 @@ class TestBalanceRetrieval(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["balance"], 1000)
+
+    def test_get_balance_is_a_single_query(self):
+        """Test that the user is authenticated from the token claims, so only the balance is queried."""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.balance_url, **self.auth_headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cached_balance_is_served_without_queries(self):
+        """Test that the balance is queried once, then served from the cache."""
+        self.client.get(self.balance_url, **self.auth_headers)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.balance_url, **self.auth_headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["balance"], 1000)
+
+    def test_unchanged_balance_is_not_modified(self):
+        """Test that a client sending back the ETag of an unchanged balance gets a bodyless 304."""
+        response = self.client.get(self.balance_url, **self.auth_headers)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertFalse(response.has_header("Last-Modified"))
+
+        not_modified_response = self.client.get(
+            self.balance_url, HTTP_IF_NONE_MATCH=response["ETag"], **self.auth_headers,
+        )
+
+        self.assertEqual(not_modified_response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified_response.content, b"")
+        self.assertEqual(not_modified_response["ETag"], response["ETag"])
+
+    def test_debit_invalidates_cached_balance(self):
+        """Test that a debit drops the cached balance, so the next read loads the new one."""
+        response = self.client.get(self.balance_url, **self.auth_headers)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserBalance.objects.debit(self.user.id, 1)
+
+        with self.assertNumQueries(1):
+            changed_response = self.client.get(
+                self.balance_url, HTTP_IF_NONE_MATCH=response["ETag"], **self.auth_headers,
+            )
+
+        self.assertEqual(changed_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(changed_response.data["balance"], 999)
+        self.assertNotEqual(changed_response["ETag"], response["ETag"])
+
+    def test_debits_within_a_second_change_etag(self):
+        """Test that each of several debits made within the same second changes the ETag."""
+        etags = {self.client.get(self.balance_url, **self.auth_headers)["ETag"]}
+
+        for _ in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                UserBalance.objects.debit(self.user.id, 1)
+            etags.add(self.client.get(self.balance_url, **self.auth_headers)["ETag"])
+
+        self.assertEqual(len(etags), 4)
+
+    def test_rolled_back_debit_is_not_cached(self):
+        """Test that a debit whose transaction is rolled back never reaches the cache."""
+        self.client.get(self.balance_url, **self.auth_headers)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            UserBalance.objects.debit(self.user.id, 1)
+        callbacks.clear()  # Like a rollback, the invalidation never runs
+
+        response = self.client.get(self.balance_url, **self.auth_headers)
+        self.assertEqual(response.data["balance"], 1000)
+
+    def test_edited_balance_invalidates_cached_balance(self):
+        """Test that a balance saved through the model (e.g. edited in the admin) drops the cached balance."""
+        self.client.get(self.balance_url, **self.auth_headers)
+
+        user_balance = UserBalance.objects.get(user=self.user)
+        user_balance.balance = 50
+        with self.captureOnCommitCallbacks(execute=True):
+            user_balance.save()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.balance_url, **self.auth_headers)
+
+        self.assertEqual(response.data["balance"], 50)
+
+    def test_deleted_balance_is_forgotten(self):
+        """Test that a deleted balance isn't served from the cache anymore."""
+        self.client.get(self.balance_url, **self.auth_headers)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserBalance.objects.get(user=self.user).delete()
+
+        response = self.client.get(self.balance_url, **self.auth_headers)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,57 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.balance.models import UserBalance
+from apps.core.db_routers import is_pinned_to_primary
+from apps.currency_exchange.services import supported_currency_codes_cache
+
+Account = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class TestReplicaPinning(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(email="test@example.com", password="testpassword")
+        UserBalance.objects.create(user=self.user, balance=5)
+        self.auth_headers = {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(self.user).access_token}"}
+
+        supported_currency_codes_cache.clear()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_registration_pins_new_user(self):
+        """Test that a new user reads their balance from the primary right after registering."""
+        response = self.client.post(reverse("register_the_user"), {
+            "email": "new@example.com",
+            "first_name": "New",
+            "last_name": "User",
+            "password1": "StrongPassword123!",
+            "password2": "StrongPassword123!",
+        }, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(is_pinned_to_primary(Account.objects.get(email="new@example.com").id))
+
+    @patch("apps.currency_exchange.views.get_exchange_rate", return_value=41.09)
+    def test_debit_pins_user(self, mock_get_exchange_rate):
+        """Test that a user reads their balance from the primary right after a debit."""
+        response = self.client.post(
+            reverse("create_currency_exchange_record"), {"currency_code": "USD"}, format="json", **self.auth_headers,
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(is_pinned_to_primary(self.user.id))
+
+    def test_reads_do_not_pin_user(self):
+        """Test that reading the balance doesn't pin the user."""
+        response = self.client.get(reverse("get_balance"), **self.auth_headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(is_pinned_to_primary(self.user.id))
@@ -4,7 +4,8 @@ from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
-from apps.currency_exchange.models import CurrencyExchange
+from apps.currency_exchange.models import CurrencyExchange, RateSnapshot
+from apps.currency_exchange.services import supported_currency_codes_cache
 from apps.balance.models import UserBalance
 
 Account = get_user_model()
@@ -19,6 +20,8 @@ class CreateCurrencyExchangeRecordTests(APITestCase):
 
         self.url = reverse("create_currency_exchange_record")
 
+        supported_currency_codes_cache.clear()
+
     @patch("apps.currency_exchange.views.get_exchange_rate")
     def test_create_currency_exchange_success(self, mock_get_exchange_rate):
         """Test successfully creating a currency exchange record with a valid currency code."""
@@ -33,14 +36,46 @@ class CreateCurrencyExchangeRecordTests(APITestCase):
         self.user_balance.refresh_from_db()
         self.assertEqual(self.user_balance.balance, 4)  # Ensure balance decreased by 1
 
-        self.assertEqual(CurrencyExchange.objects.filter(user=self.user, currency_code="USD").count(), 1)
+        self.assertEqual(CurrencyExchange.objects.filter(user=self.user, currency__code="USD").count(), 1)
 
     @patch("apps.currency_exchange.views.get_exchange_rate")
     def test_create_currency_exchange_invalid_currency(self, mock_get_exchange_rate):
-        """Test failing to create a record due to an invalid currency code."""
+        """Test that an unsupported currency code is rejected without looking up the rate."""
+        response = self.client.post(self.url, {"currency_code": "INVALID"}, format="json", **self.auth_headers)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["currency_code"], ["Unsupported currency code."])
+        mock_get_exchange_rate.assert_not_called()
+
+        self.user_balance.refresh_from_db()
+        self.assertEqual(self.user_balance.balance, 5)  # Balance should remain unchanged
+
+    @patch("apps.currency_exchange.views.get_exchange_rate")
+    def test_create_currency_exchange_missing_currency(self, mock_get_exchange_rate):
+        """Test that a request without a currency code is rejected without looking up the rate."""
+        response = self.client.post(self.url, {}, format="json", **self.auth_headers)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("currency_code", response.data)
+        mock_get_exchange_rate.assert_not_called()
+
+    @patch("apps.currency_exchange.views.get_exchange_rate")
+    def test_supported_codes_follow_latest_snapshot(self, mock_get_exchange_rate):
+        """Test that codes missing from the latest rate snapshot are rejected."""
+        RateSnapshot.objects.create(base_code="UAH", rates={"UAH": 1, "USD": 0.025})
+
+        response = self.client.post(self.url, {"currency_code": "GBP"}, format="json", **self.auth_headers)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["currency_code"], ["Unsupported currency code."])
+        mock_get_exchange_rate.assert_not_called()
+
+    @patch("apps.currency_exchange.views.get_exchange_rate")
+    def test_create_currency_exchange_api_error(self, mock_get_exchange_rate):
+        """Test failing to create a record when the rate of a supported currency isn't available."""
         mock_get_exchange_rate.return_value = None  # Mock API failure
 
-        response = self.client.post(self.url, {"currency_code": "INVALID"}, format="json", **self.auth_headers)
+        response = self.client.post(self.url, {"currency_code": "USD"}, format="json", **self.auth_headers)
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.data["detail"], "Invalid currency code or API error.")
@@ -0,0 +1,130 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.currency_exchange.models import CurrencyExchange, RateSnapshot
+from apps.currency_exchange.services import (
+    http_rate_table_cache,
+    snapshot_rate_table_cache,
+    supported_currency_codes_cache,
+)
+from apps.balance.models import UserBalance
+from apps.core.db_routers import is_pinned_to_primary
+
+Account = get_user_model()
+
+
+@override_settings(EXCHANGE_RATE_BACKEND="http", EXCHANGE_RATE_BASE_CURRENCY="UAH")
+class CreateCurrencyExchangeRecordAsyncTests(TestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(email="test@example.com", password="testpassword")
+        self.user_balance = UserBalance.objects.create(user=self.user, balance=5)
+
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_headers = {"Authorization": f"Bearer {self.token}"}
+
+        self.url = reverse("create_currency_exchange_record_async")
+
+        for rate_cache in (supported_currency_codes_cache, http_rate_table_cache, snapshot_rate_table_cache):
+            rate_cache.clear()
+            self.addCleanup(rate_cache.clear)
+
+    async def post(self, data, headers=None):
+        return await self.async_client.post(
+            self.url, data, content_type="application/json",
+            headers=headers if headers is not None else self.auth_headers,
+        )
+
+    @patch("apps.currency_exchange.services.afetch_conversion_rates", new_callable=AsyncMock)
+    async def test_create_currency_exchange_success(self, mock_afetch_conversion_rates):
+        """Test creating a record with the rate fetched by the async upstream client."""
+        mock_afetch_conversion_rates.return_value = {"UAH": 1, "USD": 0.025}
+
+        response = await self.post({"currency_code": "USD"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"currency_code": "USD", "rate": 40.0})
+        mock_afetch_conversion_rates.assert_awaited_once_with("UAH")
+
+        await self.user_balance.arefresh_from_db()
+        self.assertEqual(self.user_balance.balance, 4)
+        self.assertEqual(await CurrencyExchange.objects.filter(user=self.user, currency__code="USD").acount(), 1)
+
+    @override_settings(DATABASE_REPLICAS=["replica"])
+    @patch("apps.currency_exchange.services.afetch_conversion_rates", new_callable=AsyncMock)
+    async def test_create_currency_exchange_pins_user_to_primary(self, mock_afetch_conversion_rates):
+        """Test that the user reads from the primary right after a record is created on the async path."""
+        mock_afetch_conversion_rates.return_value = {"UAH": 1, "USD": 0.025}
+
+        response = await self.post({"currency_code": "USD"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(is_pinned_to_primary(self.user.id))
+
+    @patch("apps.currency_exchange.services.afetch_conversion_rates", new_callable=AsyncMock)
+    async def test_concurrent_requests_share_one_fetch(self, mock_afetch_conversion_rates):
+        """Test that concurrent requests missing the rate table wait for a single upstream call."""
+        async def slow_fetch(base_code):
+            await asyncio.sleep(0.05)
+            return {"UAH": 1, "USD": 0.025}
+
+        mock_afetch_conversion_rates.side_effect = slow_fetch
+
+        responses = await asyncio.gather(*(self.post({"currency_code": "USD"}) for _ in range(3)))
+
+        self.assertEqual([response.status_code for response in responses], [status.HTTP_200_OK] * 3)
+        mock_afetch_conversion_rates.assert_awaited_once()
+
+    @patch("apps.currency_exchange.services.afetch_conversion_rates", new_callable=AsyncMock)
+    async def test_create_currency_exchange_api_error(self, mock_afetch_conversion_rates):
+        """Test that nothing is charged when the rate isn't available."""
+        mock_afetch_conversion_rates.return_value = None
+
+        response = await self.post({"currency_code": "USD"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"detail": "Invalid currency code or API error."})
+        await self.user_balance.arefresh_from_db()
+        self.assertEqual(self.user_balance.balance, 5)
+
+    @patch("apps.currency_exchange.services.afetch_conversion_rates", new_callable=AsyncMock)
+    async def test_create_currency_exchange_invalid_currency(self, mock_afetch_conversion_rates):
+        """Test that an unsupported currency code is rejected without looking up the rate."""
+        response = await self.post({"currency_code": "INVALID"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"currency_code": ["Unsupported currency code."]})
+        mock_afetch_conversion_rates.assert_not_awaited()
+
+    @patch("apps.currency_exchange.services.afetch_conversion_rates", new_callable=AsyncMock)
+    async def test_create_currency_exchange_insufficient_balance(self, mock_afetch_conversion_rates):
+        """Test that no record is created if the user can't pay for it."""
+        mock_afetch_conversion_rates.return_value = {"UAH": 1, "USD": 0.025}
+        await UserBalance.objects.filter(user=self.user).aupdate(balance=0)
+
+        response = await self.post({"currency_code": "USD"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"detail": "Insufficient balance."})
+        self.assertFalse(await CurrencyExchange.objects.aexists())
+
+    @override_settings(EXCHANGE_RATE_BACKEND="snapshot")
+    @patch("apps.currency_exchange.services.afetch_conversion_rates", new_callable=AsyncMock)
+    async def test_create_currency_exchange_from_snapshot(self, mock_afetch_conversion_rates):
+        """Test that the snapshot backend is also served, without calling upstream."""
+        await RateSnapshot.objects.acreate(base_code="UAH", rates={"UAH": 1, "USD": 0.02})
+
+        response = await self.post({"currency_code": "USD"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"currency_code": "USD", "rate": 50.0})
+        mock_afetch_conversion_rates.assert_not_awaited()
+
+    async def test_requires_authentication(self):
+        """Test that requests without a valid token are rejected."""
+        response = await self.post({"currency_code": "USD"}, headers={})
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,110 @@
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.currency_exchange.models import CurrencyExchange, CurrencyExchangeDailyRollup
+from apps.currency_exchange.services import CrossRateTable, supported_currency_codes_cache
+from apps.balance.models import UserBalance
+
+Account = get_user_model()
+
+
+class CreateCurrencyExchangeRecordsTests(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(email="test@example.com", password="testpassword")
+        self.user_balance = UserBalance.objects.create(user=self.user, balance=5)
+
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_headers = {"HTTP_AUTHORIZATION": f"Bearer {self.token}"}
+
+        self.url = reverse("create_currency_exchange_records")
+
+        supported_currency_codes_cache.clear()
+
+        # GBP is supported, but missing from the rate table
+        patcher = patch(
+            "apps.currency_exchange.services.get_rate_table",
+            return_value=CrossRateTable("UAH", {"UAH": 1, "USD": 0.025, "EUR": 0.02}),
+        )
+        self.mock_get_rate_table = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, currency_codes):
+        return self.client.post(self.url, {"currency_codes": currency_codes}, format="json", **self.auth_headers)
+
+    def test_create_records(self):
+        """Test that every currency is resolved from one rate table and charged with one debit."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.post(["USD", "EUR"])
+        queries = [query["sql"] for query in context.captured_queries]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [
+            {"currency_code": "USD", "rate": 40.0},
+            {"currency_code": "EUR", "rate": 50.0},
+        ])
+        self.mock_get_rate_table.assert_called_once()
+        self.assertEqual(len([sql for sql in queries if sql.startswith('UPDATE "balance_userbalance"')]), 1)
+        self.assertEqual(len([sql for sql in queries if sql.startswith('INSERT INTO "currency_exchange_currencyexchange"')]), 1)
+
+        self.user_balance.refresh_from_db()
+        self.assertEqual(self.user_balance.balance, 3)
+        self.assertEqual(
+            set(CurrencyExchange.objects.filter(user=self.user).values_list("currency__code", flat=True)),
+            {"USD", "EUR"},
+        )
+        self.assertEqual(CurrencyExchangeDailyRollup.objects.filter(user=self.user).count(), 2)
+
+    def test_partial_failure(self):
+        """Test that currencies without a rate are reported and not charged, while the others are created."""
+        response = self.post(["USD", "GBP", "INVALID", "USD"])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [
+            {"currency_code": "USD", "rate": 40.0},
+            {"currency_code": "GBP", "detail": "Invalid currency code or API error."},
+            {"currency_code": "INVALID", "detail": "Unsupported currency code."},
+        ])
+
+        self.user_balance.refresh_from_db()
+        self.assertEqual(self.user_balance.balance, 4)
+        self.assertEqual(CurrencyExchange.objects.filter(user=self.user).count(), 1)
+
+    def test_no_rates(self):
+        """Test that the request fails without charging when no currency has a rate."""
+        response = self.post(["GBP", "INVALID"])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data["results"]), 2)
+
+        self.user_balance.refresh_from_db()
+        self.assertEqual(self.user_balance.balance, 5)
+
+    def test_insufficient_balance(self):
+        """Test that nothing is created when the balance doesn't cover every currency with a rate."""
+        self.user_balance.balance = 1
+        self.user_balance.save()
+
+        response = self.post(["USD", "EUR"])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["detail"], "Insufficient balance.")
+
+        self.user_balance.refresh_from_db()
+        self.assertEqual(self.user_balance.balance, 1)
+        self.assertEqual(CurrencyExchange.objects.filter(user=self.user).count(), 0)
+
+    def test_empty_list(self):
+        """Test that an empty list of currencies is rejected."""
+        response = self.post([])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("currency_codes", response.data)
+
+    def test_unauthenticated(self):
+        """Test request fails when user is not authenticated."""
+        response = self.client.post(self.url, {"currency_codes": ["USD"]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,97 @@
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.balance.models import UserBalance
+from apps.currency_exchange.services import CrossRateTable
+
+Account = get_user_model()
+
+
+class CurrencyConversionTests(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(email="test@example.com", password="testpassword")
+        self.user_balance = UserBalance.objects.create(user=self.user, balance=5)
+
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_headers = {"HTTP_AUTHORIZATION": f"Bearer {self.token}"}
+
+        patcher = patch(
+            "apps.currency_exchange.conversion.get_rate_table",
+            return_value=CrossRateTable("UAH", {"UAH": 1, "USD": 0.025, "EUR": 0.02}),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, url_name, data):
+        return self.client.post(reverse(url_name), data, format="json", **self.auth_headers)
+
+    def test_convert(self):
+        """Test converting an amount between two non-base currencies."""
+        response = self.post("convert", {"from_currency": "EUR", "to_currency": "USD", "amount": 100})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertAlmostEqual(response.data["rate"], 1.25)
+        self.assertEqual(response.data["converted_amount"], 125.0)
+
+        self.user_balance.refresh_from_db()
+        self.assertEqual(self.user_balance.balance, 4)
+
+    def test_convert_unsupported_currency(self):
+        """Test that an unsupported currency is rejected without charging."""
+        response = self.post("convert", {"from_currency": "EUR", "to_currency": "XYZ", "amount": 100})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["codes"], ["XYZ"])
+
+        self.user_balance.refresh_from_db()
+        self.assertEqual(self.user_balance.balance, 5)
+
+    def test_convert_bulk(self):
+        """Test converting many amounts at once for a single coin."""
+        response = self.post("convert_bulk", {
+            "from_currencies": ["USD", "UAH", "EUR"],
+            "to_currencies": ["UAH", "USD", "USD"],
+            "amounts": [10, 400, 2],
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["converted_amounts"], [400.0, 10.0, 2.5])
+
+        self.user_balance.refresh_from_db()
+        self.assertEqual(self.user_balance.balance, 4)
+
+    def test_convert_bulk_mismatched_lengths(self):
+        """Test that columns of different lengths are rejected."""
+        response = self.post("convert_bulk", {
+            "from_currencies": ["USD", "UAH"], "to_currencies": ["UAH"], "amounts": [10, 400],
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(CONVERSION_BULK_MAX_SIZE=2)
+    def test_convert_bulk_too_many_amounts(self):
+        """Test that a request converting more amounts than allowed is rejected."""
+        response = self.post("convert_bulk", {
+            "from_currencies": ["USD"] * 3, "to_currencies": ["UAH"] * 3, "amounts": [1, 2, 3],
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_insufficient_balance(self):
+        """Test that conversions fail when the balance is empty."""
+        self.user_balance.balance = 0
+        self.user_balance.save()
+
+        response = self.post("convert", {"from_currency": "EUR", "to_currency": "USD", "amount": 100})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["detail"], "Insufficient balance.")
+
+    def test_unauthenticated(self):
+        """Test request fails when user is not authenticated."""
+        response = self.client.post(reverse("convert_bulk"), {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,102 @@
+import csv
+import io
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.balance.models import UserBalance
+from apps.currency_exchange.services import CrossRateTable
+
+Account = get_user_model()
+
+
+@override_settings(CONVERSION_CSV_CHUNK_SIZE=2)
+class CurrencyConversionCsvTests(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(email="test@example.com", password="testpassword")
+        self.user_balance = UserBalance.objects.create(user=self.user, balance=5)
+
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_headers = {"HTTP_AUTHORIZATION": f"Bearer {self.token}"}
+
+        self.url = reverse("convert_csv")
+
+        patcher = patch(
+            "apps.currency_exchange.conversion.get_rate_table",
+            return_value=CrossRateTable("UAH", {"UAH": 1, "USD": 0.025, "EUR": 0.02}),
+        )
+        self.mock_get_rate_table = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, content):
+        file = SimpleUploadedFile("ledger.csv", content.encode(), content_type="text/csv")
+        return self.client.post(self.url, {"file": file}, format="multipart", **self.auth_headers)
+
+    def test_convert_csv(self):
+        """Test that every row is streamed back with its converted amount or error, across several chunks."""
+        response = self.upload(
+            "id,amount,from_currency,to_currency\n"
+            "1,10,USD,UAH\n"
+            "2,2,EUR,USD\n"
+            "3,100,XYZ,UAH\n"
+            "4,abc,USD,UAH\n"
+            "5,400,UAH,USD\n"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 4)  # Header and 3 chunks of 2 rows
+
+        rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+        self.assertEqual(rows, [
+            ["id", "amount", "from_currency", "to_currency", "converted_amount", "error"],
+            ["1", "10", "USD", "UAH", "400.00", ""],
+            ["2", "2", "EUR", "USD", "2.50", ""],
+            ["3", "100", "XYZ", "UAH", "", "Unsupported currency code"],
+            ["4", "abc", "USD", "UAH", "", "Invalid amount"],
+            ["5", "400", "UAH", "USD", "10.00", ""],
+        ])
+        # One rate table for the whole file
+        self.mock_get_rate_table.assert_called_once()
+
+        self.user_balance.refresh_from_db()
+        self.assertEqual(self.user_balance.balance, 4)
+
+    def test_missing_columns(self):
+        """Test that a file without the required columns is rejected without charging."""
+        response = self.upload("amount,currency\n10,USD\n")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["file"], ["Missing columns: from_currency, to_currency."])
+
+        self.user_balance.refresh_from_db()
+        self.assertEqual(self.user_balance.balance, 5)
+
+    def test_failed_conversion_is_refunded(self):
+        """Test that the coin is given back when the file can't be decoded past its header."""
+        # Past the first block the header is decoded from
+        content = b"amount,from_currency,to_currency\n" + b"10,USD,UAH\n" * 2_000 + b"10,\xff\xfe,UAH\n"
+        file = SimpleUploadedFile("ledger.csv", content, content_type="text/csv")
+        response = self.client.post(self.url, {"file": file}, format="multipart", **self.auth_headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertRaises(UnicodeDecodeError):
+            b"".join(response.streaming_content)
+
+        self.user_balance.refresh_from_db()
+        self.assertEqual(self.user_balance.balance, 5)
+
+    def test_missing_file(self):
+        """Test that a request without a file is rejected."""
+        response = self.client.post(self.url, {}, format="multipart", **self.auth_headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unauthenticated(self):
+        """Test request fails when user is not authenticated."""
+        response = self.client.post(self.url, {}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
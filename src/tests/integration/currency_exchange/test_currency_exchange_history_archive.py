@@ -0,0 +1,137 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.currency_exchange.models import CurrencyExchange, CurrencyExchangeArchive
+
+
+Account = get_user_model()
+
+
+@override_settings(HISTORY_HOT_RETENTION_DAYS=30, HISTORY_ARCHIVE_BATCH_SIZE=2)
+class TestCurrencyExchangeHistoryArchive(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(email="user1@example.com", password="password1")
+        other_user = Account.objects.create_user(email="user2@example.com", password="password2")
+
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_headers = {"HTTP_AUTHORIZATION": f"Bearer {self.token}"}
+
+        self.history_url = reverse("history")
+
+        now = timezone.now()
+        self.today = now.date()
+        self.year_ago = (now - timedelta(days=365)).date()
+
+        # Ids grow with created_at, as they do for records created by the API
+        # created_at is set explicitly, instead of auto_now_add
+        with patch.object(CurrencyExchange._meta.get_field('created_at'), 'auto_now_add', False):
+            CurrencyExchange.objects.bulk_create([
+                CurrencyExchange(user=self.user, currency_code="USD", rate=39.00, created_at=now - timedelta(days=300)),
+                CurrencyExchange(user=other_user, currency_code="USD", rate=39.50, created_at=now - timedelta(days=200)),
+                CurrencyExchange(user=self.user, currency_code="EUR", rate=43.00, created_at=now - timedelta(days=100)),
+                CurrencyExchange(user=self.user, currency_code="USD", rate=40.00, created_at=now - timedelta(days=40)),
+                CurrencyExchange(user=self.user, currency_code="USD", rate=41.00, created_at=now - timedelta(days=10)),
+                CurrencyExchange(user=self.user, currency_code="EUR", rate=44.00, created_at=now - timedelta(days=1)),
+            ])
+        self.expected_ids = list(
+            CurrencyExchange.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+    def archive(self):
+        out = StringIO()
+        call_command("archive_exchange_history", stdout=out)
+        return out.getvalue()
+
+    def get_history(self, params=None, url=None):
+        response = self.client.get(url or self.history_url, params, format="json", **self.auth_headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_archive_moves_old_records(self):
+        """Test that only the records older than the hot window are moved, in several batches."""
+        self.assertIn("Archived 4 records", self.archive())
+
+        self.assertEqual(CurrencyExchange.objects.count(), 2)
+        self.assertEqual(CurrencyExchangeArchive.objects.count(), 4)
+        self.assertEqual(
+            list(CurrencyExchangeArchive.objects.filter(user=self.user).order_by('-id').values_list('id', flat=True)),
+            self.expected_ids[2:],
+        )
+
+        self.assertIn("Archived 0 records", self.archive())
+
+    def test_history_reads_hot_table_only_by_default(self):
+        """Test that the history without an old start_date doesn't include archived records."""
+        self.archive()
+
+        history = self.get_history()
+        self.assertEqual([record["id"] for record in history["results"]], self.expected_ids[:2])
+
+        history = self.get_history({"start_date": str(self.today - timedelta(days=20)), "end_date": str(self.today)})
+        self.assertEqual([record["id"] for record in history["results"]], self.expected_ids[:2])
+
+    def test_history_includes_archive_for_old_start_date(self):
+        """Test that a date range starting before the hot window includes archived records."""
+        self.archive()
+        params = {"start_date": str(self.year_ago), "end_date": str(self.today)}
+
+        history = self.get_history(params)
+        self.assertEqual(history["count"], 5)
+        self.assertEqual([record["id"] for record in history["results"]], self.expected_ids)
+
+        history = self.get_history({**params, "currency_code": "EUR"})
+        self.assertEqual([record["currency_code"] for record in history["results"]], ["EUR", "EUR"])
+
+    def test_cursor_pages_span_hot_table_and_archive(self):
+        """Test that cursor pages merge the hot table and the archive in order, in both directions."""
+        self.archive()
+        params = {"start_date": str(self.year_ago), "end_date": str(self.today), "pagination": "cursor", "page_size": 3}
+
+        first_page = self.get_history(params)
+        second_page = self.get_history(url=first_page["next"])
+        self.assertIsNone(second_page["next"])
+
+        ids = [record["id"] for page in (first_page, second_page) for record in page["results"]]
+        self.assertEqual(ids, self.expected_ids)
+
+        previous_page = self.get_history(url=second_page["previous"])
+        self.assertEqual(previous_page["results"], first_page["results"])
+
+    def test_export_includes_archive_for_old_start_date(self):
+        """Test that the export of a date range starting before the hot window includes archived records."""
+        self.archive()
+
+        response = self.client.get(
+            reverse("export_history"),
+            {"start_date": str(self.year_ago), "end_date": str(self.today), "file_format": "ndjson"},
+            **self.auth_headers,
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 5)
+
+    @override_settings(HISTORY_EXPORT_CHUNK_SIZE=2)
+    def test_export_includes_archive_without_server_side_cursors(self):
+        """Test that the keyset chunks used behind PgBouncer read both the hot table and the archive."""
+        self.archive()
+
+        with patch.dict(connections["default"].settings_dict, {"DISABLE_SERVER_SIDE_CURSORS": True}):
+            response = self.client.get(
+                reverse("export_history"),
+                {"start_date": str(self.year_ago), "end_date": str(self.today), "file_format": "ndjson"},
+                **self.auth_headers,
+            )
+            lines = b"".join(response.streaming_content).splitlines()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([json.loads(line)["id"] for line in lines], self.expected_ids)
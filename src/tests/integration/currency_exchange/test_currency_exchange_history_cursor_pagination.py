@@ -0,0 +1,81 @@
+from unittest.mock import patch
+from datetime import datetime, UTC
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.currency_exchange.models import CurrencyExchange
+
+
+Account = get_user_model()
+
+
+class TestCurrencyExchangeHistoryCursorPagination(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(email="user1@example.com", password="password1")
+        other_user = Account.objects.create_user(email="user2@example.com", password="password2")
+
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_headers = {"HTTP_AUTHORIZATION": f"Bearer {self.token}"}
+
+        self.history_url = reverse("history")
+
+        # Two records share created_at, so the id must break the tie
+        # created_at is set explicitly, instead of auto_now_add
+        with patch.object(CurrencyExchange._meta.get_field('created_at'), 'auto_now_add', False):
+            CurrencyExchange.objects.bulk_create([
+                CurrencyExchange(user=self.user, currency_code="USD", rate=41.00, created_at=datetime(2024, 3, 18, 10, tzinfo=UTC)),
+                CurrencyExchange(user=self.user, currency_code="EUR", rate=44.50, created_at=datetime(2024, 3, 17, 15, tzinfo=UTC)),
+                CurrencyExchange(user=self.user, currency_code="GBP", rate=50.75, created_at=datetime(2024, 3, 17, 15, tzinfo=UTC)),
+                CurrencyExchange(user=self.user, currency_code="USD", rate=40.75, created_at=datetime(2024, 3, 15, 11, tzinfo=UTC)),
+                CurrencyExchange(user=self.user, currency_code="JPY", rate=150.25, created_at=datetime(2024, 3, 14, 8, tzinfo=UTC)),
+                CurrencyExchange(user=other_user, currency_code="USD", rate=41.50, created_at=datetime(2024, 3, 16, 12, tzinfo=UTC)),
+            ])
+        self.expected_ids = list(
+            CurrencyExchange.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+    def get_page(self, url, params=None):
+        response = self.client.get(url, params, format="json", **self.auth_headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_walk_pages_forward_and_back(self):
+        """Test that cursor pages cover every record once, in order, in both directions."""
+        first_page = self.get_page(self.history_url, {"pagination": "cursor", "page_size": 2})
+        self.assertNotIn("count", first_page)
+        self.assertIsNone(first_page["previous"])
+
+        second_page = self.get_page(first_page["next"])
+        third_page = self.get_page(second_page["next"])
+        self.assertIsNone(third_page["next"])
+
+        ids = [record["id"] for page in (first_page, second_page, third_page) for record in page["results"]]
+        self.assertEqual(ids, self.expected_ids)
+
+        previous_page = self.get_page(third_page["previous"])
+        self.assertEqual(previous_page["results"], second_page["results"])
+        first_page_again = self.get_page(previous_page["previous"])
+        self.assertEqual(first_page_again["results"], first_page["results"])
+        self.assertIsNone(first_page_again["previous"])
+
+    def test_filters_apply_to_cursor_pages(self):
+        """Test that the history filters are kept when following cursors."""
+        first_page = self.get_page(self.history_url, {"pagination": "cursor", "page_size": 1, "currency_code": "USD"})
+        second_page = self.get_page(first_page["next"])
+
+        self.assertIsNone(second_page["next"])
+        for record in first_page["results"] + second_page["results"]:
+            self.assertEqual(record["currency_code"], "USD")
+
+    def test_no_count_query(self):
+        """Test that a cursor page is fetched with a single query, without COUNT(*)."""
+        with self.assertNumQueries(1):
+            self.get_page(self.history_url, {"pagination": "cursor", "page_size": 2})
+
+    def test_invalid_cursor(self):
+        """Test that a tampered cursor is rejected."""
+        response = self.client.get(self.history_url, {"cursor": "garbage"}, format="json", **self.auth_headers)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data["detail"], "Invalid cursor")
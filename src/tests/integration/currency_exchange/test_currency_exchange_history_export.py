@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+from datetime import datetime, UTC
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.currency_exchange.models import CurrencyExchange
+
+
+Account = get_user_model()
+
+
+@override_settings(HISTORY_EXPORT_CHUNK_SIZE=2)
+class TestCurrencyExchangeHistoryExport(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(email="user1@example.com", password="password1")
+        other_user = Account.objects.create_user(email="user2@example.com", password="password2")
+
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_headers = {"HTTP_AUTHORIZATION": f"Bearer {self.token}"}
+
+        self.export_url = reverse("export_history")
+
+        # created_at is set explicitly, instead of auto_now_add
+        with patch.object(CurrencyExchange._meta.get_field('created_at'), 'auto_now_add', False):
+            CurrencyExchange.objects.bulk_create([
+                CurrencyExchange(user=self.user, currency_code="USD", rate=41.00, created_at=datetime(2024, 3, 18, 10, tzinfo=UTC)),
+                CurrencyExchange(user=self.user, currency_code="EUR", rate=44.50, created_at=datetime(2024, 3, 17, 15, tzinfo=UTC)),
+                CurrencyExchange(user=self.user, currency_code="USD", rate=40.75, created_at=datetime(2024, 3, 15, 11, tzinfo=UTC)),
+                CurrencyExchange(user=self.user, currency_code="GBP", rate=50.75, created_at=datetime(2024, 3, 14, 8, tzinfo=UTC)),
+                CurrencyExchange(user=self.user, currency_code="USD", rate=41.30, created_at=datetime(2024, 3, 13, 14, tzinfo=UTC)),
+                CurrencyExchange(user=other_user, currency_code="USD", rate=41.50, created_at=datetime(2024, 3, 16, 12, tzinfo=UTC)),
+            ])
+
+    def export(self, params):
+        response = self.client.get(self.export_url, params, **self.auth_headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_export_csv(self):
+        """Test that the whole history of the user is streamed as CSV, newest first."""
+        response, content = self.export({})
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="history.csv"')
+
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual([row["currency_code"] for row in rows], ["USD", "EUR", "USD", "GBP", "USD"])
+        self.assertEqual(rows[0]["rate"], "41.00")
+        self.assertEqual(datetime.fromisoformat(rows[0]["created_at"]), datetime(2024, 3, 18, 10, tzinfo=UTC))
+
+    def test_export_ndjson_with_filters(self):
+        """Test that the history filters apply to the NDJSON export."""
+        response, content = self.export({
+            "file_format": "ndjson", "currency_code": "USD", "start_date": "2024-03-14", "end_date": "2024-03-18",
+        })
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([record["rate"] for record in records], ["41.00", "40.75"])
+
+    def test_export_without_server_side_cursors(self):
+        """Test that the export is read in keyset chunks behind PgBouncer, with the same rows in the same order."""
+        with patch.object(CurrencyExchange._meta.get_field('created_at'), 'auto_now_add', False):
+            # Ties on created_at are ordered by id across chunk boundaries
+            CurrencyExchange.objects.create(
+                user=self.user, currency_code="PLN", rate=10.25, created_at=datetime(2024, 3, 15, 11, tzinfo=UTC),
+            )
+        _, expected = self.export({})
+
+        with patch.dict(connections["default"].settings_dict, {"DISABLE_SERVER_SIDE_CURSORS": True}):
+            with self.assertNumQueries(4):  # 3 full chunks of 2 records, then an empty one
+                _, content = self.export({})
+
+        self.assertEqual(content, expected)
+        self.assertEqual(len(list(csv.DictReader(io.StringIO(content)))), 6)
+
+    def test_invalid_file_format(self):
+        """Test that unsupported file formats are rejected."""
+        response = self.client.get(self.export_url, {"file_format": "xml"}, **self.auth_headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("file_format", response.data)
+
+    def test_invalid_date_range(self):
+        """Test that invalid filters are rejected before streaming starts."""
+        response = self.client.get(
+            self.export_url, {"start_date": "2024-03-18", "end_date": "2024-03-14"}, **self.auth_headers,
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unauthenticated_access(self):
+        """Test that unauthenticated users cannot export the history."""
+        response = self.client.get(self.export_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
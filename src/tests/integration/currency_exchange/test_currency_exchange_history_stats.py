@@ -0,0 +1,98 @@
+from datetime import datetime, UTC
+from io import StringIO
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.balance.models import UserBalance
+from apps.currency_exchange.models import CurrencyExchange, CurrencyExchangeDailyRollup
+from apps.currency_exchange.services import supported_currency_codes_cache, update_daily_rollups
+
+
+Account = get_user_model()
+
+
+class TestCurrencyExchangeHistoryStats(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(email="user1@example.com", password="password1")
+        self.other_user = Account.objects.create_user(email="user2@example.com", password="password2")
+
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_headers = {"HTTP_AUTHORIZATION": f"Bearer {self.token}"}
+
+        self.stats_url = reverse("history_stats")
+
+        # created_at is set explicitly, instead of auto_now_add
+        with patch.object(CurrencyExchange._meta.get_field('created_at'), 'auto_now_add', False):
+            records = CurrencyExchange.objects.bulk_create([
+                CurrencyExchange(user=self.user, currency_code="USD", rate=41.00, created_at=datetime(2024, 3, 18, 9, tzinfo=UTC)),
+                CurrencyExchange(user=self.user, currency_code="USD", rate=41.20, created_at=datetime(2024, 3, 18, 17, tzinfo=UTC)),
+                CurrencyExchange(user=self.user, currency_code="USD", rate=40.90, created_at=datetime(2024, 3, 18, 12, tzinfo=UTC)),
+                CurrencyExchange(user=self.user, currency_code="EUR", rate=44.50, created_at=datetime(2024, 3, 18, 10, tzinfo=UTC)),
+                CurrencyExchange(user=self.user, currency_code="USD", rate=40.75, created_at=datetime(2024, 3, 17, 23, tzinfo=UTC)),
+                CurrencyExchange(user=self.other_user, currency_code="USD", rate=50.00, created_at=datetime(2024, 3, 18, 12, tzinfo=UTC)),
+            ])
+        # One at a time, as records are created by the API
+        for record in records:
+            update_daily_rollups([record])
+
+    def get_stats(self, params=None):
+        response = self.client.get(self.stats_url, params, format="json", **self.auth_headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["results"]
+
+    def test_daily_stats(self):
+        """Test min/max/avg/last rate per currency per day, newest day first."""
+        self.assertEqual(self.get_stats(), [
+            {
+                "currency_code": "EUR", "day": "2024-03-18", "records_count": 1,
+                "min_rate": "44.50", "max_rate": "44.50", "avg_rate": "44.50", "last_rate": "44.50",
+            },
+            {
+                "currency_code": "USD", "day": "2024-03-18", "records_count": 3,
+                "min_rate": "40.90", "max_rate": "41.20", "avg_rate": "41.03", "last_rate": "41.20",
+            },
+            {
+                "currency_code": "USD", "day": "2024-03-17", "records_count": 1,
+                "min_rate": "40.75", "max_rate": "40.75", "avg_rate": "40.75", "last_rate": "40.75",
+            },
+        ])
+
+    def test_filters(self):
+        """Test filtering the statistics by currency code and date range."""
+        stats = self.get_stats({"currency_code": "USD", "start_date": "2024-03-17", "end_date": "2024-03-17"})
+
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(stats[0]["day"], "2024-03-17")
+
+    def test_rebuild_matches_incremental_rollups(self):
+        """Test that rebuilding the rollups from the records gives the same statistics."""
+        incremental_stats = self.get_stats()
+
+        out = StringIO()
+        call_command("rebuild_daily_rollups", "--since", "2024-03-01", stdout=out)
+
+        self.assertIn("Rebuilt 4 daily rollups", out.getvalue())
+        self.assertEqual(self.get_stats(), incremental_stats)
+
+    @patch("apps.currency_exchange.views.get_exchange_rate")
+    def test_new_record_updates_rollup(self, mock_get_exchange_rate):
+        """Test that requesting a rate adds it to today's statistics."""
+        UserBalance.objects.create(user=self.user)
+        supported_currency_codes_cache.clear()
+        mock_get_exchange_rate.return_value = 41.09
+
+        self.client.post(reverse("create_currency_exchange_record"), {"currency_code": "USD"}, format="json", **self.auth_headers)
+
+        rollup = CurrencyExchangeDailyRollup.objects.get(user=self.user, currency__code="USD", day=timezone.now().date())
+        self.assertEqual(rollup.records_count, 1)
+        self.assertEqual(str(rollup.last_rate), "41.09")
+
+    def test_unauthenticated_access(self):
+        """Test that unauthenticated users cannot access the statistics."""
+        response = self.client.get(self.stats_url, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.currency_exchange.currencies import CurrencyRegistry, UnknownCurrencyError, currency_registry
+from apps.currency_exchange.models import Currency, CurrencyExchange
+
+
+Account = get_user_model()
+
+
+class TestCurrencyRegistry(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(email="user1@example.com", password="password1")
+
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_headers = {"HTTP_AUTHORIZATION": f"Bearer {self.token}"}
+
+        CurrencyExchange.objects.bulk_create([
+            CurrencyExchange(user=self.user, currency_code="USD", rate=41.00),
+            CurrencyExchange(user=self.user, currency_code="EUR", rate=44.50),
+        ])
+
+    def test_iso_currencies_are_seeded(self):
+        """Test that the currencies supported by the upstream API exist with their minor units."""
+        self.assertEqual(Currency.objects.get(code="UAH").minor_units, 2)
+        self.assertEqual(Currency.objects.get(code="JPY").minor_units, 0)
+        self.assertEqual(Currency.objects.get(code="KWD").minor_units, 3)
+
+    def test_code_maps_to_currency_id(self):
+        """Test that codes and ids map to each other, and unknown codes don't map to anything."""
+        usd = Currency.objects.get(code="USD")
+
+        self.assertEqual(currency_registry.get_id("USD"), usd.id)
+        self.assertEqual(currency_registry.get_code(usd.id), "USD")
+        self.assertIsNone(currency_registry.get_id("INVALID"))
+
+    def test_records_reference_currencies(self):
+        """Test that the code set on a record is stored as a reference to its currency."""
+        record = CurrencyExchange.objects.get(currency__code="EUR")
+
+        self.assertEqual(record.currency_code, "EUR")
+        self.assertEqual(record.currency_id, Currency.objects.get(code="EUR").id)
+
+    def test_history_does_not_query_currencies(self):
+        """Test that currency codes of a history page come from memory (queries: count, page)."""
+        currency_registry.get_id("USD")  # Loaded once per process
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("history"), format="json", **self.auth_headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({record["currency_code"] for record in response.data["results"]}, {"USD", "EUR"})
+
+    def test_filter_by_unknown_currency(self):
+        """Test that filtering by a currency that doesn't exist returns no records."""
+        response = self.client.get(reverse("history"), {"currency_code": "ZZZ"}, format="json", **self.auth_headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 0)
+
+    def test_unknown_code_is_not_added_by_records(self):
+        """Test that setting an unknown code on a record raises instead of adding a currency."""
+        with self.assertRaises(UnknownCurrencyError):
+            CurrencyExchange(user=self.user, currency_code="USDD", rate=41.00)
+
+        self.assertFalse(Currency.objects.filter(code="USDD").exists())
+
+    def test_unknown_code_is_remembered_as_missing(self):
+        """Test that an unknown code is looked up once, then answered from memory until the miss expires."""
+        now = [0.0]
+        registry = CurrencyRegistry(miss_ttl=60, clock=lambda: now[0])
+        registry.get_id("USD")
+
+        with self.assertNumQueries(1):
+            self.assertIsNone(registry.get_id("ZZZ"))
+            self.assertIsNone(registry.get_id("ZZZ"))
+
+        Currency.objects.create(code="ZZZ", name="ZZZ")
+        self.assertIsNone(registry.get_id("ZZZ"))
+        now[0] = 60
+        self.assertIsNotNone(registry.get_id("ZZZ"))
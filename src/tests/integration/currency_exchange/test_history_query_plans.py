@@ -0,0 +1,125 @@
+import random
+import re
+from datetime import date, datetime, timedelta, UTC
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from apps.core.dataclasses import DateRange
+from apps.currency_exchange.models import CurrencyExchange
+from apps.currency_exchange.partitions import create_partition, is_partitioned
+from apps.currency_exchange.services import apply_currency_exchange_filters
+
+
+Account = get_user_model()
+
+# Sort plan node, as opposed to the "Sort Key" of a Merge Append over partitions
+SORT_NODE_PATTERN = re.compile(r'^\s*(->\s*)?(Incremental )?Sort\s+\(', re.MULTILINE)
+# Index scans of PostgreSQL plans, bitmap scans (which lose the index order) aren't matched
+INDEX_SCAN_PATTERN = re.compile(r'^\s*(?:->\s*)?Index (?:Only )?Scan (?:Backward )?using (\S+)', re.MULTILINE)
+
+
+class TestHistoryQueryPlans(TestCase):
+    """
+    The history route must be served by an index scan in the requested order, with no sort step.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        users = Account.objects.bulk_create([
+            Account(email=f"user{index}@example.com", password="password") for index in range(50)
+        ])
+        codes = ["USD", "EUR", "GBP", "PLN", "JPY", "CHF", "CAD", "CZK"]
+        started_at = datetime(2024, 1, 1, tzinfo=UTC)
+        random.seed(0)
+
+        if is_partitioned(connection):
+            with connection.cursor() as cursor:
+                for month in range(1, 13):
+                    create_partition(cursor, date(2024, month, 1))
+
+        # created_at is set explicitly, instead of auto_now_add
+        with patch.object(CurrencyExchange._meta.get_field('created_at'), 'auto_now_add', False):
+            CurrencyExchange.objects.bulk_create(
+                (
+                    CurrencyExchange(
+                        user=user,
+                        currency_code=random.choice(codes),
+                        rate=random.uniform(1, 100),
+                        created_at=started_at + timedelta(minutes=random.randrange(60 * 24 * 365)),
+                    )
+                for user in users
+                for _ in range(1000)
+            ),
+            batch_size=5000,
+        )
+        cls.user = users[0]
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def explain_history_page(self, currency_code=None, date_range=None):
+        queryset = CurrencyExchange.objects.filter(user=self.user)
+        queryset = apply_currency_exchange_filters(queryset, currency_code, date_range)
+        # Same shape as a history page
+        return queryset.order_by('-created_at', '-id')[:16].explain()
+
+    def get_index_names(self, index_name):
+        """Returns the name of the index and of the indexes of the partitions attached to it."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT partition_index.relname
+                FROM pg_inherits
+                JOIN pg_class partition_index ON partition_index.oid = pg_inherits.inhrelid
+                JOIN pg_class parent_index ON parent_index.oid = pg_inherits.inhparent
+                WHERE parent_index.relname = %s
+                """,
+                [index_name],
+            )
+            return {index_name, *(row[0] for row in cursor.fetchall())}
+
+    def assert_index_scan_without_sort(self, index_name, currency_code=None, date_range=None):
+        plan = self.explain_history_page(currency_code, date_range)
+        if connection.vendor == 'postgresql':
+            scanned_index_names = INDEX_SCAN_PATTERN.findall(plan)
+            self.assertTrue(scanned_index_names, plan)
+            self.assertLessEqual(set(scanned_index_names), self.get_index_names(index_name), plan)
+            self.assertNotRegex(plan, SORT_NODE_PATTERN)
+        else:
+            self.assertIn(f"USING INDEX {index_name} ", plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_user_history(self):
+        """Test that a history page is read from the user index, already in order."""
+        self.assert_index_scan_without_sort("exchange_user_created_idx")
+
+    def test_user_history_by_currency_code(self):
+        """Test that a history page filtered by currency is read from the user and currency index, already in order."""
+        self.assert_index_scan_without_sort("exchange_user_code_created_idx", currency_code="USD")
+
+    def test_user_history_by_date_range(self):
+        """Test that a history page filtered by date range is read from the user index, already in order."""
+        self.assert_index_scan_without_sort(
+            "exchange_user_created_idx", date_range=DateRange(date(2024, 3, 1), date(2024, 3, 31)),
+        )
+
+    def test_user_history_by_currency_code_and_date_range(self):
+        """Test that a history page filtered by currency and date range is read from the user and currency index."""
+        self.assert_index_scan_without_sort(
+            "exchange_user_code_created_idx",
+            currency_code="USD", date_range=DateRange(date(2024, 3, 1), date(2024, 3, 31)),
+        )
+
+    def test_date_range_prunes_partitions(self):
+        """Test that only the partitions of the requested months are scanned."""
+        if not is_partitioned(connection):
+            self.skipTest("The history isn't partitioned on this database.")
+
+        plan = self.explain_history_page(date_range=DateRange(date(2024, 3, 1), date(2024, 4, 30)))
+
+        self.assertIn("currency_exchange_currencyexchange_p2024_03", plan)
+        self.assertIn("currency_exchange_currencyexchange_p2024_04", plan)
+        self.assertNotIn("currency_exchange_currencyexchange_p2024_02", plan)
+        self.assertNotIn("currency_exchange_currencyexchange_p2024_05", plan)
+        self.assertNotIn("currency_exchange_currencyexchange_default", plan)
@@ -0,0 +1,119 @@
+from datetime import datetime, UTC
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.currency_exchange.models import RateSnapshot
+
+Account = get_user_model()
+
+
+@override_settings(EXCHANGE_RATE_BASE_CURRENCY="UAH")
+class RateHistoryTests(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(email="test@example.com", password="testpassword")
+
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_headers = {"HTTP_AUTHORIZATION": f"Bearer {self.token}"}
+
+        self.create_snapshot(datetime(2024, 3, 18, 10, 0, tzinfo=UTC), {"UAH": 1, "USD": 0.025, "EUR": 0.02})
+        self.create_snapshot(datetime(2024, 3, 18, 11, 0, tzinfo=UTC), {"UAH": 1, "USD": 0.02, "EUR": 0.0125})
+        self.create_snapshot(datetime(2024, 3, 18, 12, 0, tzinfo=UTC), {"UAH": 1, "USD": 0.0125, "EUR": 0.01})
+        # Snapshots of another base currency are never used
+        self.create_snapshot(datetime(2024, 3, 18, 11, 30, tzinfo=UTC), {"USD": 1, "UAH": 10}, base_code="USD")
+
+    @staticmethod
+    def create_snapshot(fetched_at, rates, base_code="UAH"):
+        snapshot = RateSnapshot.objects.create(base_code=base_code, rates=rates)
+        RateSnapshot.objects.filter(id=snapshot.id).update(fetched_at=fetched_at)
+
+    def get(self, params):
+        return self.client.get(reverse("rate_history"), params, **self.auth_headers)
+
+    @patch("apps.currency_exchange.services.fetch_conversion_rates")
+    def test_rate_at_time(self, mock_fetch_conversion_rates):
+        """Test that the rate at a time is taken from the latest snapshot fetched at or before it."""
+        response = self.get({"from_currency": "USD", "at": "2024-03-18T11:59:59Z"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["from_currency"], "USD")
+        self.assertEqual(response.data["to_currency"], "UAH")
+        self.assertEqual(response.data["fetched_at"], "2024-03-18T11:00:00Z")
+        self.assertAlmostEqual(response.data["rate"], 50.0)
+        mock_fetch_conversion_rates.assert_not_called()
+
+    def test_rate_at_exact_fetch_time(self):
+        """Test that a snapshot fetched exactly at the requested time is used."""
+        response = self.get({"from_currency": "USD", "to_currency": "EUR", "at": "2024-03-18T12:00:00Z"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["fetched_at"], "2024-03-18T12:00:00Z")
+        self.assertAlmostEqual(response.data["rate"], 0.8)
+
+    def test_rate_before_first_snapshot(self):
+        """Test that a time before the first snapshot has no rate."""
+        response = self.get({"from_currency": "USD", "at": "2024-03-18T09:00:00Z"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rate_of_currency_missing_from_snapshot(self):
+        """Test that a currency that wasn't in the snapshot at that time has no rate."""
+        self.create_snapshot(datetime(2024, 3, 18, 13, 0, tzinfo=UTC), {"UAH": 1, "EUR": 0.01})
+
+        response = self.get({"from_currency": "USD", "at": "2024-03-18T13:30:00Z"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rate_series(self):
+        """Test that every rate over the time range is returned, oldest first."""
+        response = self.get({
+            "from_currency": "EUR", "start": "2024-03-18T10:30:00Z", "end": "2024-03-18T12:00:00Z",
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(
+            [point["fetched_at"] for point in response.data["results"]],
+            ["2024-03-18T11:00:00Z", "2024-03-18T12:00:00Z"],
+        )
+        self.assertEqual([point["rate"] for point in response.data["results"]], [80.0, 100.0])
+
+    def test_rate_series_pagination(self):
+        """Test that the series is paginated."""
+        response = self.get({
+            "from_currency": "USD", "start": "2024-03-18T00:00:00Z", "end": "2024-03-19T00:00:00Z", "page_size": 2,
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNotNone(response.data["next"])
+
+    def test_invalid_params(self):
+        """Test that requests without exactly one of a time or a time range are rejected."""
+        for params in (
+            {"from_currency": "USD"},
+            {"from_currency": "USD", "at": "2024-03-18T12:00:00Z", "start": "2024-03-18T10:00:00Z"},
+            {"from_currency": "USD", "start": "2024-03-18T10:00:00Z"},
+            {"from_currency": "USD", "start": "2024-03-18T12:00:00Z", "end": "2024-03-18T10:00:00Z"},
+        ):
+            with self.subTest(params=params):
+                response = self.get(params)
+
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unknown_currency(self):
+        """Test that an unknown currency is rejected."""
+        response = self.get({"from_currency": "XYZ", "at": "2024-03-18T12:00:00Z"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["from_currency"], ["Unknown currency code."])
+
+    def test_requires_authentication(self):
+        """Test that anonymous requests are rejected."""
+        response = self.client.get(reverse("rate_history"), {"from_currency": "USD", "at": "2024-03-18T12:00:00Z"})
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,96 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.currency_exchange.models import RateSnapshot
+from apps.currency_exchange.services import get_exchange_rate, snapshot_rate_table_cache
+from apps.currency_exchange.snapshot_store import MmapSnapshotStore
+
+
+@override_settings(EXCHANGE_RATE_BACKEND="snapshot", EXCHANGE_RATE_BASE_CURRENCY="UAH")
+class TestRateSnapshots(TestCase):
+    def setUp(self):
+        snapshot_rate_table_cache.clear()
+        self.addCleanup(snapshot_rate_table_cache.clear)
+
+    @patch("apps.currency_exchange.services.fetch_conversion_rates")
+    def test_command_stores_snapshot(self, mock_fetch_conversion_rates):
+        """Test that the refresher stores the whole fetched rate table."""
+        mock_fetch_conversion_rates.return_value = {"UAH": 1, "USD": 0.025, "EUR": 0.02}
+
+        call_command("refresh_rate_snapshots", "--once", stdout=StringIO())
+
+        snapshot = RateSnapshot.objects.get()
+        self.assertEqual(snapshot.base_code, "UAH")
+        self.assertEqual(snapshot.rates, {"UAH": 1, "USD": 0.025, "EUR": 0.02})
+        mock_fetch_conversion_rates.assert_called_once_with("UAH")
+
+    @patch("apps.currency_exchange.services.fetch_conversion_rates")
+    def test_command_writes_shared_snapshot_file(self, mock_fetch_conversion_rates):
+        """Test that the refresher also writes the memory-mapped snapshot file if it's configured."""
+        mock_fetch_conversion_rates.return_value = {"UAH": 1, "USD": 0.025}
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "rates.bin")
+
+        with override_settings(EXCHANGE_RATE_SNAPSHOT_PATH=path):
+            call_command("refresh_rate_snapshots", "--once", stdout=StringIO())
+
+        table = MmapSnapshotStore(path).get("UAH")
+        self.assertEqual(table.version, RateSnapshot.objects.get().id)
+        self.assertAlmostEqual(table.rate("USD", "UAH"), 40.0)
+
+    @patch("apps.currency_exchange.services.fetch_conversion_rates")
+    def test_command_skips_failed_fetch(self, mock_fetch_conversion_rates):
+        """Test that nothing is stored if upstream didn't return the rates."""
+        mock_fetch_conversion_rates.return_value = None
+
+        call_command("refresh_rate_snapshots", "--once", stdout=StringIO(), stderr=StringIO())
+
+        self.assertFalse(RateSnapshot.objects.exists())
+
+    @override_settings(EXCHANGE_RATE_SNAPSHOT_RETENTION_DAYS=30)
+    @patch("apps.currency_exchange.services.fetch_conversion_rates")
+    def test_command_deletes_expired_snapshots(self, mock_fetch_conversion_rates):
+        """Test that the refresher deletes the snapshots older than the retention period."""
+        mock_fetch_conversion_rates.return_value = {"UAH": 1, "USD": 0.025}
+        expired = RateSnapshot.objects.create(base_code="UAH", rates={"UAH": 1, "USD": 0.02})
+        kept = RateSnapshot.objects.create(base_code="UAH", rates={"UAH": 1, "USD": 0.02})
+        RateSnapshot.objects.filter(id=expired.id).update(fetched_at=timezone.now() - timedelta(days=31))
+        RateSnapshot.objects.filter(id=kept.id).update(fetched_at=timezone.now() - timedelta(days=29))
+
+        call_command("refresh_rate_snapshots", "--once", stdout=StringIO())
+
+        self.assertFalse(RateSnapshot.objects.filter(id=expired.id).exists())
+        self.assertEqual(RateSnapshot.objects.count(), 2)
+
+    @override_settings(EXCHANGE_RATE_SNAPSHOT_RETENTION_DAYS=30)
+    @patch("apps.currency_exchange.services.fetch_conversion_rates")
+    def test_latest_snapshot_is_never_deleted(self, mock_fetch_conversion_rates):
+        """Test that the latest snapshot is kept however old it is, when upstream is down."""
+        mock_fetch_conversion_rates.return_value = None
+        snapshot = RateSnapshot.objects.create(base_code="UAH", rates={"UAH": 1, "USD": 0.02})
+        RateSnapshot.objects.filter(id=snapshot.id).update(fetched_at=timezone.now() - timedelta(days=90))
+
+        call_command("refresh_rate_snapshots", "--once", stdout=StringIO(), stderr=StringIO())
+
+        self.assertTrue(RateSnapshot.objects.filter(id=snapshot.id).exists())
+
+    @patch("apps.currency_exchange.services.fetch_conversion_rates")
+    def test_exchange_rate_is_read_from_latest_snapshot(self, mock_fetch_conversion_rates):
+        """Test that the request path reads the latest snapshot and never calls upstream."""
+        RateSnapshot.objects.create(base_code="UAH", rates={"UAH": 1, "USD": 0.02})
+        RateSnapshot.objects.create(base_code="UAH", rates={"UAH": 1, "USD": 0.025})
+
+        self.assertAlmostEqual(get_exchange_rate("USD"), 40.0)
+        self.assertIsNone(get_exchange_rate("INVALID"))
+        mock_fetch_conversion_rates.assert_not_called()
+
+    def test_no_snapshot(self):
+        """Test that there's no rate until the first snapshot is stored."""
+        self.assertIsNone(get_exchange_rate("USD"))
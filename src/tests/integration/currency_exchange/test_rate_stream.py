@@ -0,0 +1,163 @@
+import json
+import time
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.balance.models import UserBalance
+from apps.core.db_routers import is_pinned_to_primary
+from apps.currency_exchange.models import RateSnapshot
+from apps.currency_exchange.rate_stream import rate_broadcaster, start_paid_stream_period
+
+Account = get_user_model()
+
+
+def parse_events(body):
+    """Returns the (id, data) of the rate events of a stream body, keepalive comments are skipped."""
+    events = []
+    for block in body.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if fields.get("event") == "rates":
+            events.append((fields["id"], json.loads(fields["data"])))
+    return events
+
+
+@override_settings(
+    EXCHANGE_RATE_BASE_CURRENCY="UAH", RATE_STREAM_KEEPALIVE_INTERVAL=0.05, RATE_STREAM_MAX_DURATION=0.3,
+)
+class RateStreamTests(TestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user(email="test@example.com", password="testpassword")
+        self.user_balance = UserBalance.objects.create(user=self.user, balance=5)
+
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_headers = {"Authorization": f"Bearer {self.token}"}
+
+        self.snapshot = RateSnapshot.objects.create(base_code="UAH", rates={"UAH": 1, "USD": 0.025, "EUR": 0.02})
+
+        patcher = patch.object(rate_broadcaster, "poll_interval", 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    async def read_stream(self, params=None, headers=None, on_chunk=None):
+        response = await self.async_client.get(
+            reverse("rate_stream"), params or {}, headers=headers if headers is not None else self.auth_headers,
+        )
+        body = b""
+        if response.streaming:
+            async for chunk in response.streaming_content:
+                body += chunk
+                if on_chunk is not None:
+                    await on_chunk(body)
+        return response, body
+
+    async def test_stream_sends_current_rates(self):
+        """Test that the current rates are sent as soon as the client connects and a coin is taken."""
+        response, body = await self.read_stream()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = parse_events(body)
+        self.assertEqual(events[0][0], str(self.snapshot.id))
+        self.assertEqual(events[0][1]["base_code"], "UAH")
+        self.assertEqual(events[0][1]["rates"], {"UAH": 1, "USD": 0.025, "EUR": 0.02})
+        self.assertIn(b": keepalive", body)
+
+        await self.user_balance.arefresh_from_db()
+        self.assertEqual(self.user_balance.balance, 4)
+
+    @override_settings(DATABASE_REPLICAS=["replica"])
+    async def test_stream_pins_user_to_primary(self):
+        """Test that the user reads from the primary right after the coin of a stream is taken."""
+        response, body = await self.read_stream()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(is_pinned_to_primary(self.user.id))
+
+    async def test_stream_pushes_new_snapshots(self):
+        """Test that a new snapshot is pushed to the connected clients."""
+        new_snapshot = None
+
+        async def create_snapshot(body):
+            nonlocal new_snapshot
+            if new_snapshot is None and parse_events(body):
+                new_snapshot = await RateSnapshot.objects.acreate(base_code="UAH", rates={"UAH": 1, "USD": 0.02})
+
+        response, body = await self.read_stream(on_chunk=create_snapshot)
+
+        self.assertEqual(
+            [event_id for event_id, data in parse_events(body)], [str(self.snapshot.id), str(new_snapshot.id)],
+        )
+        self.assertEqual(rate_broadcaster.subscriber_count, 0)
+
+    async def test_stream_filters_currencies(self):
+        """Test that only the requested currencies are sent."""
+        response, body = await self.read_stream({"currencies": "USD,XYZ"})
+
+        self.assertEqual(parse_events(body)[0][1]["rates"], {"USD": 0.025})
+
+    async def test_stream_skips_last_received_snapshot(self):
+        """Test that the snapshot the client received before reconnecting isn't sent again."""
+        response, body = await self.read_stream(headers={**self.auth_headers, "Last-Event-ID": str(self.snapshot.id)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(parse_events(body), [])
+
+    async def test_reconnect_within_paid_period_is_free(self):
+        """Test that a reconnect sent with a Last-Event-ID while the paid period lasts takes no coin."""
+        await start_paid_stream_period(self.user.id, time.time(), 0.3)
+
+        response, body = await self.read_stream(headers={**self.auth_headers, "Last-Event-ID": str(self.snapshot.id)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        await self.user_balance.arefresh_from_db()
+        self.assertEqual(self.user_balance.balance, 5)
+
+    async def test_reconnect_after_paid_period_is_charged(self):
+        """Test that the reconnect following the close at the end of the paid period takes another coin."""
+        await self.read_stream()
+
+        response, body = await self.read_stream(headers={**self.auth_headers, "Last-Event-ID": str(self.snapshot.id)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        await self.user_balance.arefresh_from_db()
+        self.assertEqual(self.user_balance.balance, 3)
+
+    async def test_new_connection_within_paid_period_is_charged(self):
+        """Test that a connection sent without a Last-Event-ID takes a coin even while a paid period lasts."""
+        await start_paid_stream_period(self.user.id, time.time(), 0.3)
+
+        await self.read_stream()
+
+        await self.user_balance.arefresh_from_db()
+        self.assertEqual(self.user_balance.balance, 4)
+
+    async def test_stream_token_in_query_param(self):
+        """Test that the access token can be passed as a query parameter."""
+        response, body = await self.read_stream({"access_token": str(self.token)}, headers={})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(parse_events(body)), 1)
+
+    async def test_stream_requires_authentication(self):
+        """Test that requests without a valid token are rejected."""
+        for params, headers in (({}, {}), ({"access_token": "invalid"}, {})):
+            with self.subTest(params=params):
+                response, body = await self.read_stream(params, headers=headers)
+
+                self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_stream_insufficient_balance(self):
+        """Test that the stream isn't opened if the user can't pay for it."""
+        await UserBalance.objects.filter(user=self.user).aupdate(balance=0)
+
+        response, body = await self.read_stream()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"detail": "Insufficient balance."})
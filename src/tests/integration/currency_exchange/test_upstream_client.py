@@ -0,0 +1,212 @@
+import asyncio
+import time
+from unittest.mock import patch
+from django.test import SimpleTestCase
+
+from apps.currency_exchange.client import (
+    AsyncExchangeRateApiClient,
+    CircuitBreaker,
+    CircuitOpenError,
+    ExchangeRateApiClient,
+    UpstreamError,
+)
+from tests.stubs.exchange_rate_api import ExchangeRateApiStub, StubResponse
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestExchangeRateApiClient(SimpleTestCase):
+    def setUp(self):
+        self.stub = ExchangeRateApiStub()
+        self.enterContext(self.stub)
+
+        self.clock = FakeClock()
+        self.circuit_breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=self.clock)
+        self.client = ExchangeRateApiClient(
+            base_url=self.stub.url,
+            api_key="test-key",
+            connect_timeout=1,
+            read_timeout=0.2,
+            max_retries=2,
+            retry_backoff=0,
+            pool_size=2,
+            circuit_breaker=self.circuit_breaker,
+        )
+
+    def test_get_conversion_rates(self):
+        """Test fetching the rate table over reused keep-alive connections."""
+        for _ in range(3):
+            self.assertEqual(self.client.get_conversion_rates("UAH"), {"UAH": 1, "USD": 0.025, "EUR": 0.02})
+
+        self.assertEqual(self.stub.paths, ["/test-key/latest/UAH"] * 3)
+        self.assertEqual(len(self.stub.client_ports), 1)
+
+    def test_unsupported_code_is_not_retried(self):
+        """Test that a rejected currency code returns None without retries or breaker failures."""
+        self.assertIsNone(self.client.get_conversion_rates("INVALID"))
+        self.assertIsNone(self.client.get_conversion_rates("INVALID"))
+
+        self.assertEqual(len(self.stub.paths), 2)
+        self.assertEqual(self.circuit_breaker.state, CircuitBreaker.CLOSED)
+
+    def test_server_errors_are_retried(self):
+        """Test that 5xx and 429 responses are retried."""
+        self.stub.responses = [StubResponse(status=503), StubResponse(status=429)]
+
+        with self.assertLogs("apps.currency_exchange.client", "WARNING"):
+            self.assertEqual(self.client.get_conversion_rates("UAH")["USD"], 0.025)
+        self.assertEqual(len(self.stub.paths), 3)
+
+    def test_timeout_is_retried_then_raised(self):
+        """Test that a slow upstream can't hold the worker longer than the timeouts allow."""
+        self.stub.responses = [StubResponse(delay=1)] * 3
+
+        with self.assertRaises(UpstreamError), self.assertLogs("apps.currency_exchange.client", "WARNING"):
+            self.client.get_conversion_rates("UAH")
+
+        self.assertEqual(len(self.stub.paths), 3)
+
+    def test_circuit_opens_and_fails_fast(self):
+        """Test that the upstream isn't called while the circuit is open, and a trial request closes it."""
+        self.stub.responses = [StubResponse(status=500)] * 6
+
+        for _ in range(2):
+            with self.assertRaises(UpstreamError), self.assertLogs("apps.currency_exchange.client", "WARNING"):
+                self.client.get_conversion_rates("UAH")
+        self.assertEqual(self.circuit_breaker.state, CircuitBreaker.OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            self.client.get_conversion_rates("UAH")
+        self.assertEqual(len(self.stub.paths), 6)
+
+        self.clock.now = 30
+        self.assertEqual(self.client.get_conversion_rates("UAH")["USD"], 0.025)
+        self.assertEqual(self.circuit_breaker.state, CircuitBreaker.CLOSED)
+
+    def test_unexpected_error_during_trial_reopens_circuit(self):
+        """Test that a trial request failing with a non-HTTP exception opens the circuit again instead of blocking it."""
+        self.circuit_breaker.state = CircuitBreaker.OPEN
+        self.clock.now = 30
+
+        with patch.object(self.client.session, "get", side_effect=RuntimeError("worker timeout")):
+            with self.assertRaises(RuntimeError):
+                self.client.get_conversion_rates("UAH")
+        self.assertEqual(self.circuit_breaker.state, CircuitBreaker.OPEN)
+
+        self.clock.now = 60
+        self.assertEqual(self.client.get_conversion_rates("UAH")["USD"], 0.025)
+        self.assertEqual(self.circuit_breaker.state, CircuitBreaker.CLOSED)
+
+
+class TestAsyncExchangeRateApiClient(SimpleTestCase):
+    def setUp(self):
+        self.stub = ExchangeRateApiStub()
+        self.enterContext(self.stub)
+
+        self.circuit_breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+    def make_client(self, pool_size=10):
+        return AsyncExchangeRateApiClient(
+            base_url=self.stub.url,
+            api_key="test-key",
+            connect_timeout=1,
+            read_timeout=0.5,
+            max_retries=2,
+            retry_backoff=0,
+            pool_size=pool_size,
+            circuit_breaker=self.circuit_breaker,
+        )
+
+    async def test_get_conversion_rates(self):
+        """Test fetching the rate table over a reused keep-alive connection."""
+        client = self.make_client()
+        for _ in range(3):
+            self.assertEqual(await client.get_conversion_rates("UAH"), {"UAH": 1, "USD": 0.025, "EUR": 0.02})
+        await client.client.aclose()
+
+        self.assertEqual(self.stub.paths, ["/test-key/latest/UAH"] * 3)
+        self.assertEqual(len(self.stub.client_ports), 1)
+
+    async def test_unsupported_code_is_not_retried(self):
+        """Test that a rejected currency code returns None without retries."""
+        client = self.make_client()
+        self.assertIsNone(await client.get_conversion_rates("INVALID"))
+        await client.client.aclose()
+
+        self.assertEqual(len(self.stub.paths), 1)
+        self.assertEqual(self.circuit_breaker.state, CircuitBreaker.CLOSED)
+
+    async def test_failures_are_retried_then_open_circuit(self):
+        """Test that server errors and timeouts are retried and count as breaker failures."""
+        client = self.make_client()
+        self.stub.responses = [StubResponse(status=503), StubResponse(delay=1), StubResponse(status=500)] * 2
+
+        for _ in range(2):
+            with self.assertRaises(UpstreamError), self.assertLogs("apps.currency_exchange.client", "WARNING"):
+                await client.get_conversion_rates("UAH")
+        with self.assertRaises(CircuitOpenError):
+            await client.get_conversion_rates("UAH")
+        await client.client.aclose()
+
+        self.assertEqual(len(self.stub.paths), 6)
+
+    async def test_cancelled_trial_reopens_circuit(self):
+        """Test that a trial request whose task is cancelled opens the circuit again instead of blocking it."""
+        client = self.make_client()
+        self.stub.responses = [StubResponse(delay=1)]
+        self.circuit_breaker.state = CircuitBreaker.OPEN
+
+        task = asyncio.create_task(client.get_conversion_rates("UAH"))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        await client.client.aclose()
+
+        self.assertEqual(self.circuit_breaker.state, CircuitBreaker.OPEN)
+
+    async def test_calls_are_in_flight_at_once(self):
+        """Test that slow upstream calls overlap instead of waiting for each other."""
+        client = self.make_client(pool_size=5)
+        self.stub.responses = [StubResponse(delay=0.3, body={"conversion_rates": {"UAH": 1}})] * 5
+
+        started_at = time.perf_counter()
+        results = await asyncio.gather(*(client.get_conversion_rates("UAH") for _ in range(5)))
+        elapsed = time.perf_counter() - started_at
+        await client.client.aclose()
+
+        self.assertEqual(results, [{"UAH": 1}] * 5)
+        self.assertLess(elapsed, 0.3 * 3)
+
+
+class TestCircuitBreaker(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.circuit_breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=self.clock)
+
+    def test_failed_trial_request_opens_circuit_again(self):
+        """Test that only one trial request is let through, and its failure opens the circuit."""
+        self.circuit_breaker.record_failure()
+        self.circuit_breaker.record_failure()
+        self.assertFalse(self.circuit_breaker.allow_request())
+
+        self.clock.now = 30
+        self.assertTrue(self.circuit_breaker.allow_request())
+        self.assertFalse(self.circuit_breaker.allow_request())
+
+        self.circuit_breaker.record_failure()
+        self.assertEqual(self.circuit_breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.circuit_breaker.allow_request())
+
+    def test_success_resets_failures(self):
+        """Test that only consecutive failures open the circuit."""
+        self.circuit_breaker.record_failure()
+        self.circuit_breaker.record_success()
+        self.circuit_breaker.record_failure()
+        self.assertTrue(self.circuit_breaker.allow_request())
@@ -0,0 +1,90 @@
+"""
+Local stand-in for ExchangeRate-API, so the upstream client can be tested offline.
+"""
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+@dataclass
+class StubResponse:
+    status: int = 200
+    body: Optional[dict] = None
+    delay: float = 0.0  # Seconds to wait before responding, to simulate a slow upstream
+
+
+@dataclass
+class ExchangeRateApiStub:
+    """
+    Serves ``/<api key>/latest/<base code>`` on a random local port.
+
+    Queued responses are returned in order, after that every request gets rates from ``conversion_rates``.
+    """
+    conversion_rates: dict[str, dict[str, float]] = field(default_factory=lambda: {
+        "UAH": {"UAH": 1, "USD": 0.025, "EUR": 0.02},
+    })
+    responses: list[StubResponse] = field(default_factory=list)
+    paths: list[str] = field(default_factory=list)
+    client_ports: set[int] = field(default_factory=set)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def __enter__(self) -> 'ExchangeRateApiStub':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _next_response(self, path: str) -> StubResponse:
+        with self._lock:
+            self.paths.append(path)
+            if self.responses:
+                return self.responses.pop(0)
+
+        base_code = path.rstrip('/').rsplit('/', 1)[-1]
+        if base_code not in self.conversion_rates:
+            return StubResponse(status=404, body={"result": "error", "error-type": "unsupported-code"})
+
+        return StubResponse(body={
+            "result": "success", "base_code": base_code, "conversion_rates": self.conversion_rates[base_code],
+        })
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive
+
+            def do_GET(self):
+                stub.client_ports.add(self.client_address[1])
+                response = stub._next_response(self.path)
+                time.sleep(response.delay)
+
+                body = json.dumps(response.body or {}).encode()
+                try:
+                    self.send_response(response.status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):  # The client gave up waiting
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
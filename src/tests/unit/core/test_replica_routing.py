@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import router
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from apps.balance.models import UserBalance
+from apps.core.db_routers import is_pinned_to_primary, mark_as_written, pin_to_primary
+from apps.core.middleware import ReplicaRoutingMiddleware
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], REPLICA_READ_PATHS=["/api/v1/balance/"], REPLICA_PIN_SECONDS=5)
+class TestReplicaRouting(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = SimpleNamespace(id=1, is_authenticated=True)
+        self.read_from = []
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def view(self, request):
+        # Like DRF, the view authenticates the request before reading anything
+        request.user = self.user
+        self.read_from.append(router.db_for_read(UserBalance))
+        return HttpResponse(status=200 if request.method == "GET" else 201)
+
+    def get_response(self, request, view=None):
+        request.user = AnonymousUser()
+        return ReplicaRoutingMiddleware(view or self.view)(request)
+
+    def test_safe_requests_to_replica_paths_read_from_replica(self):
+        """Test that the reads of a GET request to a replica path go to the replica."""
+        self.get_response(self.factory.get("/api/v1/balance/"))
+        self.assertEqual(self.read_from, ["replica"])
+
+    def test_other_requests_read_from_primary(self):
+        """Test that the reads of requests to other paths or of unsafe requests go to the primary."""
+        self.get_response(self.factory.get("/api/v1/convert/"))
+        self.get_response(self.factory.post("/api/v1/balance/"))
+        self.assertEqual(self.read_from, ["default", "default"])
+
+    def test_reads_outside_requests_go_to_primary(self):
+        """Test that reads made outside of a request (commands, tasks) go to the primary."""
+        self.assertEqual(router.db_for_read(UserBalance), "default")
+
+    def test_writes_go_to_primary(self):
+        """Test that writes go to the primary even during a replica path request."""
+        def view(request):
+            self.read_from.append(router.db_for_write(UserBalance))
+            return HttpResponse()
+
+        self.get_response(self.factory.get("/api/v1/balance/"), view)
+        self.assertEqual(self.read_from, ["default"])
+
+    def test_successful_write_pins_user_to_primary(self):
+        """Test that the reads of a user go to the primary right after a successful write of theirs."""
+        self.get_response(self.factory.post("/api/v1/currency/"))
+        self.assertTrue(is_pinned_to_primary(self.user.id))
+
+        self.get_response(self.factory.get("/api/v1/balance/"))
+        self.assertEqual(self.read_from[-1], "default")
+
+        # Other users still read from the replica
+        self.user = SimpleNamespace(id=2, is_authenticated=True)
+        self.get_response(self.factory.get("/api/v1/balance/"))
+        self.assertEqual(self.read_from[-1], "replica")
+
+    def test_pin_expires(self):
+        """Test that the user reads from the replica again once the pin has expired."""
+        with override_settings(REPLICA_PIN_SECONDS=0):
+            pin_to_primary(self.user.id)
+
+        self.get_response(self.factory.get("/api/v1/balance/"))
+        self.assertEqual(self.read_from, ["replica"])
+
+    def test_safe_request_marked_as_written_pins_user(self):
+        """Test that a GET request whose view has written something pins the user to the primary."""
+        def view(request):
+            request.user = self.user
+            mark_as_written(request)
+            return HttpResponse()
+
+        self.get_response(self.factory.get("/api/v1/rates/stream/"), view)
+        self.assertTrue(is_pinned_to_primary(self.user.id))
+
+    def test_failed_write_does_not_pin_user(self):
+        """Test that an unsafe request that failed doesn't pin the user to the primary."""
+        def view(request):
+            request.user = self.user
+            return HttpResponse(status=400)
+
+        self.get_response(self.factory.post("/api/v1/currency/"), view)
+        self.assertFalse(is_pinned_to_primary(self.user.id))
+
+    def test_streamed_content_reads_from_replica(self):
+        """Test that the reads made while the response is streamed go to the replica too."""
+        def stream():
+            yield router.db_for_read(UserBalance)
+
+        def view(request):
+            return StreamingHttpResponse(stream())
+
+        response = self.get_response(self.factory.get("/api/v1/balance/"), view)
+        self.assertEqual(b"".join(response.streaming_content), b"replica")
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_nothing_is_pinned(self):
+        """Test that users aren't pinned when there are no replicas."""
+        pin_to_primary(self.user.id)
+        self.assertFalse(is_pinned_to_primary(self.user.id))
@@ -0,0 +1,26 @@
+from django.test import SimpleTestCase
+
+from apps.currency_exchange.services import CrossRateTable
+
+
+class TestCrossRateTable(SimpleTestCase):
+    def setUp(self):
+        # Rates against UAH, as returned by /latest/UAH
+        self.table = CrossRateTable("UAH", {"UAH": 1, "USD": 0.025, "EUR": 0.02})
+
+    def test_rate_against_base_is_inverted(self):
+        """Test that the rate of a currency to the base currency is the inverted table rate."""
+        self.assertAlmostEqual(self.table.rate("USD", "UAH"), 40.0)
+        self.assertAlmostEqual(self.table.rate("UAH", "USD"), 0.025)
+
+    def test_cross_rate(self):
+        """Test that the rate between two non-base currencies is cross-multiplied."""
+        self.assertAlmostEqual(self.table.rate("EUR", "USD"), 1.25)
+        self.assertAlmostEqual(self.table.rate("USD", "USD"), 1.0)
+
+    def test_unsupported_currency(self):
+        """Test that unsupported or missing currency codes have no rate."""
+        self.assertIsNone(self.table.rate("INVALID", "UAH"))
+        self.assertIsNone(self.table.rate(None, "UAH"))
+        self.assertNotIn("INVALID", self.table)
+        self.assertEqual(len(self.table), 3)
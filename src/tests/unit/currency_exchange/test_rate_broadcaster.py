@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime, UTC
+from django.test import SimpleTestCase
+
+from apps.currency_exchange.models import RateSnapshot
+from apps.currency_exchange.rate_stream import RateBroadcaster, format_rate_event
+
+
+def make_snapshot(snapshot_id, rates):
+    return RateSnapshot(id=snapshot_id, base_code="UAH", rates=rates, fetched_at=datetime(2024, 3, 18, tzinfo=UTC))
+
+
+class TestRateBroadcaster(SimpleTestCase):
+    def setUp(self):
+        self.loads = []
+        self.snapshots = [make_snapshot(1, {"USD": 0.025})]
+
+        def load(after_id):
+            self.loads.append(after_id)
+            latest = self.snapshots[-1]
+            return latest if latest.id != after_id else None
+
+        self.broadcaster = RateBroadcaster(load=load, poll_interval=0.01)
+
+    async def test_subscribers_share_one_poller(self):
+        """Test that all subscribers receive the snapshot loaded by a single poller."""
+        async with self.broadcaster.subscribe() as first, self.broadcaster.subscribe() as second:
+            self.assertEqual((await first.get()).id, 1)
+            self.assertEqual((await second.get()).id, 1)
+            await asyncio.sleep(0.05)
+
+        # Each poll is a single load, whatever the number of subscribers
+        self.assertEqual(self.loads[0], None)
+        self.assertTrue(all(after_id == 1 for after_id in self.loads[1:]))
+
+    async def test_late_subscriber_gets_latest_snapshot(self):
+        """Test that a subscriber joining later gets the latest snapshot without waiting for a new one."""
+        async with self.broadcaster.subscribe() as first:
+            await first.get()
+            async with self.broadcaster.subscribe() as second:
+                self.assertEqual(second.get_nowait().id, 1)
+
+    async def test_slow_subscriber_keeps_only_latest_snapshot(self):
+        """Test that snapshots a subscriber hasn't consumed are replaced by the newer one."""
+        async with self.broadcaster.subscribe() as queue:
+            self.broadcaster.publish(make_snapshot(2, {}))
+            self.broadcaster.publish(make_snapshot(3, {}))
+
+            self.assertEqual(queue.qsize(), 1)
+            self.assertEqual(queue.get_nowait().id, 3)
+
+    async def test_poller_stops_without_subscribers(self):
+        """Test that nothing is loaded once the last subscriber leaves."""
+        async with self.broadcaster.subscribe() as queue:
+            await queue.get()
+
+        loads = len(self.loads)
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(len(self.loads), loads)
+        self.assertEqual(self.broadcaster.subscriber_count, 0)
+
+    def test_format_rate_event(self):
+        """Test that the event carries the snapshot id and only the requested currencies."""
+        event = format_rate_event(make_snapshot(7, {"USD": 0.025, "EUR": 0.02}), ["EUR"])
+
+        self.assertEqual(
+            event,
+            'id: 7\nevent: rates\n'
+            'data: {"base_code": "UAH", "fetched_at": "2024-03-18T00:00:00+00:00", "rates": {"EUR": 0.02}}\n\n',
+        )
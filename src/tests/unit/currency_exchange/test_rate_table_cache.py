@@ -0,0 +1,72 @@
+from django.test import SimpleTestCase
+
+from apps.currency_exchange.services import RateTableCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateTableCache(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.fetched = []
+
+        def fetch(key):
+            self.fetched.append(key)
+            return {"UAH": float(len(self.fetched))}
+
+        self.cache = RateTableCache(fetch=fetch, ttl=60, stale_ttl=300, max_size=2, clock=self.clock)
+
+    def test_fresh_entry_is_served_from_cache(self):
+        """Test that the upstream is called only once while the entry is fresh."""
+        self.assertEqual(self.cache.get("USD"), {"UAH": 1.0})
+        self.clock.now = 59
+        self.assertEqual(self.cache.get("USD"), {"UAH": 1.0})
+        self.assertEqual(self.fetched, ["USD"])
+
+    def test_stale_entry_is_served_while_refreshing(self):
+        """Test that an expired entry is served while a background refresh runs."""
+        self.cache.get("USD")
+        self.clock.now = 120
+
+        self.assertEqual(self.cache.get("USD"), {"UAH": 1.0})
+        self.cache.wait_for_refreshes(timeout=5)
+
+        self.clock.now = 121
+        self.assertEqual(self.cache.get("USD"), {"UAH": 2.0})
+
+    def test_too_old_entry_is_fetched_synchronously(self):
+        """Test that an entry older than ttl + stale_ttl isn't served."""
+        self.cache.get("USD")
+        self.clock.now = 1000
+        self.assertEqual(self.cache.get("USD"), {"UAH": 2.0})
+
+    def test_expired_entry_is_served_if_fetch_fails(self):
+        """Test that cached rates are served when the upstream is unavailable."""
+        self.cache.get("USD")
+        self.clock.now = 1000
+        self.cache._fetch = lambda key: None
+
+        with self.assertLogs("apps.currency_exchange.services", "WARNING"):
+            self.assertEqual(self.cache.get("USD"), {"UAH": 1.0})
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test that the cache never holds more than max_size tables."""
+        self.cache.get("USD")
+        self.cache.get("EUR")
+        self.cache.get("USD")
+        self.cache.get("GBP")  # Evicts EUR
+
+        self.cache.get("USD")
+        self.cache.get("EUR")
+        self.assertEqual(self.fetched, ["USD", "EUR", "GBP", "EUR"])
+
+    def test_failed_fetch_is_not_cached(self):
+        """Test that a failed fetch returns None and is retried next time."""
+        cache = RateTableCache(fetch=lambda key: None, ttl=60, stale_ttl=300, max_size=2, clock=self.clock)
+        self.assertIsNone(cache.get("INVALID"))
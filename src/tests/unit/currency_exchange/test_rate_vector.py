@@ -0,0 +1,50 @@
+import random
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from apps.currency_exchange.conversion import RateVector, RateVectorCache, UnsupportedCurrencyError
+from apps.currency_exchange.services import CrossRateTable
+
+
+class TestRateVector(SimpleTestCase):
+    def setUp(self):
+        # Rates against UAH, as returned by /latest/UAH
+        self.table = CrossRateTable("UAH", {"UAH": 1, "USD": 0.025, "EUR": 0.02, "PLN": 0.1})
+        self.vector = RateVector.from_table(self.table)
+
+    def test_convert_matches_rate_table(self):
+        """Test that vectorized conversions match the conversions of the rate table."""
+        codes = list(self.table.codes)
+        from_codes = random.choices(codes, k=1000)
+        to_codes = random.choices(codes, k=1000)
+        amounts = [random.uniform(-100, 10_000) for _ in range(1000)]
+
+        converted = self.vector.convert(from_codes, to_codes, amounts)
+
+        for from_code, to_code, amount, result in zip(from_codes, to_codes, amounts, converted):
+            self.assertAlmostEqual(result, amount * self.table.rate(from_code, to_code))
+
+    def test_rate(self):
+        """Test the rate between two currencies."""
+        self.assertAlmostEqual(self.vector.rate("USD", "UAH"), 40.0)
+        self.assertAlmostEqual(self.vector.rate("EUR", "USD"), 1.25)
+
+    def test_unsupported_currency(self):
+        """Test that every unsupported code of a batch is reported."""
+        with self.assertRaises(UnsupportedCurrencyError) as context:
+            self.vector.convert(["USD", "ZZZ", "AAA"], ["UAH", "UAH", "USDX"], [1, 2, 3])
+
+        self.assertEqual(context.exception.codes, ["AAA", "USDX", "ZZZ"])
+
+    def test_cache_rebuilds_vector_for_new_table(self):
+        """Test that the vector is built once per rate table."""
+        cache = RateVectorCache()
+        new_table = CrossRateTable("UAH", {"UAH": 1, "USD": 0.05})
+
+        with patch("apps.currency_exchange.conversion.get_rate_table", return_value=self.table):
+            vector = cache.get()
+            self.assertIs(cache.get(), vector)
+
+        with patch("apps.currency_exchange.conversion.get_rate_table", return_value=new_table):
+            self.assertAlmostEqual(cache.get().rate("USD", "UAH"), 20.0)
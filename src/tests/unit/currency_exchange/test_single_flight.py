@@ -0,0 +1,76 @@
+import threading
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from apps.currency_exchange.services import SingleFlight, cache_single_flight
+
+
+class TestSingleFlight(SimpleTestCase):
+    def test_concurrent_callers_share_one_call(self):
+        """Test that callers arriving while a call is in flight get its result without calling again."""
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(timeout=5)
+            return {"UAH": 40.0}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(single_flight.do("USD", fetch)))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        started.wait(timeout=5)
+        release.set()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"UAH": 40.0}] * 10)
+
+    def test_error_is_shared(self):
+        """Test that the error of the call is raised and the next call is made again."""
+        single_flight = SingleFlight()
+
+        def fail():
+            raise ValueError("upstream is down")
+
+        with self.assertRaises(ValueError):
+            single_flight.do("USD", fail)
+        self.assertEqual(single_flight.do("USD", lambda: 1), 1)
+
+
+@override_settings(EXCHANGE_RATE_SINGLE_FLIGHT_TIMEOUT=5, EXCHANGE_RATE_SINGLE_FLIGHT_POLL_INTERVAL=0.01)
+class TestCacheSingleFlight(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_leader_calls_function(self):
+        """Test that the worker taking the lock makes the call and releases the lock."""
+        self.assertEqual(cache_single_flight("rate_table:UAH", lambda: 1), 1)
+        self.assertIsNone(cache.get("single_flight:rate_table:UAH:lock"))
+
+    def test_follower_waits_for_leader_result(self):
+        """Test that a worker waits for the result of another worker's in-flight call."""
+        cache.set("single_flight:rate_table:UAH:lock", "other-worker")
+        timer = threading.Timer(0.05, lambda: cache.set("single_flight:rate_table:UAH:other-worker", 2))
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        self.assertEqual(cache_single_flight("rate_table:UAH", self.fail), 2)
+
+    def test_follower_calls_function_if_leader_fails(self):
+        """Test that a worker makes the call itself if the leader finished without a result."""
+        cache.set("single_flight:rate_table:UAH:lock", "other-worker")
+        timer = threading.Timer(0.05, lambda: cache.delete("single_flight:rate_table:UAH:lock"))
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        self.assertEqual(cache_single_flight("rate_table:UAH", lambda: 3), 3)
@@ -0,0 +1,47 @@
+import os
+import tempfile
+from django.test import SimpleTestCase
+
+from apps.currency_exchange.snapshot_store import MmapSnapshotStore, write_snapshot
+
+
+class TestMmapSnapshotStore(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'rates.bin')
+        self.store = MmapSnapshotStore(self.path)
+
+    def test_missing_file(self):
+        """Test that there's no table until the refresher writes the file."""
+        self.assertIsNone(self.store.get("UAH"))
+
+    def test_lookup(self):
+        """Test that rates are read from the mapped file."""
+        write_snapshot(self.path, "UAH", {"UAH": 1, "USD": 0.025, "EUR": 0.02}, version=7, fetched_at=1700000000.5)
+
+        table = self.store.get("UAH")
+        self.assertEqual(table.version, 7)
+        self.assertEqual(table.fetched_at, 1700000000.5)
+        self.assertEqual(table.codes, ("EUR", "UAH", "USD"))
+        self.assertAlmostEqual(table.rate("USD", "UAH"), 40.0)
+        self.assertAlmostEqual(table.rate("EUR", "USD"), 1.25)
+        self.assertIsNone(table.rate("INVALID", "UAH"))
+        self.assertIsNone(table.rate(None, "UAH"))
+        self.assertIn("EUR", table)
+
+    def test_other_base_currency(self):
+        """Test that the snapshot isn't used for a different base currency."""
+        write_snapshot(self.path, "USD", {"USD": 1, "UAH": 40}, version=1, fetched_at=0)
+        self.assertIsNone(self.store.get("UAH"))
+
+    def test_replaced_file_is_remapped(self):
+        """Test that readers pick up a new snapshot, while tables handed out earlier stay readable."""
+        write_snapshot(self.path, "UAH", {"UAH": 1, "USD": 0.025}, version=1, fetched_at=0)
+        old_table = self.store.get("UAH")
+
+        write_snapshot(self.path, "UAH", {"UAH": 1, "USD": 0.02}, version=2, fetched_at=1)
+
+        self.assertEqual(self.store.get("UAH").version, 2)
+        self.assertAlmostEqual(self.store.get("UAH").rate("USD", "UAH"), 50.0)
+        self.assertAlmostEqual(old_table.rate("USD", "UAH"), 40.0)